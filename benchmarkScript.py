@@ -0,0 +1,859 @@
+# ------------------------------ BENCHMARKS ------------------------------ #
+
+# Used to compare the interchangeable engines in mainScript.py against each other
+# Run with the name of a benchmark to run just that one, or with no arguments to run all of them
+#   e.g. python benchmarkScript.py lexer
+
+import mainScript
+from mainScript import *
+
+# the keyword templates are used to compare against the keyword table
+from regexTemplatesLib import get_offset_template, regex_templates_keywords
+
+# used for timing
+import time
+
+# used to measure memory use
+import tracemalloc
+
+# used to find the number of CPUs
+import os
+
+# regex library
+import re
+
+# used to grab arguments when the program is called in the command line
+import sys
+
+# used to catch the program's outputs
+from contextlib import redirect_stdout
+
+# used to hold the programs and compiled files made by the AST cache benchmark
+import tempfile
+
+# the copy functions are wrapped to count the copies made by a program
+import copy
+
+
+# --- Test Programs --- #
+
+# reads the lines of a .bl file, in the same format that get_code produces them
+def read_program_lines(file_name):
+    file = open(file_name, "r")
+    code_lines = file.readlines()
+    file.close()
+    return code_lines
+
+# produces a large BigLang program by repeating a block of typical lines, each block
+#   uses its own variable names so that the program is still valid when run
+def generate_program_lines(block_count):
+    code_lines = []
+    for block_index in range(block_count):
+        count = f"count_{block_index}"
+        text = f"text_{block_index}"
+        code_lines += [
+            f"INTEGER {count} = 1\n",
+            f"STRING {text} = \"\"\n",
+            f"WHILE {count} ISLESSTHANOREQUALTO 3 DO\n",
+            f"    IF {count} % 3 ISEQUALTO 0 DO\n",
+            f"        {text} = {text} + \"Fizz\"\n",
+            "    ENDIF\n",
+            f"    {count} = {count} + 1\n",
+            "ENDWHILE\n",
+            f"ARRAY array_{block_index} = [1, 2.5, \"three\", 'f', TRUE, <4, 5>]\n",
+        ]
+    return code_lines
+
+# produces a program made of one very long line, an array literal with the set number of elements
+def generate_long_line_program_lines(element_count):
+    elements = ", ".join(str(element) for element in range(element_count))
+    return [f"ARRAY long_array = [{elements}]\n"]
+
+# the lines which are used by most benchmarks
+def get_benchmark_programs():
+    return {
+        "testing_program.bl": read_program_lines("testing_program.bl"),
+        "program_code.bl": read_program_lines("program_code.bl"),
+        "generated (9000 lines)": generate_program_lines(1000),
+    }
+
+
+# --- Timing --- #
+
+# runs the function the set number of times and returns the fastest time taken, the
+#   fastest time is the one least affected by anything else running on the computer
+def time_function(function, repeats=3):
+    fastest_time = None
+    for repeat in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        time_taken = time.perf_counter() - start_time
+        if fastest_time == None or time_taken < fastest_time:
+            fastest_time = time_taken
+    return fastest_time
+
+# the number each time is multiplied by to give it in each unit
+TIME_UNITS = {"ms": 1000, "µs": 1000000}
+
+# prints a row of benchmark results, with the speedup relative to the first time given
+def print_results(name, times, unit="ms"):
+    baseline_time = times[0][1]
+    output_string = f"{name}:\n"
+    for label, time_taken in times:
+        output_string += f"   {label}: {time_taken*TIME_UNITS[unit]:.2f}{unit} ({baseline_time/time_taken:.2f}x)\n"
+    print(output_string)
+
+
+# --- Benchmarks --- #
+
+# times lexing every line with each lexer engine
+def compare_lexers(name, code_lines):
+    original_engine = mainScript.LEXER_ENGINE
+    times = []
+    for engine in [TRIAL_MATCH_LEXER, OFFSET_TRIAL_MATCH_LEXER, MASTER_REGEX_LEXER]:
+        mainScript.LEXER_ENGINE = engine
+        times.append((engine, time_function(lambda: [process_text(line) for line in code_lines])))
+    mainScript.LEXER_ENGINE = original_engine
+    print_results(name, times)
+
+# compares the lexer engines on each program
+def lexer_benchmark():
+    for program_name, code_lines in get_benchmark_programs().items():
+        compare_lexers(f"Lexing {program_name}", code_lines)
+    # a single long line shows how the cost of lexing grows with the length of a line
+    for element_count in [500, 2000]:
+        compare_lexers(f"Lexing one array literal line with {element_count} elements", \
+            generate_long_line_program_lines(element_count))
+
+# produces lines made up almost entirely of name keywords
+def generate_identifier_heavy_lines(line_count):
+    names = ["alpha_value", "beta_value", "gamma_value", "delta_value", "epsilon_value", "zeta_value"]
+    return [f"{names[index % 6]} = " + " + ".join(names) + f" * count_{index}\n" for index in range(line_count)]
+
+# compares lexing lines full of name keywords, and resolving the words in them by trying 
+#   each keyword template in to_test order against looking them up in keyword_table
+def keyword_benchmark():
+    code_lines = generate_identifier_heavy_lines(2000)
+    compare_lexers(f"Lexing {len(code_lines)} identifier-heavy lines", code_lines)
+    words = [word for line in code_lines for word in re.findall("[a-zA-Z0-9_]+", line)]
+    keyword_templates = [(token_type, get_offset_template(token_type)) \
+        for token_type in to_test if token_type in regex_templates_keywords]
+    def resolve_by_templates():
+        for word in words:
+            for token_type, pattern in keyword_templates:
+                if pattern.match(word):
+                    break
+    def resolve_by_table():
+        for word in words:
+            resolve_word(word)
+    times = [
+        ("keyword templates in order", time_function(resolve_by_templates)),
+        ("keyword table", time_function(resolve_by_table)),
+    ]
+    print_results(f"Resolving {len(words)} words", times)
+
+# compares processing programs with and without the line AST cache, the cache is timed 
+#   both empty (cold) and already holding the program's lines (warm)
+def line_cache_benchmark():
+    original_setting = mainScript.USE_LINE_AST_CACHE
+    for program_name, code_lines in get_benchmark_programs().items():
+        mainScript.USE_LINE_AST_CACHE = False
+        uncached_time = time_function(lambda: process_code(code_lines))
+        mainScript.USE_LINE_AST_CACHE = True
+        def cold_process_code():
+            line_AST_cache.clear()
+            process_code(code_lines)
+        cold_time = time_function(cold_process_code)
+        line_AST_cache.clear()
+        process_code(code_lines)
+        warm_time = time_function(lambda: process_code(code_lines))
+        times = [("no cache", uncached_time), ("cold cache", cold_time), ("warm cache", warm_time)]
+        print_results(f"Processing {program_name}", times)
+        print(f"   {line_AST_cache}\n")
+    mainScript.USE_LINE_AST_CACHE = original_setting
+    line_AST_cache.clear()
+
+# compares parsing large programs in this process and across a pool of processes, the 
+#   line AST cache is turned off so that every line really is parsed each time
+def parallel_benchmark():
+    original_settings = (mainScript.PARALLEL_PARSE, mainScript.PARALLEL_PARSE_THRESHOLD, \
+        mainScript.PARALLEL_PARSE_WORKERS, mainScript.USE_LINE_AST_CACHE)
+    mainScript.USE_LINE_AST_CACHE = False
+    mainScript.PARALLEL_PARSE_THRESHOLD = 0
+    print(f"{os.cpu_count()} CPUs available\n")
+    for block_count in [1000, 5000]:
+        code_lines = generate_program_lines(block_count)
+        mainScript.PARALLEL_PARSE = False
+        times = [("serial", time_function(lambda: process_code(code_lines), repeats=1))]
+        mainScript.PARALLEL_PARSE = True
+        for worker_count in [2, 4]:
+            mainScript.PARALLEL_PARSE_WORKERS = worker_count
+            times.append((f"{worker_count} processes", time_function(lambda: process_code(code_lines), repeats=1)))
+        print_results(f"Parsing {len(code_lines)} lines", times)
+    mainScript.PARALLEL_PARSE, mainScript.PARALLEL_PARSE_THRESHOLD, \
+        mainScript.PARALLEL_PARSE_WORKERS, mainScript.USE_LINE_AST_CACHE = original_settings
+
+# compares parsing with every structure graph tried in turn and with only the graphs 
+#   given by the first token index, the index is emptied to make every graph a candidate
+def graph_index_benchmark():
+    for program_name, code_lines in get_benchmark_programs().items():
+        token_lists = [process_text(line) for line in code_lines]
+        original_index = (mainScript.first_token_index, mainScript.any_first_token_graphs)
+        mainScript.first_token_index, mainScript.any_first_token_graphs = {}, compiled_structure_graphs
+        times = [("every graph", time_function(lambda: [form_AST(token_list) for token_list in token_lists]))]
+        mainScript.first_token_index, mainScript.any_first_token_graphs = original_index
+        times.append(("first token index", time_function(lambda: [form_AST(token_list) for token_list in token_lists])))
+        print_results(f"Parsing {program_name}", times)
+
+# produces an assignment of one long arithmetic expression with the set number of operators
+def generate_long_expression_line(operator_count):
+    operators = ["+", "-", "*", "/", "%", "//"]
+    expression = "1"
+    for index in range(operator_count):
+        expression += f" {operators[index % 6]} value_{index}"
+    return f"result = {expression}\n"
+
+# produces an assignment of an expression nested in the set number of brackets
+def generate_nested_expression_line(depth):
+    expression = "1"
+    for index in range(depth):
+        expression = f"(value_{index} * {expression} - 1)"
+    return f"result = {expression}\n"
+
+# times forming the ASTs of the token lists with each parser engine
+def compare_parsers(name, token_lists):
+    original_engine = mainScript.PARSER_ENGINE
+    times = []
+    for engine in [GRAPH_PARSER, PRECEDENCE_CLIMBING_PARSER]:
+        mainScript.PARSER_ENGINE = engine
+        times.append((engine, time_function(lambda: [form_AST(token_list) for token_list in token_lists])))
+    mainScript.PARSER_ENGINE = original_engine
+    print_results(name, times)
+
+# compares the graph parser and the precedence climbing parser on each program and on long 
+#   and deeply nested expressions, where re-splitting every sublist costs the most
+def parser_benchmark():
+    for program_name, code_lines in get_benchmark_programs().items():
+        compare_parsers(f"Parsing {program_name}", [process_text(line) for line in code_lines])
+    for operator_count in [50, 200]:
+        compare_parsers(f"Parsing an expression with {operator_count} operators", \
+            [process_text(generate_long_expression_line(operator_count))])
+    for depth in [20, 60]:
+        compare_parsers(f"Parsing an expression nested {depth} brackets deep", \
+            [process_text(generate_nested_expression_line(depth))])
+
+# compares starting a program from its source each time against with the compiled AST 
+#   cache, both before the compiled file exists (cold) and once it has been saved (warm)
+# the line AST cache is turned off so that every line really is parsed when it is needed
+def AST_cache_benchmark():
+    original_settings = (mainScript.USE_LINE_AST_CACHE, mainScript.AST_CACHE_DIRECTORY)
+    mainScript.USE_LINE_AST_CACHE = False
+    with tempfile.TemporaryDirectory() as directory:
+        mainScript.AST_CACHE_DIRECTORY = os.path.join(directory, "cache")
+        programs = get_benchmark_programs()
+        programs["generated (90000 lines)"] = generate_program_lines(10000)
+        for program_name, code_lines in programs.items():
+            file_name = os.path.join(directory, "program.bl")
+            file = open(file_name, "w")
+            file.writelines(code_lines)
+            file.close()
+            compiled_file_name = get_compiled_file_name(file_name)
+            def cold_start():
+                if os.path.exists(compiled_file_name):
+                    os.remove(compiled_file_name)
+                process_code_with_cache(file_name, get_code(file_name))
+            times = [
+                ("no cache", time_function(lambda: process_code(get_code(file_name)))),
+                ("cold cache", time_function(cold_start)),
+                ("warm cache", time_function(lambda: process_code_with_cache(file_name, get_code(file_name)))),
+            ]
+            print_results(f"Starting {program_name}", times)
+            print(f"   compiled file: {os.path.getsize(compiled_file_name)/1024:.0f}KiB\n")
+    mainScript.USE_LINE_AST_CACHE, mainScript.AST_CACHE_DIRECTORY = original_settings
+
+# produces a loop that skips over a large if statement, and then its else section, on 
+#   every iteration
+def generate_skipping_program_lines(iteration_count, body_line_count):
+    body_lines = [f"    total = total + {index}\n" for index in range(body_line_count)]
+    return ["INTEGER total = 0\n", "INTEGER count = 0\n", f"WHILE count ISLESSTHAN {iteration_count} DO\n", \
+        "    IF count ISLESSTHAN 0 DO\n"] + body_lines + ["    ELSE\n", "    count = count + 1\n", \
+        "    ENDIF\n", "    IF count ISGREATERTHAN 0 DO\n", "    ELSE\n"] + body_lines + ["    ENDIF\n", \
+        "ENDWHILE\n"]
+
+# compares skipping blocks by moving through them a line at a time against jumping straight
+#   to the end using the block jumps worked out before the program runs
+def block_jump_benchmark():
+    for body_line_count in [10, 100]:
+        ast_lines = process_code(generate_skipping_program_lines(200, body_line_count))
+        def run_line_by_line():
+            program_runner = Program_runner(ast_lines)
+            program_runner.block_jumps = None
+            program_runner.run()
+        times = [
+            ("line by line", time_function(run_line_by_line)),
+            ("block jumps", time_function(lambda: Program_runner(ast_lines).run())),
+        ]
+        print_results(f"Running 200 iterations skipping {body_line_count*2} lines each", times)
+
+# produces a program which spends nearly all of its time on arithmetic and comparisons of 
+#   declared variables
+def generate_arithmetic_loop_program_lines(iteration_count):
+    return [
+        "INTEGER count = 0\n",
+        "INTEGER total = 0\n",
+        "FLOAT average = 0.0\n",
+        f"WHILE count ISLESSTHAN {iteration_count} DO\n",
+        "    total = total + count * 3 % 7\n",
+        "    average = total / (count + 1)\n",
+        "    IF count % 2 ISEQUALTO 0 AND total ISGREATERTHAN 10 DO\n",
+        "        total = total - 1\n",
+        "    ENDIF\n",
+        "    count = count + 1\n",
+        "ENDWHILE\n",
+    ]
+
+# runs the program with its outputs thrown away
+def run_quietly(ast_lines):
+    with open(os.devnull, "w") as devnull:
+        with redirect_stdout(devnull):
+            Program_runner(ast_lines).run()
+
+# compares running programs with every operation found dynamically against with the operator 
+#   nodes whose operand types were inferred using their specialised implementations
+def type_inference_benchmark():
+    original_setting = mainScript.INFER_TYPES
+    # fusion uses the inferred types, so it is turned off to time inference on its own
+    original_fusion_setting = mainScript.FUSE_OPERATIONS
+    mainScript.FUSE_OPERATIONS = False
+    programs = {
+        "program_code.bl": read_program_lines("program_code.bl"),
+        "an arithmetic loop of 2000 iterations": generate_arithmetic_loop_program_lines(2000),
+    }
+    for program_name, code_lines in programs.items():
+        ast_lines = process_code(code_lines)
+        mainScript.INFER_TYPES = False
+        dynamic_lines = optimise_program(ast_lines)
+        mainScript.INFER_TYPES = True
+        typed_lines = optimise_program(ast_lines)
+        times = [
+            ("dynamic", time_function(lambda: run_quietly(dynamic_lines))),
+            ("inferred types", time_function(lambda: run_quietly(typed_lines))),
+        ]
+        print_results(f"Running {program_name}", times)
+    mainScript.INFER_TYPES = original_setting
+    mainScript.FUSE_OPERATIONS = original_fusion_setting
+
+# finds the operation of every operator node in the ASTs, in the order they are carried out
+def find_operations(my_AST, operations):
+    if isinstance(my_AST, Operator_node):
+        for child_node in my_AST.child_nodes:
+            find_operations(child_node, operations)
+        if my_AST.type in operation_handlers:
+            operations.append(my_AST.type)
+    return operations
+
+# finds an operation's handler the way do_operation did before the handler table, with an 
+#   if/elif chain checking the operations in the same order
+def if_chain_dispatch(operation):
+    if operation == ASSIGNMENT:
+        return operation_handlers[operation]
+    elif operation == DECLARATION_NORMAL_WITH_VALUE:
+        return operation_handlers[operation]
+    elif operation == DECLARATION_NORMAL_WITHOUT_VALUE:
+        return operation_handlers[operation]
+    elif operation == FOR_STATEMENT:
+        return operation_handlers[operation]
+    elif operation == ARRAY_APPEND:
+        return operation_handlers[operation]
+    elif operation == PRIORITY_QUEUE_ADD_ITEM:
+        return operation_handlers[operation]
+    elif operation == STACK_QUEUE_ADD_ITEM:
+        return operation_handlers[operation]
+    elif operation == STACK_QUEUE_ITEM_POP:
+        return operation_handlers[operation]
+    elif operation == DICTIONARY_INSERT:
+        return operation_handlers[operation]
+    elif operation == DICTIONARY_REMOVE:
+        return operation_handlers[operation]
+    elif operation == BRACKETS:
+        return operation_handlers[operation]
+    elif operation == IF_STATEMENT:
+        return operation_handlers[operation]
+    elif operation == WHILE_STATEMENT:
+        return operation_handlers[operation]
+    elif operation in [ARRAY, TUPLE, DICTIONARY]:
+        return operation_handlers[operation]
+    elif operation == CONCATENATION_OR_ADDITION:
+        return operation_handlers[operation]
+    elif operation == SUBTRACTION:
+        return operation_handlers[operation]
+    elif operation == MULTIPLICATION:
+        return operation_handlers[operation]
+    elif operation == DIVISION:
+        return operation_handlers[operation]
+    elif operation == INTEGER_DIVISION:
+        return operation_handlers[operation]
+    elif operation == MODULO_DIVIDE:
+        return operation_handlers[operation]
+    elif operation == BOOLEAN_COMPARISON:
+        return operation_handlers[operation]
+    elif operation == BINARY_BOOLEAN_LOGICAL_STATEMENT:
+        return operation_handlers[operation]
+    elif operation == SINGLE_BOOLEAN_LOGICAL_STATEMENT:
+        return operation_handlers[operation]
+    elif operation == STRING_LIST_READ_BY_INDEX:
+        return operation_handlers[operation]
+    elif operation == LENGTH_CHECK:
+        return operation_handlers[operation]
+    elif operation == OUTPUT_CALL:
+        return operation_handlers[operation]
+    elif operation == STACK_QUEUE_ITEM_READ:
+        return operation_handlers[operation]
+    elif operation == DICTIONARY_LOOKUP:
+        return operation_handlers[operation]
+    elif operation == DICTIONARY_KEY_LIST:
+        return operation_handlers[operation]
+    elif operation == DICTIONARY_PAIR:
+        return operation_handlers[operation]
+    else:
+        raise Exception(f"Invalid operation: {operation}")
+
+def table_dispatch(operation):
+    operation_handler = operation_handlers.get(operation)
+    if operation_handler == None:
+        raise Exception(f"Invalid operation: {operation}")
+    return operation_handler
+
+# compares the time taken to find the handlers of the operations in a program with the 
+#   handler table and with an if/elif chain, the operations are dispatched 1000 times over
+def op_dispatch_benchmark():
+    programs = {
+        "program_code.bl": read_program_lines("program_code.bl"),
+        "an arithmetic loop": generate_arithmetic_loop_program_lines(1),
+    }
+    for program_name, code_lines in programs.items():
+        operations = []
+        for my_AST in process_code(code_lines):
+            find_operations(my_AST, operations)
+        operations = operations * 1000
+        times = [
+            ("if/elif chain", time_function(lambda: [if_chain_dispatch(operation) for operation in operations])),
+            ("handler table", time_function(lambda: [table_dispatch(operation) for operation in operations])),
+        ]
+        print_results(f"Dispatching the {len(operations)} operations of {program_name}", times)
+
+# produces a program which reads through the start of an array with the set number of elements
+def generate_array_reading_program_lines(element_count, iteration_count):
+    return generate_long_line_program_lines(element_count) + [
+        "INTEGER index = 0\n",
+        "INTEGER item = 0\n",
+        "INTEGER total = 0\n",
+        f"WHILE index ISLESSTHAN {iteration_count} DO\n",
+        "    item = long_array.READBYINDEX(index)\n",
+        "    total = total + item\n",
+        "    index = index + 1\n",
+        "ENDWHILE\n",
+        "OUTPUT(total)\n",
+    ]
+
+# runs the program and counts the lines run and the copies made while running it, deepcopy 
+#   calls itself for every object within what it copies so each of these is counted as a copy
+def count_copies(ast_lines):
+    counts = {"copies": 0, "lines": 0}
+    original_functions = (copy.copy, copy.deepcopy, Program_runner.increment)
+    def counted(function, count_name):
+        def counted_function(*arguments, **keyword_arguments):
+            counts[count_name] += 1
+            return function(*arguments, **keyword_arguments)
+        return counted_function
+    copy.copy = counted(original_functions[0], "copies")
+    copy.deepcopy = counted(original_functions[1], "copies")
+    # every line run is moved to with one increment
+    Program_runner.increment = counted(original_functions[2], "lines")
+    try:
+        run_quietly(ast_lines)
+    finally:
+        copy.copy, copy.deepcopy, Program_runner.increment = original_functions
+    return counts["copies"], counts["lines"]
+
+# counts the copies of values made for each line run, and times the programs
+def copies_benchmark():
+    programs = {
+        "testing_program.bl": read_program_lines("testing_program.bl"),
+        "program_code.bl": read_program_lines("program_code.bl"),
+        "reading a 10000 element array": generate_array_reading_program_lines(10000, 100),
+    }
+    for program_name, code_lines in programs.items():
+        ast_lines = optimise_program(process_code(code_lines))
+        copy_count, line_count = count_copies(ast_lines)
+        time_taken = time_function(lambda: run_quietly(ast_lines))
+        print(f"Running {program_name}:\n" \
+            f"   {copy_count} copies over {line_count} lines, {copy_count/line_count:.1f} copies per line\n" \
+            f"   {time_taken*1000:.2f}ms\n")
+
+# runs the program and returns the number of lines run, every line run is moved to with one increment
+# transpiled programs don't run line by line, so the lines are counted using the interpreter
+def count_lines_run(ast_lines):
+    line_count = 0
+    original_increment = Program_runner.increment
+    original_engine = mainScript.EXECUTION_ENGINE
+    def counted_increment(self):
+        nonlocal line_count
+        line_count += 1
+        original_increment(self)
+    Program_runner.increment = counted_increment
+    mainScript.EXECUTION_ENGINE = TREE_WALKING_INTERPRETER
+    try:
+        run_quietly(ast_lines)
+    finally:
+        Program_runner.increment = original_increment
+        mainScript.EXECUTION_ENGINE = original_engine
+    return line_count
+
+# compares the time taken per line run by each execution engine, the lines are compiled before 
+#   the timing starts as they are only compiled once however many times they are run, the time 
+#   taken to compile them is given separately
+def execution_engine_benchmark():
+    original_engine = mainScript.EXECUTION_ENGINE
+    programs = {
+        "program_code.bl": read_program_lines("program_code.bl"),
+        "an arithmetic loop of 2000 iterations": generate_arithmetic_loop_program_lines(2000),
+    }
+    for program_name, code_lines in programs.items():
+        ast_lines = optimise_program(process_code(code_lines))
+        line_count = count_lines_run(ast_lines)
+        times = []
+        setup_times = []
+        for engine in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, PYTHON_TRANSPILER]:
+            mainScript.EXECUTION_ENGINE = engine
+            # compiling and transpiling is done when the program runner is made
+            setup_times.append((engine, time_function(lambda: Program_runner(ast_lines))))
+            program_runner = Program_runner(ast_lines)
+            with open(os.devnull, "w") as devnull:
+                with redirect_stdout(devnull):
+                    time_taken = time_function(program_runner.run)
+            times.append((engine, time_taken/line_count))
+        print_results(f"Time per line running {program_name} ({line_count} lines run)", times, unit="µs")
+        print_results(f"Time to prepare {program_name} to be run", setup_times)
+    mainScript.EXECUTION_ENGINE = original_engine
+
+# produces a program with a loop nested inside another, the inner loop's body is run 
+#   outer_count*inner_count times
+def generate_nested_loop_program_lines(outer_count, inner_count):
+    return [
+        "INTEGER i = 0\n",
+        "INTEGER j = 0\n",
+        "INTEGER total = 0\n",
+        f"WHILE i ISLESSTHAN {outer_count} DO\n",
+        "    j = 0\n",
+        f"    WHILE j ISLESSTHAN {inner_count} DO\n",
+        "        IF (i + j) % 3 ISEQUALTO 0 DO\n",
+        "            total = total + i * j\n",
+        "        ENDIF\n",
+        "        j = j + 1\n",
+        "    ENDWHILE\n",
+        "    i = i + 1\n",
+        "ENDWHILE\n",
+        "OUTPUT(total)\n",
+    ]
+
+# compares the time taken to run programs with the tree walking interpreter and as bytecode, 
+#   and how long compiling them into bytecode and loading it from a bytecode file take
+def bytecode_benchmark():
+    original_engine = mainScript.EXECUTION_ENGINE
+    programs = {
+        "testing_program.bl": read_program_lines("testing_program.bl"),
+        "program_code.bl (FizzBuzz)": read_program_lines("program_code.bl"),
+        "a nested loop of 50x50 iterations": generate_nested_loop_program_lines(50, 50),
+    }
+    bytecode_file_name = os.path.join(tempfile.mkdtemp(), "benchmark.blb")
+    for program_name, code_lines in programs.items():
+        ast_lines = optimise_program(process_code(code_lines))
+        times = []
+        for engine in [TREE_WALKING_INTERPRETER, BYTECODE_VM]:
+            mainScript.EXECUTION_ENGINE = engine
+            program_runner = Program_runner(ast_lines)
+            with open(os.devnull, "w") as devnull:
+                with redirect_stdout(devnull):
+                    times.append((engine, time_function(program_runner.run)))
+        print_results(f"Running {program_name}", times)
+        bytecode_program = compile_bytecode(ast_lines)
+        save_bytecode_file(bytecode_file_name, bytecode_program)
+        times = [
+            ("compiling the ASTs into bytecode", time_function(lambda: compile_bytecode(ast_lines))),
+            ("loading the bytecode file", time_function(lambda: load_bytecode_file(bytecode_file_name))),
+        ]
+        print_results(f"Preparing {program_name} ({len(bytecode_program.code)//2} instructions, " \
+            f"{os.path.getsize(bytecode_file_name)} byte file)", times)
+    os.remove(bytecode_file_name)
+    os.rmdir(os.path.dirname(bytecode_file_name))
+    mainScript.EXECUTION_ENGINE = original_engine
+
+# produces a loop made of the shapes that operation fusion replaces
+def generate_fusable_loop_program_lines(iteration_count):
+    return [
+        "INTEGER i = 1\n",
+        "INTEGER count = 0\n",
+        "STRING marks = \"\"\n",
+        f"WHILE i ISLESSTHANOREQUALTO {iteration_count} DO\n",
+        "    IF i % 3 ISEQUALTO 0 DO\n",
+        "        marks = marks + \"x\"\n",
+        "    ENDIF\n",
+        "    count = count + 2\n",
+        "    i = i + 1\n",
+        "ENDWHILE\n",
+    ]
+
+# compares running programs with and without operation fusion, for the execution engines 
+#   which run fused nodes
+def fusion_benchmark():
+    original_engine = mainScript.EXECUTION_ENGINE
+    original_setting = mainScript.FUSE_OPERATIONS
+    programs = {
+        "program_code.bl (FizzBuzz)": read_program_lines("program_code.bl"),
+        "a loop of 2000 iterations made of fusable lines": generate_fusable_loop_program_lines(2000),
+    }
+    for program_name, code_lines in programs.items():
+        ast_lines = process_code(code_lines)
+        for engine in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER]:
+            mainScript.EXECUTION_ENGINE = engine
+            times = []
+            for fuse_operations in [False, True]:
+                mainScript.FUSE_OPERATIONS = fuse_operations
+                optimised_lines = optimise_program(ast_lines)
+                times.append((f"fusion {'on' if fuse_operations else 'off'}", time_function(lambda: run_quietly(optimised_lines))))
+            print_results(f"Running {program_name} with the {engine}", times)
+    mainScript.EXECUTION_ENGINE = original_engine
+    mainScript.FUSE_OPERATIONS = original_setting
+
+# produces a loop whose conditions are AND and OR statements with an expensive operand, reading
+#   the whole of a long array and looking up a dictionary value, and a cheap operand which
+#   decides the result. If the cheap operand is on the left the expensive one is never worked
+#   out, if it is on the right the expensive one is always worked out, as both were before
+#   AND and OR short circuited
+def generate_expensive_condition_program_lines(element_count, iteration_count, cheap_operand_first):
+    expensive_operands = [f"LENGTH(items.READBYINDEX([0, {element_count-1}])) ISGREATERTHAN 0", "(d.LOOKUPVALUE('a'))"]
+    cheap_operands = ["checking", "skipping"]
+    conditions = []
+    for expensive_operand, cheap_operand, logical_keyword in zip(expensive_operands, cheap_operands, ["AND", "OR"]):
+        if cheap_operand_first:
+            conditions.append(f"{cheap_operand} {logical_keyword} {expensive_operand}")
+        else:
+            conditions.append(f"{expensive_operand} {logical_keyword} {cheap_operand}")
+    return [
+        f"ARRAY items = [{', '.join(str(number) for number in range(element_count))}]\n",
+        "DICTIONARY d = {'a':TRUE}\n",
+        "BOOLEAN checking = FALSE\n",
+        "BOOLEAN skipping = TRUE\n",
+        "INTEGER i = 0\n",
+        "INTEGER hits = 0\n",
+        f"WHILE i ISLESSTHAN {iteration_count} DO\n",
+        f"    IF {conditions[0]} DO\n",
+        "        hits = hits + 1\n",
+        "    ENDIF\n",
+        f"    IF {conditions[1]} DO\n",
+        "        hits = hits + 1\n",
+        "    ENDIF\n",
+        "    i = i + 1\n",
+        "ENDWHILE\n",
+        "OUTPUT(hits)\n",
+    ]
+
+# compares AND and OR statements whose left operand decides the result, so their expensive right
+#   operand is skipped, against the same statements written the other way round, which work
+#   out both operands as every AND and OR statement did before they short circuited
+def short_circuit_benchmark():
+    original_engine = mainScript.EXECUTION_ENGINE
+    for element_count in [10, 1000]:
+        programs = {
+            "expensive operand first": generate_expensive_condition_program_lines(element_count, 500, False),
+            "deciding operand first": generate_expensive_condition_program_lines(element_count, 500, True),
+        }
+        for engine in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM]:
+            mainScript.EXECUTION_ENGINE = engine
+            times = []
+            for program_name, code_lines in programs.items():
+                ast_lines = optimise_program(process_code(code_lines))
+                times.append((program_name, time_function(lambda: run_quietly(ast_lines))))
+            print_results(f"Running 500 iterations reading a {element_count} item array with the {engine}", times)
+    mainScript.EXECUTION_ENGINE = original_engine
+
+# produces a loop whose body is inside the set number of IF statements, and which uses variables
+#   declared outside of all of them
+def generate_deeply_nested_program_lines(nesting_depth, iteration_count):
+    opening_lines = [f"{'    '*(depth+1)}IF i ISGREATERTHANOREQUALTO 0 DO\n" for depth in range(nesting_depth)]
+    closing_lines = [f"{'    '*(depth+1)}ENDIF\n" for depth in reversed(range(nesting_depth))]
+    body_indent = "    "*(nesting_depth+1)
+    return [
+        "INTEGER i = 0\n",
+        "INTEGER total = 0\n",
+        "INTEGER odd_count = 0\n",
+        f"WHILE i ISLESSTHAN {iteration_count} DO\n",
+    ] + opening_lines + [
+        f"{body_indent}total = total + i * 2\n",
+        f"{body_indent}IF i % 2 ISEQUALTO 1 DO\n",
+        f"{body_indent}    odd_count = odd_count + 1\n",
+        f"{body_indent}ENDIF\n",
+    ] + closing_lines + [
+        "    i = i + 1\n",
+        "ENDWHILE\n",
+        "OUTPUT(total)\n",
+    ]
+
+# compares finding every variable by name, looking through the frame stack, against reading
+#   and writing the slots given to them by the resolver, for more and more deeply nested blocks
+def variable_resolution_benchmark():
+    original_engine = mainScript.EXECUTION_ENGINE
+    original_setting = mainScript.RESOLVE_VARIABLES
+    for nesting_depth in [0, 4, 16]:
+        ast_lines = optimise_program(process_code(generate_deeply_nested_program_lines(nesting_depth, 300)))
+        for engine in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, BYTECODE_VM]:
+            mainScript.EXECUTION_ENGINE = engine
+            times = []
+            for resolve_variables in [False, True]:
+                mainScript.RESOLVE_VARIABLES = resolve_variables
+                program_runner = Program_runner(ast_lines)
+                with open(os.devnull, "w") as devnull:
+                    with redirect_stdout(devnull):
+                        times.append((f"{'resolved slots' if resolve_variables else 'found by name'}", \
+                            time_function(program_runner.run)))
+            print_results(f"Running 300 iterations nested in {nesting_depth} IF statements with the {engine}", times)
+    mainScript.EXECUTION_ENGINE = original_engine
+    mainScript.RESOLVE_VARIABLES = original_setting
+
+# the token format used before token types were integer codes, kept to compare against
+class String_typed_token:
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+# measures the memory allocated while running the function and keeps what it returns alive
+def measure_memory(function):
+    tracemalloc.start()
+    result = function()
+    memory_used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory_used, result
+
+# compares the compact tokens with string typed tokens, both in the memory used by the 
+#   token lists of a large program and in the speed of checking their types
+def token_benchmark():
+    code_lines = generate_program_lines(1000)
+    token_lists = [process_text(line) for line in code_lines]
+    string_memory, string_token_lists = measure_memory(lambda: [[String_typed_token(str(token.type), token.value) \
+        for token in token_list] for token_list in token_lists])
+    compact_memory, compact_token_lists = measure_memory(lambda: [[Token(token.type, token.value) \
+        for token in token_list] for token_list in token_lists])
+    print(f"Memory used by the token lists of {len(code_lines)} lines:\n" \
+        f"   string typed tokens: {string_memory/1024:.0f}KiB\n" \
+        f"   compact tokens: {compact_memory/1024:.0f}KiB ({string_memory/compact_memory:.2f}x less)\n")
+    # the same type checks as split_token_list and do_operation make
+    string_checked_types = [str(token_type) for token_type in DECLARATIVE_KEYWORDS_VALUE + [NAME_KEYWORD, EQUALS, END]]
+    compact_checked_types = DECLARATIVE_KEYWORDS_VALUE + [NAME_KEYWORD, EQUALS, END]
+    def check_types(token_lists, checked_types):
+        for token_list in token_lists:
+            for token in token_list:
+                token.type in checked_types
+    times = [
+        ("string typed tokens", time_function(lambda: check_types(string_token_lists, string_checked_types))),
+        ("compact tokens", time_function(lambda: check_types(compact_token_lists, compact_checked_types))),
+    ]
+    print_results(f"Checking the types of every token in {len(code_lines)} lines", times)
+
+# the AST node format used before nodes had slots, tuple children and shared leaf nodes, 
+#   kept to compare against
+class Dict_leaf_node:
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+class Dict_operator_node:
+    def __init__(self, operation, child_nodes):
+        self.type = operation
+        self.child_nodes = child_nodes
+
+# rebuilds an AST out of the old node format, with a new leaf node for every leaf
+def make_dict_AST(my_AST):
+    if type(my_AST) == Leaf_node:
+        dict_AST = Dict_leaf_node(my_AST.type, my_AST.value)
+    else:
+        dict_AST = Dict_operator_node(my_AST.type, [make_dict_AST(child_node) for child_node in my_AST.child_nodes])
+    return dict_AST
+
+# compares the memory used by the ASTs of a 100k line program in the old node format and in 
+#   the compact one, the line AST cache is turned off so that no lines share an AST
+def AST_memory_benchmark():
+    original_setting = mainScript.USE_LINE_AST_CACHE
+    mainScript.USE_LINE_AST_CACHE = False
+    code_lines = generate_program_lines(11112)
+    interned_leaf_nodes.clear()
+    compact_memory, compact_ASTs = measure_memory(lambda: process_code(code_lines))
+    dict_memory, dict_ASTs = measure_memory(lambda: [make_dict_AST(my_AST) for my_AST in compact_ASTs])
+    print(f"Memory used by the ASTs of {len(code_lines)} lines:\n" \
+        f"   dictionary nodes: {dict_memory/1024:.0f}KiB\n" \
+        f"   compact nodes: {compact_memory/1024:.0f}KiB ({dict_memory/compact_memory:.2f}x less), " \
+        f"{len(interned_leaf_nodes)} distinct leaf nodes\n")
+    mainScript.USE_LINE_AST_CACHE = original_setting
+
+# used to stop a program as soon as it has outputted something
+class First_output_reached(Exception):
+    pass
+
+# stands in for stdout, stopping the program at the first thing it prints
+class First_output_catcher(object):
+    def write(self, text):
+        raise First_output_reached()
+    def flush(self):
+        pass
+
+# runs the program until its first output, returning the time that took
+def time_to_first_output(make_ast_lines):
+    start_time = time.perf_counter()
+    try:
+        with redirect_stdout(First_output_catcher()):
+            Program_runner(make_ast_lines()).run()
+    except First_output_reached:
+        pass
+    return time.perf_counter() - start_time
+
+# compares how long a program whose first line is an output takes to produce it, when 
+#   the whole program is parsed first and when it is streamed
+def streaming_benchmark():
+    for block_count in [100, 1000]:
+        code_lines = ["OUTPUT(\"first\")\n"] + generate_program_lines(block_count)
+        times = [
+            ("parsed up front", time_to_first_output(lambda: process_code(code_lines))),
+            ("streamed", time_to_first_output(lambda: Streamed_ast_lines(process_code_stream(code_lines)))),
+        ]
+        print_results(f"Time to first output with {len(code_lines)} lines", times)
+
+BENCHMARKS = {
+    "lexer": lexer_benchmark,
+    "streaming": streaming_benchmark,
+    "keywords": keyword_benchmark,
+    "line_cache": line_cache_benchmark,
+    "tokens": token_benchmark,
+    "parallel": parallel_benchmark,
+    "graph_index": graph_index_benchmark,
+    "parser": parser_benchmark,
+    "AST_memory": AST_memory_benchmark,
+    "AST_cache": AST_cache_benchmark,
+    "block_jumps": block_jump_benchmark,
+    "type_inference": type_inference_benchmark,
+    "op_dispatch": op_dispatch_benchmark,
+    "copies": copies_benchmark,
+    "execution_engines": execution_engine_benchmark,
+    "bytecode": bytecode_benchmark,
+    "fusion": fusion_benchmark,
+    "short_circuit": short_circuit_benchmark,
+    "variable_resolution": variable_resolution_benchmark,
+}
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    if not arguments:
+        arguments = BENCHMARKS.keys()
+    for benchmark_name in arguments:
+        if benchmark_name not in BENCHMARKS:
+            raise Exception(f"No benchmark called {benchmark_name}, valid names are: {list(BENCHMARKS.keys())}")
+        BENCHMARKS[benchmark_name]()
@@ -19,9 +19,33 @@ import copy
 
 # get_template produces the correct regex template for the inputted token
 # to_test is a list of all tokens to test for in an optimum order/non-broken order for testing
-from regexTemplatesLib import get_template, to_test
+# master_pattern is every template joined into one precompiled regex, in the to_test order
+# offset_templates are the templates compiled for matching from a position within a line
+# resolve_word looks up words in the keyword table, keywords can then be found with one word scan
+from regexTemplatesLib import get_template, to_test, master_pattern, master_group_token_types, MISMATCH_GROUP, \
+    WORD_GROUP, offset_templates, WORD_TOKEN_TYPE, resolve_word
+
+# lexer engines, the one used is chosen by the LEXER_ENGINE flag at the bottom of this file
+# the trial match lexer tests every template in to_test one by one for each token
+# the offset trial match lexer tests the templates in the same order, but precompiled and 
+#   from a position in the line so the rest of the line is never copied
+# the master regex lexer scans the line once with the precompiled master pattern
+TRIAL_MATCH_LEXER = "trial match lexer"
+OFFSET_TRIAL_MATCH_LEXER = "offset trial match lexer"
+MASTER_REGEX_LEXER = "master regex lexer"
 
 def process_text(my_line):
+    if LEXER_ENGINE == MASTER_REGEX_LEXER:
+        token_list = process_text_master_regex(my_line)
+    elif LEXER_ENGINE == OFFSET_TRIAL_MATCH_LEXER:
+        token_list = process_text_offset_trial_match(my_line)
+    elif LEXER_ENGINE == TRIAL_MATCH_LEXER:
+        token_list = process_text_trial_match(my_line)
+    else:
+        raise Exception(f"Invalid lexer engine: {LEXER_ENGINE}")
+    return token_list
+
+def process_text_trial_match(my_line):
     # setting up variables
     # .strip() removes leading and trailing whitespace
     working_text = my_line.strip()
@@ -63,9 +87,66 @@ def process_text(my_line):
     token_list.append(Token(END, None))
     return token_list
 
+# produces the same token list as process_text_trial_match, but each template is matched 
+#   from the current position in the line. Every template used to end with '(.*)$', which 
+#   copied the rest of the line for each token and made long lines quadratic to lex
+def process_text_offset_trial_match(my_line):
+    working_text = my_line.strip()
+    text_length = len(working_text)
+    position = 0
+    token_list = []
+    while position != text_length:
+        found = False
+        template_index = 0
+        while template_index < len(offset_templates) and not found:
+            token_type, pattern = offset_templates[template_index]
+            match_output = pattern.match(working_text, position)
+            if match_output:
+                # templates for token types with values have one capture group holding the value
+                if token_type == WORD_TOKEN_TYPE:
+                    new_token = Token(*resolve_word(match_output.group(1)))
+                elif match_output.re.groups == 0:
+                    new_token = Token(token_type, None)
+                else:
+                    new_token = Token(token_type, match_output.group(1))
+                token_list.append(new_token)
+                position = match_output.end()
+                found = True
+            template_index += 1
+        if not found:
+            raise Exception(f"token not found for beginning of '{working_text[position:]}'")
+    token_list.append(Token(END, None))
+    return token_list
+
+# produces the same token list as process_text_trial_match, but the master pattern 
+#   has already decided which template matches first so each token takes one regex step
+def process_text_master_regex(my_line):
+    working_text = my_line.strip()
+    token_list = []
+    # finditer carries on from the end of each match, so the whole line is scanned once
+    for match_output in master_pattern.finditer(working_text):
+        group_name = match_output.lastgroup
+        if group_name == MISMATCH_GROUP:
+            raise Exception(f"token not found for beginning of '{working_text[match_output.start():]}'")
+        token_type, value_group = master_group_token_types[group_name]
+        if group_name == WORD_GROUP:
+            new_token = Token(*resolve_word(match_output.group(group_name)))
+        elif value_group:
+            new_token = Token(token_type, match_output.group(value_group))
+        else:
+            new_token = Token(token_type, None)
+        token_list.append(new_token)
+    token_list.append(Token(END, None))
+    return token_list
+
 
 # ------------------------------ AST NODES ------------------------------ #
+# AST nodes are never changed once they have been made, so leaf nodes with the same type and 
+#   value are shared (see get_leaf_node) and operator nodes hold their children in a tuple
 class Leaf_node:
+    # leaf nodes are held weakly by interned_leaf_nodes
+    __slots__ = ("type", "value", "__weakref__")
+
     def __init__(self, token):
         # token will be of type token, which will define what type of value 
         # is held in the leaf node
@@ -80,9 +161,11 @@ class Leaf_node:
         return self.__str__()
 
 class Operator_node:
+    __slots__ = ("type", "child_nodes")
+
     def __init__(self, operation, child_nodes):
         self.type = operation
-        self.child_nodes = child_nodes
+        self.child_nodes = tuple(child_nodes)
     
     # prints out the node type followed by every child node in brackets
     # used for debugging and error messages
@@ -96,6 +179,77 @@ class Operator_node:
     def __repr__(self):
         return self.__str__()
 
+# an operator node whose operand types have been worked out before the program is run (see 
+#   infer_types), it holds the implementation of its operation specialised for those types
+class Typed_operator_node(Operator_node):
+    __slots__ = ("operand_types", "operand_indices", "implementation")
+
+    def __init__(self, operation, child_nodes, operand_types, operand_indices, implementation):
+        super().__init__(operation, child_nodes)
+        # the virtual variable class of each operand, and which child node each operand is
+        self.operand_types = operand_types
+        self.operand_indices = operand_indices
+        self.implementation = implementation
+
+# an operator node of one of a few common shapes, which is run in one step by its fused 
+#   operation (see Operation Fusion) rather than node by node
+# it keeps the type and child nodes of the node it replaces, which is kept as original_node 
+#   for anything that runs nodes some other way
+class Fused_operator_node(Operator_node):
+    __slots__ = ("original_node", "fused_operation", "implementation", "condition")
+
+    def __init__(self, original_node, fused_operation, implementation, condition=None):
+        super().__init__(original_node.type, original_node.child_nodes)
+        self.original_node = original_node
+        self.fused_operation = fused_operation
+        # takes the virtual environment and gives the token the node is condensed into
+        self.implementation = implementation
+        # for fused comparisons, takes the virtual environment and gives the result as a python bool
+        self.condition = condition
+
+# used so that leaf nodes no AST uses any more are forgotten
+from weakref import WeakValueDictionary
+
+# every leaf node made by the parser, by type and value, so that repeated literals and 
+#   names in a program all use the one leaf node
+# the nodes are held weakly, a leaf node stays in the table while an AST that is kept (by the 
+#   line AST cache, an incremental parser or a running program) uses it and is dropped after
+#   that, so the literals of programs and edits that are finished with don't build up
+interned_leaf_nodes = WeakValueDictionary()
+
+# returns the leaf node for a token, only making a new one the first time its type and value are seen
+def get_leaf_node(token):
+    leaf_key = (token.type, token.value)
+    my_node = interned_leaf_nodes.get(leaf_key)
+    if my_node == None:
+        my_node = Leaf_node(token)
+        interned_leaf_nodes[leaf_key] = my_node
+    return my_node
+
+# --- Compact AST Form --- #
+
+# ASTs are converted to nested tuples of plain values when they need to be sent between 
+#   processes, as these are far quicker to pickle than the node objects
+# a leaf node becomes (type code, value) and an operator node becomes (type code, child tuple),
+#   leaf values are always strings or None so the two cannot be confused
+def compact_AST(my_AST):
+    if type(my_AST) == Leaf_node:
+        compact_node = (int(my_AST.type), my_AST.value)
+    else:
+        compact_node = (int(my_AST.type), tuple(compact_AST(child_node) for child_node in my_AST.child_nodes))
+    return compact_node
+
+# rebuilds the AST from its compact form
+def expand_AST(compact_node):
+    if type(compact_node[1]) == tuple:
+        my_AST = Operator_node(token_types[compact_node[0]], [expand_AST(child_node) for child_node in compact_node[1]])
+    else:
+        # a compact leaf equals the key of its shared leaf node, as type codes are integers
+        my_AST = interned_leaf_nodes.get(compact_node)
+        if my_AST == None:
+            my_AST = get_leaf_node(Token(token_types[compact_node[0]], compact_node[1]))
+    return my_AST
+
 
 # ------------------------------ PARSER ------------------------------ #
 # base_token_list is a list of tokens which has been lexed which will 
@@ -103,49 +257,108 @@ class Operator_node:
 # form_AST is applied recursively, with each pass using split_token_list
 #   to break the token list into lists that will form a descendant tree
 #   base case is any value token on its own, this will create a leaf node
-def form_AST(base_token_list):
+# bracket_states is the result of find_bracket_states for the whole line's token list, 
+#   it is worked out once and shared by every sublist, offset is where the sublist begins 
+#   in the whole line's token list
+# the parser engines are chosen by the PARSER_ENGINE flag at the bottom of this file, the 
+#   precedence climbing parser only handles token lists which are an expression and leaves 
+#   everything else to the structure graphs
+GRAPH_PARSER = "graph parser"
+PRECEDENCE_CLIMBING_PARSER = "precedence climbing parser"
+
+def form_AST(base_token_list, bracket_states=None, offset=0):
     # checking if this is an empty list
     if len(base_token_list) == 1:
-        my_node = Leaf_node(Token("empty line", None))
+        my_node = get_leaf_node(Token(EMPTY_LINE, None))
     # checking if this is a leaf node, the last token in a token list will always
     #   be an END type so a single item list has length 2
     elif len(base_token_list) == 2:
         # creates a leaf node with token type and value of the remaining token
         final_token = base_token_list[0]
-        my_node = Leaf_node(final_token)
+        my_node = get_leaf_node(final_token)
+    elif PARSER_ENGINE == PRECEDENCE_CLIMBING_PARSER and is_expression(base_token_list):
+        my_node = Expression_parser(base_token_list).parse()
+        # the structure graphs are left to deal with expressions that are invalid
+        if my_node == None:
+            my_node = form_AST_with_graphs(base_token_list, bracket_states, offset)
+    elif PARSER_ENGINE in [GRAPH_PARSER, PRECEDENCE_CLIMBING_PARSER]:
+        my_node = form_AST_with_graphs(base_token_list, bracket_states, offset)
     else:
-        # operation_token is the token of this operator node
-        # child_token_lists is a list of all the lists of tokens that are children 
-        #   of this node
-        operation, child_token_lists = split_token_list(base_token_list)
-        child_nodes = []
-        for token_list in child_token_lists:
-            # takes each child list, recursively creates a descendant tree for it and 
-            #   adds it to child_nodes
-            new_node = form_AST(token_list)
-            child_nodes.append(new_node)
-        my_node = Operator_node(operation, child_nodes)
+        raise Exception(f"Invalid parser engine: {PARSER_ENGINE}")
+    return my_node
+
+# forms the node for a token list of more than one token using the structure graphs
+def form_AST_with_graphs(base_token_list, bracket_states, offset):
+    if bracket_states == None:
+        bracket_states = find_bracket_states(base_token_list)
+    # operation_token is the token of this operator node
+    # child_token_lists is a list of all the lists of tokens that are children 
+    #   of this node, child_offsets is where each begins in the whole line
+    operation, child_token_lists, child_offsets = split_token_list(base_token_list, bracket_states, offset)
+    child_nodes = []
+    for index in range(len(child_token_lists)):
+        # takes each child list, recursively creates a descendant tree for it and 
+        #   adds it to child_nodes
+        new_node = form_AST(child_token_lists[index], bracket_states, child_offsets[index])
+        child_nodes.append(new_node)
+    my_node = Operator_node(operation, child_nodes)
     return my_node
 
 # Structure graphs are used to detect patterns for each valid operation and capture the 
 #   correct information to create an AST node for it
 from structureGraphsLib import *
 
-def split_token_list(base_token_list):
+# how each bracket token changes the bracket counts, the counts are, in order, curved, 
+#   square, curled and triangle brackets
+BRACKET_COUNT_CHANGES = {
+    OPENING_CURVED_BRACKET : (0, 1),
+    CLOSING_CURVED_BRACKET : (0, -1),
+    OPENING_SQUARE_BRACKET : (1, 1),
+    CLOSING_SQUARE_BRACKET : (1, -1),
+    OPENING_CURLED_BRACKET : (2, 1),
+    CLOSING_CURLED_BRACKET : (2, -1),
+    OPENING_TRIANGLE_BRACKET : (3, 1),
+    CLOSING_TRIANGLE_BRACKET : (3, -1)
+}
+
+# a pre-pass over a line's token list which finds the bracket counts before each token, 
+#   counting from the start of the line
+# each distinct set of counts is given a number, so two positions have the same number only 
+#   if every bracket count is the same at both. This means checking whether the brackets 
+#   between two positions are balanced is a single comparison
+# the output has one more item than the token list, the counts after the last token
+def find_bracket_states(token_list):
+    bracket_counts = [0,0,0,0]
+    state_numbers = {}
+    bracket_states = []
+    for token in token_list + [None]:
+        counts = tuple(bracket_counts)
+        bracket_states.append(state_numbers.setdefault(counts, len(state_numbers)))
+        if token != None and token.type in BRACKET_COUNT_CHANGES:
+            count_index, change = BRACKET_COUNT_CHANGES[token.type]
+            bracket_counts[count_index] += change
+    return bracket_states
+
+def split_token_list(base_token_list, bracket_states=None, offset=0):
+    if bracket_states == None:
+        bracket_states = find_bracket_states(base_token_list)
+    # only the structure graphs whose starting edges accept the first token can match, 
+    #   first_token_index gives these (compiled) in the same order as structure_graphs
+    candidate_graphs = first_token_index.get(base_token_list[0].type, any_first_token_graphs)
     # setting up variables to iterate through the available structure graphs
     # when success is found to be true the iteration will immediately cease as the 
     #   correct formatting has been found
-    structure_graphs_index = 0
+    candidate_graphs_index = 0
     success = False
-    while structure_graphs_index < len(structure_graphs) and not success:
+    while candidate_graphs_index < len(candidate_graphs) and not success:
         # setting up variables for traversing one structure graph
-        # structure graph formatting notes can be found in structureGraphsLib.py
-        structure = structure_graphs[structure_graphs_index]
-        # structure[1][0] is the starting node
-        current_node_name = structure[1][0]
-        end_node_name = structure[1][1]
-        main_graph = structure[1][2]
-        current_node = main_graph.get(current_node_name)
+        # compiled structure graph formatting notes can be found in structureGraphsLib.py
+        structure = candidate_graphs[candidate_graphs_index]
+        # states are numbers, which index the graph's transition table
+        current_state = structure[1]
+        end_state = structure[2]
+        transitions = structure[3]
+        current_node = transitions[current_state]
         token_list_index = 0
         current_token = base_token_list[token_list_index]
         # captures are as so:
@@ -156,107 +369,254 @@ def split_token_list(base_token_list):
         #   followed by the new capture if it is a CAPTURE_ALONE node
         capture = []
         capture_buffer = []
+        # capture_offsets records where each capture begins in the whole line's token list
+        capture_offsets = []
+        capture_buffer_offset = None
         # Bracket counts are used for each capture buffer buildup. A left curved bracket 
         #   increases curved bracket count by one and a right curved bracket decreases it by one.
         # A capture buffer CANNOT be emptied and non-CAPTURE_TOGETHER nodes 
         #   cannot be processed until all bracket counts = 0
         # This ensures that groups enclosed by brackets cannot be separated during processing
-        # The individual counts within the bracket count array are, in order, curved, square, 
-        #   curled and triangle brackets
-        bracket_counts = [0,0,0,0]
+        # Only tokens passed along CAPTURE_TOGETHER edges are counted, and the counts are always 
+        #   zero when any other edge is taken. So the counts are zero exactly when the bracket 
+        #   state at the current token is the same as it was just after the last token taken by
+        #   another edge (balanced_state), which is found using the precomputed bracket states
+        balanced_state = bracket_states[offset]
         # if a structure graph is designated not matching, failure is set to True and the code 
         #   quickly exits this loop to analyse against the next structure graph
         failure = False
+        # the compiled graphs have been checked so every state other than the ending state has edges
         while not failure and not success:
-            if current_node:
-                # testing all valid edges for exiting the current node against the current token
-                match = False
-                index = 0
-                while not match and index < len(current_node):
-                    # checks if there is an inbalance of brackets or if this is a continuation of a 
-                    # CAPTURE_TOGETHER group, then checks if type is correct
-                    brackets_are_zero = all(counter == 0 for counter in bracket_counts)
-                    if (brackets_are_zero or current_node[index][2] == CAPTURE_TOGETHER) and \
-                        token_matches(current_token.type, current_node[index][1]):
-                        match = True
-                    else:
-                        index += 1
-                # carries out capture management and variable management if a valid exiting node exists
-                if match:
-                    capture_preference = current_node[index][2]
-                    if capture_preference == CAPTURE_TOGETHER:
-                        # managing bracket counts
-                        current_token_type = current_token.type
-                        if current_token_type == OPENING_CURVED_BRACKET:
-                            bracket_counts[0] += 1
-                        elif current_token_type == CLOSING_CURVED_BRACKET:
-                            bracket_counts[0] -= 1
-                        elif current_token_type == OPENING_SQUARE_BRACKET:
-                            bracket_counts[1] += 1
-                        elif current_token_type == CLOSING_SQUARE_BRACKET:
-                            bracket_counts[1] -= 1
-                        elif current_token_type == OPENING_CURLED_BRACKET:
-                            bracket_counts[2] += 1
-                        elif current_token_type == CLOSING_CURLED_BRACKET:
-                            bracket_counts[2] -= 1
-                        elif current_token_type == OPENING_TRIANGLE_BRACKET:
-                            bracket_counts[3] += 1
-                        elif current_token_type == CLOSING_TRIANGLE_BRACKET:
-                            bracket_counts[3] -= 1
-                        capture_buffer.append(current_token)
-                    else:
-                        # managing captures:
-                        # empties the capture buffer as a new capture and inserts the latest value 
-                        #   if it is classified as capture alone
-                        if capture_buffer:
-                            capture.append(capture_buffer + [Token(END, None)])
-                            capture_buffer = []
-                        if capture_preference == CAPTURE_ALONE:
-                            capture.append([current_token] + [Token(END, None)])
-                        elif capture_preference == NO_CAPTURE:
-                            pass
-                        else:
-                            raise Exception(f"Invalid capture preference: {capture_preference}")
-                    current_node_name = current_node[index][0]
-                    current_node = main_graph.get(current_node_name)
-                    # detecting if the graph has been completed
-                    if current_node_name == end_node_name:
-                        success = True
-                    # detecting if out of tokens but graph is not yet completed
-                    elif token_list_index == len(base_token_list)-1:
-                        failure = True
-                    else:
-                        # making variables correct for next iteration since no completion state 
-                        #   has been discovered
-                        token_list_index += 1
-                        current_token = base_token_list[token_list_index]
+            # testing all valid edges for exiting the current node against the current token
+            match = False
+            index = 0
+            while not match and index < len(current_node):
+                # checks if there is an inbalance of brackets or if this is a continuation of a 
+                # CAPTURE_TOGETHER group, then checks if type is correct
+                brackets_are_zero = bracket_states[offset + token_list_index] == balanced_state
+                edge_label = current_node[index][1]
+                if (brackets_are_zero or current_node[index][2] == CAPTURE_TOGETHER_CODE) and \
+                    (edge_label == ANY_LABEL or current_token.type in edge_label):
+                    match = True
+                else:
+                    index += 1
+            # carries out capture management and variable management if a valid exiting node exists
+            if match:
+                capture_code = current_node[index][2]
+                if capture_code == CAPTURE_TOGETHER_CODE:
+                    if not capture_buffer:
+                        capture_buffer_offset = offset + token_list_index
+                    capture_buffer.append(current_token)
                 else:
+                    # managing captures:
+                    # empties the capture buffer as a new capture and inserts the latest value 
+                    #   if it is classified as capture alone
+                    if capture_buffer:
+                        capture.append(capture_buffer + [Token(END, None)])
+                        capture_offsets.append(capture_buffer_offset)
+                        capture_buffer = []
+                    if capture_code == CAPTURE_ALONE_CODE:
+                        capture.append([current_token] + [Token(END, None)])
+                        capture_offsets.append(offset + token_list_index)
+                    # the bracket counts start again from zero after this token
+                    balanced_state = bracket_states[offset + token_list_index + 1]
+                current_state = current_node[index][0]
+                current_node = transitions[current_state]
+                # detecting if the graph has been completed
+                if current_state == end_state:
+                    success = True
+                # detecting if out of tokens but graph is not yet completed
+                elif token_list_index == len(base_token_list)-1:
                     failure = True
+                else:
+                    # making variables correct for next iteration since no completion state 
+                    #   has been discovered
+                    token_list_index += 1
+                    current_token = base_token_list[token_list_index]
             else:
-                raise Exception(f"no node in {structure[0]} with code {current_node}")
+                failure = True
         # move on to next structure graph
         if not success:
-            structure_graphs_index += 1
+            candidate_graphs_index += 1
     if not success:
         raise Exception(f"no valid pattern found for {base_token_list}")
-    return structure_graphs[structure_graphs_index][0], capture
+    return structure[0], capture, capture_offsets
 
-# Matches a string to another string or checks if it matches an item in a list 
-# of strings, depending on what variable type is inputted as to_match
+# Matches a type to another type or checks if it matches an item in a list 
+# of types, depending on what variable type is inputted as to_match
 # In this project it is used to compare token types and lists of types from 
 # tokenTypesDefinitionLib.py against each other
 def token_matches(token_type, to_match):
     if to_match == ANY:
         answer = True
-    elif type(to_match) == str:
-        answer = (token_type == to_match)
     elif type(to_match) == list:
         answer = False
         for item in to_match:
             if item == token_type:
                 answer = True
+    else:
+        answer = (token_type == to_match)
     return answer
 
+# --- Precedence Climbing Expression Parser --- #
+
+# An alternative to the structure graphs for token lists which are only an expression, made up
+#   of values, curved brackets and operators. It reads the token list once from left to right 
+#   rather than re-splitting every sublist, and builds the same AST the structure graphs would.
+# The structure graphs split a list at the first operator outside of brackets belonging to 
+#   the earliest graph in structure_graphs, so an operator binds more loosely the earlier its 
+#   graph is and operators from the same graph group to the right, e.g. a - b - c is a - (b - c).
+#   Each operator's priority is the position of its graph so the two parsers always agree.
+GRAPH_PRIORITIES = {structure[0]: priority for priority, structure in enumerate(structure_graphs)}
+
+# the operation each binary operator forms, its priority and whether the operator token is 
+#   kept as a child node, as the logic and comparison graphs capture it
+EXPRESSION_OPERATORS = {}
+for operator_types, operation, keeps_operator in [
+        (BINARY_BOOLEAN_LOGIC_KEYWORDS, BINARY_BOOLEAN_LOGICAL_STATEMENT, True),
+        (ALL_BOOLEAN_COMPARATORS, BOOLEAN_COMPARISON, True),
+        ([MINUS], SUBTRACTION, False),
+        ([PLUS], CONCATENATION_OR_ADDITION, False),
+        ([MULTIPLY], MULTIPLICATION, False),
+        ([DIVIDE], DIVISION, False),
+        ([INTEGER_DIVIDE], INTEGER_DIVISION, False),
+        ([MODULO], MODULO_DIVIDE, False)]:
+    for operator_type in operator_types:
+        EXPRESSION_OPERATORS[operator_type] = (operation, GRAPH_PRIORITIES[operation], keeps_operator)
+
+NOT_PRIORITY = GRAPH_PRIORITIES[SINGLE_BOOLEAN_LOGICAL_STATEMENT]
+
+# every token type that can appear in an expression
+EXPRESSION_TOKEN_TYPES = set(VALUE_TYPES + list(EXPRESSION_OPERATORS) + SINGLE_BOOLEAN_LOGIC_KEYWORDS \
+    + [OPENING_CURVED_BRACKET, CLOSING_CURVED_BRACKET, END])
+
+# checks if a token list could be an expression, no graph before the logic graphs can match 
+#   a list made only of these token types except for the surrounding brackets graph
+def is_expression(token_list):
+    for token in token_list:
+        if token.type not in EXPRESSION_TOKEN_TYPES:
+            return False
+    return True
+
+# raised when the token list turns out not to be a valid expression
+class Invalid_expression(Exception):
+    pass
+
+class Expression_parser:
+    def __init__(self, token_list):
+        self.token_list = token_list
+        self.index = 0
+
+    # returns the AST of the whole token list, or None if it is not a valid expression
+    def parse(self):
+        try:
+            my_node = self.parse_expression(0)
+            if self.token_list[self.index].type != END:
+                raise Invalid_expression()
+        except Invalid_expression:
+            my_node = None
+        return my_node
+
+    # parses an operand followed by every operator (and its right hand side) with at least 
+    #   the minimum priority
+    def parse_expression(self, minimum_priority):
+        my_node = self.parse_operand(minimum_priority)
+        operator_token = self.token_list[self.index]
+        while operator_token.type in EXPRESSION_OPERATORS and EXPRESSION_OPERATORS[operator_token.type][1] >= minimum_priority:
+            operation, priority, keeps_operator = EXPRESSION_OPERATORS[operator_token.type]
+            self.index += 1
+            # the right hand side takes any following operators of the same priority, 
+            #   grouping them to the right
+            right_node = self.parse_expression(priority)
+            if keeps_operator:
+                my_node = Operator_node(operation, [my_node, get_leaf_node(operator_token), right_node])
+            else:
+                my_node = Operator_node(operation, [my_node, right_node])
+            operator_token = self.token_list[self.index]
+        return my_node
+
+    # parses a value, a NOT statement or an expression in brackets
+    def parse_operand(self, minimum_priority):
+        operand_token = self.token_list[self.index]
+        self.index += 1
+        if operand_token.type in SINGLE_BOOLEAN_LOGIC_KEYWORDS:
+            # the graphs only see a NOT at the start of a sublist, so it takes everything
+            #   that the sublist it starts would hold
+            negated_node = self.parse_expression(max(NOT_PRIORITY, minimum_priority))
+            my_node = Operator_node(SINGLE_BOOLEAN_LOGICAL_STATEMENT, [get_leaf_node(operand_token), negated_node])
+        elif operand_token.type == OPENING_CURVED_BRACKET:
+            bracketed_node = self.parse_expression(0)
+            if self.token_list[self.index].type != CLOSING_CURVED_BRACKET:
+                raise Invalid_expression()
+            self.index += 1
+            my_node = Operator_node(BRACKETS, [bracketed_node])
+        elif operand_token.type in VALUE_TYPES:
+            my_node = get_leaf_node(operand_token)
+        else:
+            raise Invalid_expression()
+        return my_node
+
+# --- Line AST Cache --- #
+
+# used to keep the cache entries in order of use
+from collections import OrderedDict
+
+# many lines are repeated exactly within and across programs (ENDIF, count = count + 1, ...)
+#   so the AST made for each line is cached against its stripped text and reused
+# the lexer and parser engines are part of each line's key, so switching either engine while
+#   running never gives back an AST made by the engine used before
+# the least recently used line is forgotten once the cache is full
+# the cached ASTs are shared between every line they are used for, this is safe as nothing 
+#   after the parser changes an AST, process_AST only ever reads them
+class Line_AST_cache(object):
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # returns the AST for the line, lexing and parsing it only if it isn't already cached
+    def get_AST(self, code_line):
+        stripped_line = code_line.strip()
+        key = (LEXER_ENGINE, PARSER_ENGINE, stripped_line)
+        AST = self.entries.get(key)
+        if AST != None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            AST = form_AST(process_text(stripped_line))
+            if self.max_size > 0:
+                self.entries[key] = AST
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        return AST
+
+    # changes the size of the cache, forgetting the least recently used lines if it shrinks
+    def resize(self, max_size):
+        self.max_size = max_size
+        while len(self.entries) > max(self.max_size, 0):
+            self.entries.popitem(last=False)
+
+    # forgets every line and resets the counters
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        return f"Line_AST_cache(size {len(self.entries)}/{self.max_size}, {self.hits} hits, {self.misses} misses)"
+    def __repr__(self):
+        return self.__str__()
+
+# lexes and parses a single line, using the line AST cache if it is turned on
+def parse_line(code_line):
+    if USE_LINE_AST_CACHE:
+        AST = line_AST_cache.get_AST(code_line)
+    else:
+        AST = form_AST(process_text(code_line))
+    return AST
+
 
 # ------------------------------ VIRTUAL ENVIRONMENT ------------------------------ #
 
@@ -274,6 +634,33 @@ IF_FRAME = "If statement frame type"
 WHILE_FRAME = "While statement frame type"
 FOR_FRAME = "For statement frame type"
 
+# the slots of the frames opened for one block of the program, made by the resolver (see 
+#   Variable Resolution), layouts never change once the program starts running
+class Frame_layout(object):
+    __slots__ = ("slot_names", "slot_indices")
+
+    def __init__(self):
+        self.slot_names = []
+        self.slot_indices = {}
+
+    def add_slot(self, name):
+        if name not in self.slot_indices:
+            self.slot_indices[name] = len(self.slot_names)
+            self.slot_names.append(name)
+
+# what the resolver has worked out for a line, the address of each variable the line uses 
+#   whose frame is known, given as the index of the frame in the frame stack, the slot and 
+#   the layout the frame must have, and the layout of the frame the line opens
+class Line_scope(object):
+    __slots__ = ("addresses", "opened_layout")
+
+    def __init__(self, addresses, opened_layout):
+        self.addresses = addresses
+        self.opened_layout = opened_layout
+
+# the scope of lines of programs which haven't been resolved, every variable is found by name
+NO_LINE_SCOPE = Line_scope({}, None)
+
 # a stack frame is an object used within a virtual environment's frame stack,
 #   each frame added represents the entering of a clause or statement
 #   and the removal of one represents the closing of it.
@@ -282,36 +669,63 @@ FOR_FRAME = "For statement frame type"
 # Depending on the type of frame, variable values may be preserved on frame
 #   destruction by placing them in the frame below but this is not the case for 
 #   define or call frames and for the iterated variable in a for frame.
+# Variables given a slot by the frame's layout (see Variable Resolution) are held in its array 
+#   of slot values, an empty slot is None, every other variable is held by name in values
 class Stack_frame(object):
     # odd-looking __init__ is necessary so that deepcopy functions correctly
-    def __init__(self, values, subroutines, frame_type, condition):
+    def __init__(self, values, subroutines, frame_type, condition, layout=None, slot_values=None):
         if values == None:
             self.values = {}
             self.subroutines = {}
             self.type = frame_type
             self.condition = condition
+            self.layout = layout
+            if layout == None:
+                self.slot_values = []
+            else:
+                self.slot_values = [None]*len(layout.slot_names)
         else:
             self.values = values
             self.subroutines = subroutines
             self.type = frame_type
             self.condition = condition
+            self.layout = layout
+            self.slot_values = slot_values
+
+    # gives the slot the frame holds the variable in, or None if it is held by name
+    def get_slot(self, name):
+        if self.layout == None:
+            return None
+        return self.layout.slot_indices.get(name)
 
     # checks if the variable name is a variable in the stack frame
     def variable_in(self, name):
-        if name in self.values.keys():
-            return True
+        slot = self.get_slot(name)
+        if slot != None:
+            return self.slot_values[slot] != None
+        return name in self.values
 
     # returns the value of the variable whose name is requested
     def read_item_value(self, name):
         if not self.variable_in(name):
             raise Exception(f"Variable {name} does not exist")
+        slot = self.get_slot(name)
+        if slot != None:
+            return self.slot_values[slot]
+        return self.values[name]
+
+    # stores the variable in its slot if it has one, otherwise by name
+    def store_item(self, item, name):
+        slot = self.get_slot(name)
+        if slot != None:
+            self.slot_values[slot] = item
         else:
-            return self.values[name]
+            self.values[name] = item
 
     # set item can only change variables that already exist in the frame
     def set_item_value(self, item, name):
         if self.variable_in(name):
-            self.values[name] = item
+            self.store_item(item, name)
         else:
             raise Exception(f"Variable {name} does not exist")
     
@@ -319,16 +733,23 @@ class Stack_frame(object):
     #   pre-existing one
     def make_item(self, item, name):
         if not self.variable_in(name):
-            self.values[name] = item
+            self.store_item(item, name)
         else:
             raise Exception(f"Variable {name} already exists")
 
     # removes a variable from the frame
     def remove_item(self, name):
-        self.values.pop(name)
+        slot = self.get_slot(name)
+        if slot != None:
+            self.slot_values[slot] = None
+        else:
+            self.values.pop(name)
 
     def get_variable_names(self):
-        return self.values.keys()
+        names = list(self.values.keys())
+        if self.layout != None:
+            names += [name for name, item in zip(self.layout.slot_names, self.slot_values) if item != None]
+        return names
 
     # __deepcopy__ adapted from StackOverflow answer: https://stackoverflow.com/a/46939443 
     # by: https://stackoverflow.com/users/541136/russia-must-remove-putin
@@ -336,11 +757,14 @@ class Stack_frame(object):
         id_self = id(self)
         _copy = memo.get(id_self)
         if _copy is None:
+            # layouts never change so are shared by the copy
             _copy = type(self)(
                 copy.deepcopy(self.values, memo),
                 copy.deepcopy(self.subroutines, memo),
                 copy.deepcopy(self.type, memo),
-                copy.deepcopy(self.condition, memo))
+                copy.deepcopy(self.condition, memo),
+                self.layout,
+                copy.deepcopy(self.slot_values, memo))
             memo[id_self] = _copy 
         return _copy
 
@@ -350,8 +774,8 @@ class Stack_frame(object):
         if self.condition:
             output_string += f", conditional on {self.condition}"
         output_string += ":\n"
-        for key, item in self.values.items():
-            output_string += indent(f"{str(key)}: {str(item)}\n", "   ")
+        for key in self.get_variable_names():
+            output_string += indent(f"{str(key)}: {str(self.read_item_value(key))}\n", "   ")
         return output_string
     def __repr__(self):
         return self.__str__()
@@ -360,15 +784,17 @@ class Stack_frame(object):
 
 class Virtual_environment(object):
     # odd-looking __init__ is necessary so that deepcopy functions correctly
-    def __init__(self, frame_stack):
+    def __init__(self, frame_stack, base_layout=None):
         if frame_stack:
             self.frame_stack = frame_stack
         else:
-            self.frame_stack = [Stack_frame(None, None, BASE_FRAME, None)]
+            self.frame_stack = [Stack_frame(None, None, BASE_FRAME, None, base_layout)]
+        # the scope of the line being run, which is set by whatever is running the program
+        self.line_scope = NO_LINE_SCOPE
 
-    # opens a new stack frame
+    # opens a new stack frame, with the layout the current line gives the frame it opens
     def new_stack_frame(self, frame_type, condition):
-        self.frame_stack.append(Stack_frame(None, None, frame_type, condition))
+        self.frame_stack.append(Stack_frame(None, None, frame_type, condition, self.line_scope.opened_layout))
     
     # closes the top stack frame, returning its contents
     # this is used internally only
@@ -386,12 +812,12 @@ class Virtual_environment(object):
     # closes the top stack frame, transferring all variables within it to the 
     #   new top stack frame
     def constructive_pop_stack_frame(self):
-        temp_frame_copy = copy.deepcopy(self.stack_frame_pop())
-        names = temp_frame_copy.get_variable_names()
+        frame = self.stack_frame_pop()
+        names = frame.get_variable_names()
         for name in names:
-            value = temp_frame_copy.read_item_value(name).convert_to_token()
+            value = frame.read_item_value(name).convert_to_token()
             self.make_variable(value, name)
-        return temp_frame_copy.type, temp_frame_copy.condition
+        return frame.type, frame.condition
 
     # iterates through all of the frames in the frame stack from top to bottom looking 
     #   for the requested variable until a frame that shouldn't be iterated past is reached
@@ -420,13 +846,47 @@ class Virtual_environment(object):
             # all that is needed is the frame in which the variable is contained
             return frame_index
 
+    # finds the frame holding a variable using the address the current line gives it, returns 
+    #   None if it has no address, the frame at its address doesn't have the layout it was 
+    #   resolved for or its slot is empty, for the variable to be found by name instead
+    def find_resolved_frame(self, input_name_keyword):
+        address = self.line_scope.addresses.get(input_name_keyword)
+        if address == None:
+            return None
+        frame_index, slot, layout = address
+        if frame_index >= len(self.frame_stack):
+            return None
+        frame = self.frame_stack[frame_index]
+        if frame.layout is not layout or frame.slot_values[slot] == None:
+            return None
+        return frame
+
+    # gives the virtual variable held by the variable, which must not be changed
+    def read_virtual_variable(self, input_name_keyword):
+        address = self.line_scope.addresses.get(input_name_keyword)
+        if address != None:
+            # the same checks as find_resolved_frame, repeated as this is the most common lookup
+            frame_index, slot, layout = address
+            if frame_index < len(self.frame_stack):
+                frame = self.frame_stack[frame_index]
+                if frame.layout is layout:
+                    value = frame.slot_values[slot]
+                    if value != None:
+                        return value
+        frame_index = self.find_variable(input_name_keyword)
+        return self.frame_stack[frame_index].read_item_value(input_name_keyword)
+
+    # gives the frame holding the variable, found by its address if it can be
+    def find_variable_frame(self, input_name_keyword):
+        frame = self.find_resolved_frame(input_name_keyword)
+        if frame == None:
+            frame = self.frame_stack[self.find_variable(input_name_keyword)]
+        return frame
+
     # fetches the current token-formatted value of the variable name specified
     def fetch_virtual_variable(self, input_name_keyword):
         # outputting the variable value as a token if found
-        frame_index = self.find_variable(input_name_keyword)
-        containing_stack_frame = self.frame_stack[frame_index]
-        output_value = containing_stack_frame.read_item_value(input_name_keyword).convert_to_token()
-        return output_value
+        return self.read_virtual_variable(input_name_keyword).convert_to_token()
 
     # sets the value of the specified variable
     def set_variable(self, input_name_keyword, my_input):
@@ -438,13 +898,13 @@ class Virtual_environment(object):
         #   the virtual environment
         converted_virtual_var = convert_to_virtual_variable(my_input)
         
-        # locating the variable's position in the frame stack
-        frame_index = self.find_variable(input_name_keyword)
+        # locating the variable's frame in the frame stack
+        frame = self.find_variable_frame(input_name_keyword)
 
         # ensuring the variable is of the type of the variable
-        original_value = self.frame_stack[frame_index].read_item_value(input_name_keyword)
+        original_value = frame.read_item_value(input_name_keyword)
         if type(original_value) == type(converted_virtual_var):
-            self.frame_stack[frame_index].set_item_value(converted_virtual_var, input_name_keyword)
+            frame.store_item(converted_virtual_var, input_name_keyword)
         else:
             raise Exception(f"Wrong type: {original_value} and {converted_virtual_var} \
                 are not of the same type")
@@ -503,6 +963,28 @@ def process_AST(my_AST, virtual_environment):
     if type(my_AST) == Leaf_node:
         # if the AST is a leaf node then it can be treated as a lone Token
         summary_token = Token(my_AST.type, my_AST.value)
+    elif type(my_AST) == Typed_operator_node and my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT:
+        # the right operand is only worked out if the left one doesn't decide the result (see
+        #   Short Circuiting)
+        left_token, virtual_environment = process_AST(my_AST.child_nodes[0], virtual_environment)
+        left_value = get_operand_value(left_token, virtual_environment)
+        summary_token = get_short_circuit_value_result(left_value, my_AST.child_nodes[1].type)
+        if summary_token == None:
+            right_token, virtual_environment = process_AST(my_AST.child_nodes[2], virtual_environment)
+            summary_token = my_AST.implementation(left_value, get_operand_value(right_token, virtual_environment))
+    elif type(my_AST) == Typed_operator_node:
+        # the operand types are already known so the values of the operands are passed
+        #   straight to the operation's specialised implementation
+        my_processed_tokens = []
+        for index in my_AST.operand_indices:
+            new_value, virtual_environment = process_AST(my_AST.child_nodes[index], virtual_environment)
+            my_processed_tokens.append(new_value)
+        operand_values = [get_operand_value(token, virtual_environment) for token in my_processed_tokens]
+        summary_token = my_AST.implementation(*operand_values)
+    elif type(my_AST) == Fused_operator_node:
+        summary_token = my_AST.implementation(virtual_environment)
+    elif my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT and len(my_AST.child_nodes) == 3:
+        summary_token, virtual_environment = process_logical_statement_AST(my_AST, virtual_environment)
     else:
         my_child_nodes = my_AST.child_nodes
         # my_child_values will hold the resultant values after each child node is processed
@@ -518,15 +1000,39 @@ def process_AST(my_AST, virtual_environment):
             virtual_environment)
     return summary_token, virtual_environment
 
+# processes a binary boolean logical statement, only processing its right operand if its left
+#   operand and logical keyword don't decide the result (see Short Circuiting)
+def process_logical_statement_AST(my_AST, virtual_environment):
+    my_processed_tokens = []
+    for child_node in my_AST.child_nodes:
+        if child_node.type in ROOT_NODE_TYPES:
+            raise Exception(f"The root node {child_node} has been passed to a {my_AST.type}")
+        new_value, virtual_environment = process_AST(child_node, virtual_environment)
+        my_processed_tokens.append(new_value)
+        if len(my_processed_tokens) == 2:
+            summary_token = get_short_circuit_result(make_not_variable_name(my_processed_tokens[0], \
+                virtual_environment), my_processed_tokens[1])
+            if summary_token != None:
+                return summary_token, virtual_environment
+    return do_operation(my_AST.type, my_processed_tokens, virtual_environment)
+
 # used to convert variable references to their values as needed
 def make_not_variable_name(input_token, virtual_environment):
     if input_token.type == NAME_KEYWORD:
         output = virtual_environment.fetch_virtual_variable(input_token.value)
     else:
         output = input_token
-    output = copy.deepcopy(output)
     return output
 
+# gives the python value of an operand of a typed operator node, variables are read without 
+#   being copied as the specialised implementations never change the values they are given
+def get_operand_value(input_token, virtual_environment):
+    if input_token.type == NAME_KEYWORD:
+        value = virtual_environment.read_virtual_variable(input_token.value).get_value()
+    else:
+        value = convert_to_virtual_variable(input_token).get_value()
+    return value
+
 # Takes type tokens either standard value ones or virtual variable ones. 
 # Outputs the standard value or standard value equivalent
 def make_basic_type(token_type):
@@ -537,84 +1043,33 @@ def make_basic_type(token_type):
     else:
         raise Exception(f"cannot convert {token_type} to basic type")
 
+# the output of operations which don't output anything, tokens are never changed so one is shared
+NON_ACTIONABLE_ROOT_NODE_TOKEN = Token(NON_ACTIONABLE_ROOT_NODE, None)
+
 # this subroutine takes an operation and its inputs and carries it out, returning any 
 #   necessary outputs for any operation it is an operand of
+# the operation's handler is found in the operation handler table, its metadata decides 
+#   whether variable names are converted into their values and whether the handler is 
+#   given the virtual environment
 def do_operation(operation, input_token_list_original, virtual_environment):
-    output = None
-    input_token_list = copy.deepcopy(input_token_list_original)
-    # if statement to funnell the data to the correct subroutine
-    if operation == ASSIGNMENT:
-        virtual_environment = assignment_operation(input_token_list, virtual_environment)
-    elif operation == DECLARATION_NORMAL_WITH_VALUE:
-        virtual_environment = declaration_operation(input_token_list, virtual_environment)
-    elif operation == DECLARATION_NORMAL_WITHOUT_VALUE:
-        virtual_environment = declaration_without_value_operation(input_token_list, virtual_environment)
-    elif operation == FOR_STATEMENT:
-        virtual_environment, output = for_statement_operation(input_token_list, virtual_environment)
-    elif operation == ARRAY_APPEND:
-        virtual_environment = array_append_operation(input_token_list, virtual_environment)
-    elif operation == PRIORITY_QUEUE_ADD_ITEM:
-        virtual_environment = priority_queue_add_item_operation(input_token_list, virtual_environment)
-    elif operation == STACK_QUEUE_ADD_ITEM:
-        virtual_environment = stack_queue_add_item_operation(input_token_list, virtual_environment)
-    elif operation == STACK_QUEUE_ITEM_POP:
-        virtual_environment = stack_queue_pop_item_operation(input_token_list, virtual_environment)
-    elif operation == DICTIONARY_INSERT:
-        output = dictionary_insert_operation(input_token_list, virtual_environment)
-    elif operation == DICTIONARY_REMOVE:
-        output = dictionary_remove_operation(input_token_list, virtual_environment)
+    operation_handler = operation_handlers.get(operation)
+    if operation_handler == None:
+        raise Exception(f"Invalid operation: {operation}")
+    # operations that set a variable need the name of it, all others have their variable 
+    #   references converted into their actual values
+    # the inputs are not copied, virtual variables are never changed once they are in a token
+    #   (see Value ownership in virtualEnvironmentClassesLib)
+    if operation_handler.resolves_names:
+        input_token_list = [make_not_variable_name(input_token, virtual_environment) \
+            for input_token in input_token_list_original]
     else:
-        # all operations after this do not involve setting a variable value and as such all
-        # their variable references need to be converted into their actual values. For those 
-        # before this they need the name so they can define the variable
-        for index in range(len(input_token_list)):
-            input_token_list[index] = make_not_variable_name(input_token_list[index], virtual_environment)
-
-        # if statement to continue funnelling data to the correct operation subroutines
-        if operation == BRACKETS:
-            output = brackets_operation(input_token_list)
-        elif operation == IF_STATEMENT:
-            output = if_statement_operation(input_token_list)
-        elif operation == WHILE_STATEMENT:
-            output = while_statement_operation(input_token_list)
-        elif operation in [ARRAY, TUPLE, DICTIONARY]:
-            output = array_tuple_dict_operation(operation, input_token_list)
-        elif operation == CONCATENATION_OR_ADDITION:
-            output = concatenation_or_addition_operation(input_token_list)
-        elif operation == SUBTRACTION:
-            output = subtraction_operation(input_token_list)
-        elif operation == MULTIPLICATION:
-            output = multiplication_operation(input_token_list)
-        elif operation == DIVISION:
-            output = division_operation(input_token_list)
-        elif operation == INTEGER_DIVISION:
-            output = integer_division_operation(input_token_list)
-        elif operation == MODULO_DIVIDE:
-            output = modulo_division_operation(input_token_list)
-        elif operation == BOOLEAN_COMPARISON:
-            output = boolean_comparison_operation(input_token_list)
-        elif operation == BINARY_BOOLEAN_LOGICAL_STATEMENT:
-            output = binary_boolean_logical_statement_operation(input_token_list)
-        elif operation == SINGLE_BOOLEAN_LOGICAL_STATEMENT:
-            output = single_boolean_logical_statement_operation(input_token_list)
-        elif operation == STRING_LIST_READ_BY_INDEX:
-            output = string_list_read_by_index(input_token_list)
-        elif operation == LENGTH_CHECK:
-            output = length_check_operation(input_token_list)
-        elif operation == OUTPUT_CALL:
-            output = output_operation(input_token_list)
-        elif operation == STACK_QUEUE_ITEM_READ:
-            output = stack_queue_read_item_operation(input_token_list)
-        elif operation == DICTIONARY_LOOKUP:
-            output = dictionary_lookup_operation(input_token_list)
-        elif operation == DICTIONARY_KEY_LIST:
-            output = dictionary_key_list_operation(input_token_list, virtual_environment)
-        elif operation == DICTIONARY_PAIR:
-            output = dictionary_pair_operation(input_token_list)
-        else:
-            raise Exception(f"Invalid operation: {operation}")
+        input_token_list = input_token_list_original
+    if operation_handler.uses_environment:
+        output = operation_handler.function(input_token_list, virtual_environment)
+    else:
+        output = operation_handler.function(input_token_list)
     if output == None:
-        output = Token(NON_ACTIONABLE_ROOT_NODE, None)
+        output = NON_ACTIONABLE_ROOT_NODE_TOKEN
     return output, virtual_environment
 
 # changes an already existing virtual environment variable's value
@@ -626,7 +1081,6 @@ def assignment_operation(input_token_list, virtual_environment):
         value_to_assign = make_not_variable_name(input_token_list[1], virtual_environment)
         name_to_assign_to = input_token_list[0].value
         virtual_environment.set_variable(name_to_assign_to, value_to_assign)
-    return virtual_environment        
 
 # creates a new variable, of a specified type
 def declaration_operation(input_token_list, virtual_environment):
@@ -637,28 +1091,33 @@ def declaration_operation(input_token_list, virtual_environment):
         # data manipulation to get into correct formats
         declaration_type = input_token_list[0].type
         name_to_assign_to = input_token_list[1].value
-        type_to_assign = DECLARATION_TYPES_TO_BASIC_TYPES_DICT[declaration_type]
         value_token = make_not_variable_name(input_token_list[2], virtual_environment)
-        value_type = value_token.type
-        value_type_basic = make_basic_type(value_type)
-        value = value_token.value
-        # checking that the value is valid for the datatype
-        if type_to_assign == value_type_basic:
-            token_to_convert = Token(type_to_assign, value)
-            token_to_assign = convert_to_virtual_variable(token_to_convert).convert_to_token()
-        # special case for assigning values to floating points as numbers which don't 
-        #   contain decimal points can still be floats
-        elif(value_type_basic == DECIMAL_NUMBER or value_type_basic == INTEGER) and type_to_assign == FLOAT:
-            if value_type == VIRTUAL_INTEGER:
-                token_to_assign = value.convert_to_virtual_float().convert_to_token()
-            else:
-                token_to_convert = Token(type_to_assign, value)
-                token_to_assign = convert_to_virtual_variable(token_to_convert).convert_to_token()
-        else:
-            raise Exception(f"{value_token} cannot be assigned to a(n) {type_to_assign} variable")
+        token_to_assign = make_declaration_value(declaration_type, value_token)
         # creation of variable
         virtual_environment.make_variable(token_to_assign, name_to_assign_to)
-    return virtual_environment
+
+# gives the token of the value a variable declared with the declaration type and value is 
+#   created with
+def make_declaration_value(declaration_type, value_token):
+    type_to_assign = DECLARATION_TYPES_TO_BASIC_TYPES_DICT[declaration_type]
+    value_type = value_token.type
+    value_type_basic = make_basic_type(value_type)
+    value = value_token.value
+    # checking that the value is valid for the datatype
+    if type_to_assign == value_type_basic:
+        token_to_convert = Token(type_to_assign, value)
+        token_to_assign = convert_to_virtual_variable(token_to_convert).convert_to_token()
+    # special case for assigning values to floating points as numbers which don't 
+    #   contain decimal points can still be floats
+    elif(value_type_basic == DECIMAL_NUMBER or value_type_basic == INTEGER) and type_to_assign == FLOAT:
+        if value_type == VIRTUAL_INTEGER:
+            token_to_assign = value.convert_to_virtual_float().convert_to_token()
+        else:
+            token_to_convert = Token(type_to_assign, value)
+            token_to_assign = convert_to_virtual_variable(token_to_convert).convert_to_token()
+    else:
+        raise Exception(f"{value_token} cannot be assigned to a(n) {type_to_assign} variable")
+    return token_to_assign
 
 def declaration_without_value_operation(input_token_list, virtual_environment):
     if len(input_token_list) != 2:
@@ -667,13 +1126,17 @@ def declaration_without_value_operation(input_token_list, virtual_environment):
     else:
         # data manipulation to get into correct formats
         declaration_type = input_token_list[0].type
-        type_to_assign = DECLARATION_TYPES_TO_BASIC_TYPES_DICT[declaration_type]
-        token_to_convert = Token(type_to_assign, None)
-        token_to_assign = convert_to_virtual_variable(token_to_convert).convert_to_token()
+        token_to_assign = make_empty_declaration_value(declaration_type)
         name_to_assign_to = input_token_list[1].value
         # Creation of variable
         virtual_environment.make_variable(token_to_assign, name_to_assign_to)
-    return virtual_environment
+
+# gives the token of the value a variable declared with the declaration type and no value is
+#   created with
+def make_empty_declaration_value(declaration_type):
+    type_to_assign = DECLARATION_TYPES_TO_BASIC_TYPES_DICT[declaration_type]
+    token_to_convert = Token(type_to_assign, None)
+    return convert_to_virtual_variable(token_to_convert).convert_to_token()
 
 def for_statement_operation(input_token_list, virtual_environment):
     try:
@@ -693,7 +1156,7 @@ def for_statement_operation(input_token_list, virtual_environment):
                 token_to_send = Token(OPEN_FOR, [name, values_list])
     except Exception as e:
         if DEBUG_OUTPUTS : print(f"Error: {e}")
-    return virtual_environment, token_to_send
+    return token_to_send
 
 # bracketing removal
 def brackets_operation(input_token_list):
@@ -765,23 +1228,18 @@ def concatenation_or_addition_operation(input_token_list):
         value_2 = convert_to_virtual_variable(input_token_list[1])
         # strings
         if type(value_1) == String_virtual and type(value_2) == String_virtual:
-            value_1.concatenate(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.concatenate(value_2).convert_to_token()
         # arrays
         elif type(value_1) == Array_virtual and type(value_2) == Array_virtual:
-            value_1.join(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.join(value_2).convert_to_token()
         # detecting the different numerical combinations and carrying out the appropriate operations
         elif type(value_1) == Integer_virtual and type(value_2) == Integer_virtual:
-            value_1.integer_add(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.integer_add(value_2).convert_to_token()
         elif type(value_1) == Float_virtual and (type(value_2) == Integer_virtual or type(value_2) == Float_virtual):
-            value_1.add(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.add(value_2).convert_to_token()
         elif type(value_1) == Integer_virtual and type(value_2) == Float_virtual:
             value_1 = value_1.convert_to_virtual_float()
-            value_1.add(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.add(value_2).convert_to_token()
         else:
             raise Exception(f"Invalid operands for concatenation/addition: {value_1, value_2}")
     
@@ -796,15 +1254,12 @@ def subtraction_operation(input_token_list):
         value_2 = convert_to_virtual_variable(input_token_list[1])
         # detecting the different numerical combinations and carrying out the appropriate operations
         if type(value_1) == Integer_virtual and type(value_2) == Integer_virtual:
-            value_1.integer_subtract(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.integer_subtract(value_2).convert_to_token()
         elif type(value_1) == Float_virtual and (type(value_2) == Integer_virtual or type(value_2) == Float_virtual):
-            value_1.subtract(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.subtract(value_2).convert_to_token()
         elif type(value_1) == Integer_virtual and type(value_2) == Float_virtual:
             value_1 = value_1.convert_to_virtual_float()
-            value_1.subtract(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.subtract(value_2).convert_to_token()
         else:
             raise Exception(f"Invalid operands for subtraction: {value_1, value_2}")
 
@@ -819,15 +1274,12 @@ def multiplication_operation(input_token_list):
         value_2 = convert_to_virtual_variable(input_token_list[1])
         # detecting the different numerical combinations and carrying out the appropriate operations
         if type(value_1) == Integer_virtual and type(value_2) == Integer_virtual:
-            value_1.integer_multiply(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.integer_multiply(value_2).convert_to_token()
         elif type(value_1) == Float_virtual and (type(value_2) == Integer_virtual or type(value_2) == Float_virtual):
-            value_1.multiply(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.multiply(value_2).convert_to_token()
         elif type(value_1) == Integer_virtual and type(value_2) == Float_virtual:
             value_1 = value_1.convert_to_virtual_float()
-            value_1.multiply(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.multiply(value_2).convert_to_token()
         else:
             raise Exception(f"Invalid operands for multiplication: {value_1, value_2}")
 
@@ -843,15 +1295,12 @@ def division_operation(input_token_list):
         # detecting the different numerical combinations and carrying out the appropriate operations
         if type(value_1) == Integer_virtual and type(value_2) == Integer_virtual:
             value_1 = value_1.convert_to_virtual_float()
-            value_1.divide(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.divide(value_2).convert_to_token()
         elif type(value_1) == Float_virtual and (type(value_2) == Integer_virtual or type(value_2) == Float_virtual):
-            value_1.divide(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.divide(value_2).convert_to_token()
         elif type(value_1) == Integer_virtual and type(value_2) == Float_virtual:
             value_1 = value_1.convert_to_virtual_float()
-            value_1.divide(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.divide(value_2).convert_to_token()
         else:
             raise Exception(f"Invalid operands for division: {value_1, value_2}")
 
@@ -866,8 +1315,7 @@ def integer_division_operation(input_token_list):
         value_1 = convert_to_virtual_variable(input_token_list[0])
         value_2 = convert_to_virtual_variable(input_token_list[1])
         if type(value_1) == Integer_virtual and type(value_2) == Integer_virtual:
-            value_1.integer_division(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.integer_division(value_2).convert_to_token()
         else:
             raise Exception(f"Invalid operands for integer division: {value_1, value_2}")
 
@@ -884,8 +1332,7 @@ def modulo_division_operation(input_token_list):
         # detecting the different numerical combinations and carrying out the 
         #   appropriate operations
         if type(value_1) == Integer_virtual and type(value_2) == Integer_virtual:
-            value_1.integer_modulo_division(value_2)
-            output = value_1.convert_to_token()
+            output = value_1.integer_modulo_division(value_2).convert_to_token()
         else:
             raise Exception(f"Invalid operands for modulo division: {value_1, value_2}")
 
@@ -971,8 +1418,42 @@ def binary_boolean_logical_statement_operation(input_token_list):
             if value_1 == 1 or value_2 == 1:
                 result = 1
         boolean_output = Boolean_virtual(result)
-        return boolean_output.convert_to_token() 
-            
+        return boolean_output.convert_to_token()
+
+# --- Short Circuiting --- #
+
+# AND and OR are evaluated lazily by every execution engine, their right operand is only worked
+#   out if their left operand doesn't decide the result, AND is decided by a FALSE left operand
+#   and OR by a TRUE one, which is then the result
+# As a skipped right operand is never worked out, errors it would have raised (an undeclared
+#   variable, a missing dictionary key, an index out of range, dividing by zero or it not being
+#   a boolean) are no longer raised when the left operand decides the result. A left operand
+#   which isn't a boolean never decides it, so still raises the same error after the right
+#   operand is worked out. The left operand is read before the right one is worked out, so if
+#   both would raise an error, an undeclared left variable is the one now reported
+SHORT_CIRCUIT_RESULTS = {
+    AND: (0, Token(VIRTUAL_BOOLEAN, Boolean_virtual(0))),
+    OR: (1, Token(VIRTUAL_BOOLEAN, Boolean_virtual(1)))
+}
+
+# gives the result token of a binary boolean logical statement if it is decided by the python
+#   value of its left operand, or None if the right operand is needed
+def get_short_circuit_value_result(left_value, logical_keyword):
+    deciding_value, result_token = SHORT_CIRCUIT_RESULTS[logical_keyword]
+    if left_value == deciding_value:
+        return result_token
+    return None
+
+# the same for the token of the left operand and the logical keyword's token, as they are given
+#   to binary_boolean_logical_statement_operation
+def get_short_circuit_result(left_token, keyword_token):
+    if not isinstance(keyword_token, Token) or keyword_token.type not in SHORT_CIRCUIT_RESULTS:
+        return None
+    left_item = convert_to_virtual_variable(left_token)
+    if type(left_item) != Boolean_virtual:
+        return None
+    return get_short_circuit_value_result(left_item.get_value(), keyword_token.type)
+
 # evaluation of a single-input boolean logical statement (not)
 def single_boolean_logical_statement_operation(input_token_list):
     if len(input_token_list) != 2:
@@ -1042,11 +1523,9 @@ def array_append_operation(input_token_list, virtual_environment):
         array = convert_to_virtual_variable(make_not_variable_name(input_token_list[0], virtual_environment))
         value_to_add = make_not_variable_name(input_token_list[1], virtual_environment)
         array_name = input_token_list[0]
-        array.append_item(value_to_add)
-        new_array_token = array.convert_to_token()
+        new_array_token = append_to_array(array, value_to_add).convert_to_token()
         # reassigning the edited version of the array
         assignment_operation([array_name, new_array_token], virtual_environment)
-    return virtual_environment
 
 # inserts an item into a priority queue
 def priority_queue_add_item_operation(input_token_list, virtual_environment):
@@ -1059,16 +1538,9 @@ def priority_queue_add_item_operation(input_token_list, virtual_environment):
         prioqueue_name = input_token_list[0]
         value_to_add = make_not_variable_name(input_token_list[1], virtual_environment)
         priority_token = convert_to_virtual_variable(make_not_variable_name(input_token_list[2], virtual_environment))
-        if not type(priority_token) == Integer_virtual:
-            raise Exception(f"{priority_token} is not valid")
-        else:
-            # carrying out the actual operation
-            priority = priority_token.get_value()
-            prioqueue.add_item(value_to_add, priority)
-            # reassigning the datastructure
-            new_prioqueue_token = prioqueue.convert_to_token()
-            assignment_operation([prioqueue_name, new_prioqueue_token], virtual_environment)
-    return virtual_environment
+        new_prioqueue_token = add_to_priority_queue(prioqueue, value_to_add, priority_token).convert_to_token()
+        # reassigning the datastructure
+        assignment_operation([prioqueue_name, new_prioqueue_token], virtual_environment)
 
 # inserts an item into a normal stack or queue
 def stack_queue_add_item_operation(input_token_list, virtual_environment):
@@ -1081,11 +1553,9 @@ def stack_queue_add_item_operation(input_token_list, virtual_environment):
         value_to_add = make_not_variable_name(input_token_list[1], virtual_environment)
         datastruct_name = input_token_list[0]
         # adding the item
-        datastruct.add_item(value_to_add)
+        new_datastruct_token = add_to_stack_or_queue(datastruct, value_to_add).convert_to_token()
         # reassigning the datastructure
-        new_datastruct_token = datastruct.convert_to_token()
         assignment_operation([datastruct_name, new_datastruct_token], virtual_environment)
-    return virtual_environment
 
 # outputs the value of the first item in a stack/queue/priorityqueue
 def stack_queue_read_item_operation(input_token_list):
@@ -1107,11 +1577,9 @@ def stack_queue_pop_item_operation(input_token_list, virtual_environment):
         datastruct = convert_to_virtual_variable(make_not_variable_name(input_token_list[0], virtual_environment))
         datastruct_name = input_token_list[0]
         # removing the item
-        datastruct.pop_item()
+        new_datastruct_token = pop_from_stack_or_queue(datastruct).convert_to_token()
         # reassigning the datastructure
-        new_datastruct_token = datastruct.convert_to_token()
         assignment_operation([datastruct_name, new_datastruct_token], virtual_environment)
-    return virtual_environment
 
 # inserts an item into a dictionary
 def dictionary_insert_operation(input_token_list, virtual_environment):
@@ -1124,11 +1592,9 @@ def dictionary_insert_operation(input_token_list, virtual_environment):
         pair_to_add = convert_to_virtual_variable(make_not_variable_name(input_token_list[1], virtual_environment))
         dictionary_name = input_token_list[0]
         # inserting the item
-        dictionary.pair_insertion(pair_to_add)
+        new_dictionary_token = insert_into_dictionary(dictionary, pair_to_add).convert_to_token()
         # reassigning the datastructure
-        new_dictionary_token = dictionary.convert_to_token()
         assignment_operation([dictionary_name, new_dictionary_token], virtual_environment)
-    return virtual_environment
 
 # looks up the value associated with a key in a dictionary
 def dictionary_lookup_operation(input_token_list):
@@ -1154,14 +1620,12 @@ def dictionary_remove_operation(input_token_list, virtual_environment):
         key = convert_to_virtual_variable(make_not_variable_name(input_token_list[1], virtual_environment))
         dictionary_name = input_token_list[0]
         # removing the pair
-        dictionary.pair_removal(key)
+        new_dictionary_token = remove_from_dictionary(dictionary, key).convert_to_token()
         # reassigning the dictionary
-        new_dictionary_token = dictionary.convert_to_token()
         assignment_operation([dictionary_name, new_dictionary_token], virtual_environment)
-    return virtual_environment
 
 # returns an array of the valid keys for a dictionary
-def dictionary_key_list_operation(input_token_list, virtual_environment):
+def dictionary_key_list_operation(input_token_list):
     if len(input_token_list) != 1:
         raise Exception(f"Only one item can be inputted to \
             dictionary key list: {input_token_list}")
@@ -1182,26 +1646,2315 @@ def dictionary_pair_operation(input_token_list):
     return key_pair
 
 
+# --- Data Structure Changes --- #
+
+# each of these gives a changed copy of a data structure, leaving the one given unchanged, 
+#   the copy is reassigned to the variable that held the data structure
+
+def append_to_array(array, value_to_add):
+    array = array.copy_for_change()
+    array.append_item(value_to_add)
+    return array
+
+def add_to_priority_queue(prioqueue, value_to_add, priority_token):
+    if not type(priority_token) == Integer_virtual:
+        raise Exception(f"{priority_token} is not valid")
+    else:
+        prioqueue = prioqueue.copy_for_change()
+        prioqueue.add_item(value_to_add, priority_token.get_value())
+        return prioqueue
+
+def add_to_stack_or_queue(datastruct, value_to_add):
+    datastruct = datastruct.copy_for_change()
+    datastruct.add_item(value_to_add)
+    return datastruct
+
+def pop_from_stack_or_queue(datastruct):
+    datastruct = datastruct.copy_for_change()
+    datastruct.pop_item()
+    return datastruct
+
+def insert_into_dictionary(dictionary, pair_to_add):
+    dictionary = dictionary.copy_for_change()
+    dictionary.pair_insertion(pair_to_add)
+    return dictionary
+
+def remove_from_dictionary(dictionary, key):
+    dictionary = dictionary.copy_for_change()
+    dictionary.pair_removal(key)
+    return dictionary
+
+
+# --- Operation Handler Table --- #
+
+# how do_operation carries out an operation
+# function is called with the operation's input tokens, and also with the virtual environment
+#   if uses_environment is set, it returns the operation's output token or None if it has none
+# resolves_names is set if variable names in the inputs should be converted into their values
+#   before the function is called, operations which set variables need the names instead
+class Operation_handler(object):
+    __slots__ = ("function", "resolves_names", "uses_environment")
+
+    def __init__(self, function, resolves_names, uses_environment):
+        self.function = function
+        self.resolves_names = resolves_names
+        self.uses_environment = uses_environment
+
+# every operation that can be carried out, by operation type
+operation_handlers = {}
+
+# adds an operation to the table, or replaces the handler of one already in it, this is also
+#   how new operations are added to the interpreter without changing do_operation
+def register_operation(operation, function, resolves_names=True, uses_environment=False):
+    operation_handlers[operation] = Operation_handler(function, resolves_names, uses_environment)
+
+# operations which set variables
+register_operation(ASSIGNMENT, assignment_operation, resolves_names=False, uses_environment=True)
+register_operation(DECLARATION_NORMAL_WITH_VALUE, declaration_operation, resolves_names=False, uses_environment=True)
+register_operation(DECLARATION_NORMAL_WITHOUT_VALUE, declaration_without_value_operation, resolves_names=False, uses_environment=True)
+register_operation(FOR_STATEMENT, for_statement_operation, resolves_names=False, uses_environment=True)
+register_operation(ARRAY_APPEND, array_append_operation, resolves_names=False, uses_environment=True)
+register_operation(PRIORITY_QUEUE_ADD_ITEM, priority_queue_add_item_operation, resolves_names=False, uses_environment=True)
+register_operation(STACK_QUEUE_ADD_ITEM, stack_queue_add_item_operation, resolves_names=False, uses_environment=True)
+register_operation(STACK_QUEUE_ITEM_POP, stack_queue_pop_item_operation, resolves_names=False, uses_environment=True)
+register_operation(DICTIONARY_INSERT, dictionary_insert_operation, resolves_names=False, uses_environment=True)
+register_operation(DICTIONARY_REMOVE, dictionary_remove_operation, resolves_names=False, uses_environment=True)
+# operations which only use values
+register_operation(BRACKETS, brackets_operation)
+register_operation(IF_STATEMENT, if_statement_operation)
+register_operation(WHILE_STATEMENT, while_statement_operation)
+register_operation(ARRAY, lambda input_token_list: array_tuple_dict_operation(ARRAY, input_token_list))
+register_operation(TUPLE, lambda input_token_list: array_tuple_dict_operation(TUPLE, input_token_list))
+register_operation(DICTIONARY, lambda input_token_list: array_tuple_dict_operation(DICTIONARY, input_token_list))
+register_operation(CONCATENATION_OR_ADDITION, concatenation_or_addition_operation)
+register_operation(SUBTRACTION, subtraction_operation)
+register_operation(MULTIPLICATION, multiplication_operation)
+register_operation(DIVISION, division_operation)
+register_operation(INTEGER_DIVISION, integer_division_operation)
+register_operation(MODULO_DIVIDE, modulo_division_operation)
+register_operation(BOOLEAN_COMPARISON, boolean_comparison_operation)
+register_operation(BINARY_BOOLEAN_LOGICAL_STATEMENT, binary_boolean_logical_statement_operation)
+register_operation(SINGLE_BOOLEAN_LOGICAL_STATEMENT, single_boolean_logical_statement_operation)
+register_operation(STRING_LIST_READ_BY_INDEX, string_list_read_by_index)
+register_operation(LENGTH_CHECK, length_check_operation)
+register_operation(OUTPUT_CALL, output_operation)
+register_operation(STACK_QUEUE_ITEM_READ, stack_queue_read_item_operation)
+register_operation(DICTIONARY_LOOKUP, dictionary_lookup_operation)
+register_operation(DICTIONARY_KEY_LIST, dictionary_key_list_operation)
+register_operation(DICTIONARY_PAIR, dictionary_pair_operation)
+
+
+# ------------------------------ OPTIMISER ------------------------------ #
+# Passes run over the ASTs of a program after it has been parsed and before it is run, they 
+#   never change what a program does, only how much work running it takes
+
+# --- Constant Folding --- #
+
+# the operations which give the same result every time if all of their inputs are literals
+FOLDABLE_OPERATIONS = [BRACKETS, ARRAY, TUPLE, CONCATENATION_OR_ADDITION, SUBTRACTION, MULTIPLICATION, \
+    DIVISION, INTEGER_DIVISION, MODULO_DIVIDE, BOOLEAN_COMPARISON, BINARY_BOOLEAN_LOGICAL_STATEMENT, \
+    SINGLE_BOOLEAN_LOGICAL_STATEMENT]
+
+# Replaces every subtree made only of literals and foldable operations with a leaf holding 
+#   the token it evaluates to, which is worked out by process_AST exactly as it would be when
+#   the line is run. Subtrees that raise an error are left as they are, so the error is 
+#   still raised when (and only if) the line is run
+# Nodes are shared between lines, so a new node is made rather than changing one, returns 
+#   the folded AST and whether it is now a single literal
+def fold_constants(my_AST, virtual_environment):
+    if type(my_AST) == Leaf_node:
+        return my_AST, my_AST.type != NAME_KEYWORD
+    folded_child_nodes = []
+    children_are_literals = True
+    for child_node in my_AST.child_nodes:
+        folded_child_node, child_is_literal = fold_constants(child_node, virtual_environment)
+        folded_child_nodes.append(folded_child_node)
+        children_are_literals = children_are_literals and child_is_literal
+    if folded_child_nodes != list(my_AST.child_nodes):
+        my_AST = Operator_node(my_AST.type, folded_child_nodes)
+    if children_are_literals and my_AST.type in FOLDABLE_OPERATIONS:
+        try:
+            summary_token, virtual_environment = process_AST(my_AST, virtual_environment)
+            return Leaf_node(summary_token), True
+        except Exception:
+            pass
+    return my_AST, False
+
+# folds the constants in each line of a program, the virtual environment is never used as 
+#   foldable subtrees don't contain variable names
+def fold_program_constants(ast_lines):
+    virtual_environment = Virtual_environment(None)
+    return [fold_constants(my_AST, virtual_environment)[0] for my_AST in ast_lines]
+
+# the streaming equivalent of fold_program_constants
+def fold_program_constants_stream(ast_lines):
+    virtual_environment = Virtual_environment(None)
+    for my_AST in ast_lines:
+        yield fold_constants(my_AST, virtual_environment)[0]
+
+# --- Type Inference --- #
+
+# used to make the specialised implementations of operations
+import operator
+
+# the virtual variable class that each literal and virtual variable token type becomes, and 
+#   the virtual variable token type of each class
+TOKEN_TYPES_TO_VIRTUAL_CLASSES = {
+    INTEGER: Integer_virtual,
+    DECIMAL_NUMBER: Float_virtual,
+    FLOAT: Float_virtual,
+    STRING: String_virtual,
+    CHARACTER: Character_virtual,
+    BOOLEAN: Boolean_virtual,
+    VIRTUAL_INTEGER: Integer_virtual,
+    VIRTUAL_FLOAT: Float_virtual,
+    VIRTUAL_STRING: String_virtual,
+    VIRTUAL_CHARACTER: Character_virtual,
+    VIRTUAL_BOOLEAN: Boolean_virtual
+}
+VIRTUAL_CLASSES_TO_TOKEN_TYPES = {
+    Integer_virtual: VIRTUAL_INTEGER,
+    Float_virtual: VIRTUAL_FLOAT,
+    String_virtual: VIRTUAL_STRING,
+    Character_virtual: VIRTUAL_CHARACTER,
+    Boolean_virtual: VIRTUAL_BOOLEAN
+}
+
+# makes the implementation of an arithmetic operation for one combination of operand types,
+#   when the first operand is converted to a float it is done before the operation, as 
+#   convert_to_virtual_float does in the operation's general implementation
+def make_arithmetic_implementation(function, result_class, convert_first_to_float):
+    result_type = VIRTUAL_CLASSES_TO_TOKEN_TYPES[result_class]
+    def implementation(value_1, value_2):
+        if convert_first_to_float:
+            value_1 = float(value_1)
+        return Token(result_type, result_class(function(value_1, value_2)))
+    return implementation
+
+# makes the implementation of a comparison or logical operation, which give booleans
+def make_boolean_implementation(function):
+    def implementation(*values):
+        if function(*values):
+            result = 1
+        else:
+            result = 0
+        return Token(VIRTUAL_BOOLEAN, Boolean_virtual(result))
+    return implementation
+
+# the child nodes of each operation which are operands, and the child node which is the 
+#   comparator or logical keyword if it has one
+TYPED_OPERATION_LAYOUTS = {
+    CONCATENATION_OR_ADDITION: ((0, 1), None),
+    SUBTRACTION: ((0, 1), None),
+    MULTIPLICATION: ((0, 1), None),
+    DIVISION: ((0, 1), None),
+    INTEGER_DIVISION: ((0, 1), None),
+    MODULO_DIVIDE: ((0, 1), None),
+    BOOLEAN_COMPARISON: ((0, 2), 1),
+    BINARY_BOOLEAN_LOGICAL_STATEMENT: ((0, 2), 1),
+    SINGLE_BOOLEAN_LOGICAL_STATEMENT: ((1,), 0)
+}
+
+# The specialised implementation of each operation for each combination of operand types that 
+#   it is valid for, with the type of its result, keyed by the operation, its comparator or 
+#   logical keyword and its operand types
+# Every implementation gives exactly what the general one in do_operation would, any other 
+#   combination of types is left to do_operation, which raises the same errors as before
+TYPED_IMPLEMENTATIONS = {}
+# adding, subtracting and multiplying integers gives an integer, dividing them gives a float
+for operation, function in [(CONCATENATION_OR_ADDITION, operator.add), (SUBTRACTION, operator.sub), \
+        (MULTIPLICATION, operator.mul)]:
+    TYPED_IMPLEMENTATIONS[(operation, None, (Integer_virtual, Integer_virtual))] = \
+        (make_arithmetic_implementation(function, Integer_virtual, False), Integer_virtual)
+TYPED_IMPLEMENTATIONS[(DIVISION, None, (Integer_virtual, Integer_virtual))] = \
+    (make_arithmetic_implementation(operator.truediv, Float_virtual, True), Float_virtual)
+# any of these with a float gives a float
+for operation, function in [(CONCATENATION_OR_ADDITION, operator.add), (SUBTRACTION, operator.sub), \
+        (MULTIPLICATION, operator.mul), (DIVISION, operator.truediv)]:
+    TYPED_IMPLEMENTATIONS[(operation, None, (Float_virtual, Integer_virtual))] = \
+        (make_arithmetic_implementation(function, Float_virtual, False), Float_virtual)
+    TYPED_IMPLEMENTATIONS[(operation, None, (Float_virtual, Float_virtual))] = \
+        (make_arithmetic_implementation(function, Float_virtual, False), Float_virtual)
+    TYPED_IMPLEMENTATIONS[(operation, None, (Integer_virtual, Float_virtual))] = \
+        (make_arithmetic_implementation(function, Float_virtual, True), Float_virtual)
+TYPED_IMPLEMENTATIONS[(CONCATENATION_OR_ADDITION, None, (String_virtual, String_virtual))] = \
+    (make_arithmetic_implementation(operator.add, String_virtual, False), String_virtual)
+TYPED_IMPLEMENTATIONS[(INTEGER_DIVISION, None, (Integer_virtual, Integer_virtual))] = \
+    (make_arithmetic_implementation(operator.floordiv, Integer_virtual, False), Integer_virtual)
+TYPED_IMPLEMENTATIONS[(MODULO_DIVIDE, None, (Integer_virtual, Integer_virtual))] = \
+    (make_arithmetic_implementation(operator.mod, Integer_virtual, False), Integer_virtual)
+# any two values of the same type can be checked for equality, only numbers can be ordered
+for comparator, function in [(IS_EQUAL_TO, operator.eq), (IS_NOT_EQUAL_TO, operator.ne), \
+        (IS_LESS_THAN, operator.lt), (IS_LESS_THAN_OR_EQUAL_TO, operator.le), \
+        (IS_GREATER_THAN, operator.gt), (IS_GREATER_THAN_OR_EQUAL_TO, operator.ge)]:
+    if comparator in BOOLEAN_UNIVERSAL_COMPARATORS:
+        compared_classes = [Integer_virtual, Float_virtual, String_virtual, Character_virtual, Boolean_virtual]
+    else:
+        compared_classes = [Integer_virtual, Float_virtual]
+    for compared_class in compared_classes:
+        TYPED_IMPLEMENTATIONS[(BOOLEAN_COMPARISON, comparator, (compared_class, compared_class))] = \
+            (make_boolean_implementation(function), Boolean_virtual)
+TYPED_IMPLEMENTATIONS[(BINARY_BOOLEAN_LOGICAL_STATEMENT, AND, (Boolean_virtual, Boolean_virtual))] = \
+    (make_boolean_implementation(lambda value_1, value_2: value_1 == 1 and value_2 == 1), Boolean_virtual)
+TYPED_IMPLEMENTATIONS[(BINARY_BOOLEAN_LOGICAL_STATEMENT, OR, (Boolean_virtual, Boolean_virtual))] = \
+    (make_boolean_implementation(lambda value_1, value_2: value_1 == 1 or value_2 == 1), Boolean_virtual)
+TYPED_IMPLEMENTATIONS[(SINGLE_BOOLEAN_LOGICAL_STATEMENT, NOT, (Boolean_virtual,))] = \
+    (make_boolean_implementation(lambda value: value == 0), Boolean_virtual)
+
+# Finds the type of every variable whose type can be known before the program is run
+# A variable's type can't change once it is declared, so a name has a known type if every 
+#   declaration of it in the program is of the same type. Names used as for statement 
+#   variables take the type of each item they are given so are never known
+def find_variable_types(ast_lines):
+    variable_types = {}
+    for my_AST in ast_lines:
+        if my_AST.type in [DECLARATION_NORMAL_WITH_VALUE, DECLARATION_NORMAL_WITHOUT_VALUE]:
+            name = my_AST.child_nodes[1].value
+            declared_type = DECLARATION_TYPES_TO_BASIC_TYPES_DICT.get(my_AST.child_nodes[0].type)
+            variable_class = TOKEN_TYPES_TO_VIRTUAL_CLASSES.get(declared_type)
+        elif my_AST.type == FOR_STATEMENT:
+            name = my_AST.child_nodes[0].value
+            variable_class = None
+        else:
+            continue
+        if name in variable_types and variable_types[name] != variable_class:
+            variable_class = None
+        variable_types[name] = variable_class
+    return variable_types
+
+# Gives the type of the value each node results in where it can be known, and replaces each 
+#   operator node whose operand types are all known and which has a specialised implementation
+#   for them with a typed operator node
+# Nodes are shared between lines, so new nodes are made rather than changing them, returns 
+#   the new AST and the virtual variable class of its result, or None if it isn't known
+def infer_types(my_AST, variable_types):
+    if type(my_AST) == Leaf_node:
+        if my_AST.type == NAME_KEYWORD:
+            return my_AST, variable_types.get(my_AST.value)
+        else:
+            return my_AST, TOKEN_TYPES_TO_VIRTUAL_CLASSES.get(my_AST.type)
+    typed_child_nodes = []
+    child_types = []
+    for child_node in my_AST.child_nodes:
+        typed_child_node, child_type = infer_types(child_node, variable_types)
+        typed_child_nodes.append(typed_child_node)
+        child_types.append(child_type)
+    if typed_child_nodes != list(my_AST.child_nodes):
+        my_AST = Operator_node(my_AST.type, typed_child_nodes)
+    if my_AST.type == BRACKETS and len(child_types) == 1:
+        return my_AST, child_types[0]
+    if my_AST.type in TYPED_OPERATION_LAYOUTS:
+        operand_indices, keyword_index = TYPED_OPERATION_LAYOUTS[my_AST.type]
+        if keyword_index == None:
+            keyword_type = None
+        else:
+            keyword_type = typed_child_nodes[keyword_index].type
+        operand_types = tuple(child_types[index] for index in operand_indices)
+        implementation_key = (my_AST.type, keyword_type, operand_types)
+        if len(typed_child_nodes) == len(operand_indices) + (keyword_index != None) \
+                and implementation_key in TYPED_IMPLEMENTATIONS:
+            implementation, result_type = TYPED_IMPLEMENTATIONS[implementation_key]
+            # literal operands are made into virtual variables now instead of every time the line is run
+            for index in operand_indices:
+                typed_child_nodes[index] = make_virtual_leaf_node(typed_child_nodes[index])
+            my_AST = Typed_operator_node(my_AST.type, typed_child_nodes, operand_types, operand_indices, implementation)
+            return my_AST, result_type
+    return my_AST, None
+
+# returns a leaf node holding the virtual variable a literal leaf node becomes, any other 
+#   node is returned as it is
+def make_virtual_leaf_node(my_AST):
+    if type(my_AST) == Leaf_node and my_AST.type in TOKEN_TYPES_TO_VIRTUAL_CLASSES \
+            and my_AST.type not in VIRTUAL_VARIABLE_TYPES:
+        my_AST = Leaf_node(convert_to_virtual_variable(Token(my_AST.type, my_AST.value)).convert_to_token())
+    return my_AST
+
+# annotates the types in each line of a program
+def infer_program_types(ast_lines):
+    variable_types = find_variable_types(ast_lines)
+    return [infer_types(my_AST, variable_types)[0] for my_AST in ast_lines]
+
+# --- Operation Fusion --- #
+
+# Replaces a few common shapes of node, whose operand types are known, with fused operator 
+#   nodes that are run in one step by a dedicated implementation instead of a chain of 
+#   operations passing tokens between them:
+#   - increment in place, x = x + 1 or x = x - 1.5 for a number variable and number literal
+#   - append concatenation in place, s = s + "text" for a string variable and string literal
+#   - modulo comparison to a constant, such as a % n ISEQUALTO 0 for integers
+#   - compare and branch, an IF or WHILE statement whose condition is a comparison of 
+#     variables and literals, or a fused modulo comparison
+# The variables changed in place are replaced in their frame without the checks assignment 
+#   makes, as their type is known, virtual variables are still never changed once made
+# Runs after type inference, as only typed operator nodes are fused
+FUSED_INCREMENT = "increment in place"
+FUSED_APPEND_CONCATENATION = "append concatenation in place"
+FUSED_MODULO_COMPARISON = "modulo comparison to a constant"
+FUSED_COMPARE_AND_BRANCH = "compare and branch"
+
+# the python function of each comparator
+COMPARATOR_FUNCTIONS = {
+    IS_EQUAL_TO: operator.eq,
+    IS_NOT_EQUAL_TO: operator.ne,
+    IS_LESS_THAN: operator.lt,
+    IS_LESS_THAN_OR_EQUAL_TO: operator.le,
+    IS_GREATER_THAN: operator.gt,
+    IS_GREATER_THAN_OR_EQUAL_TO: operator.ge
+}
+
+# the tokens a compare and branch gives for each statement, whether its condition is met or not
+BRANCH_TOKENS = {
+    IF_STATEMENT: (Token(OPEN_IF, None), Token(SKIP_IF, None)),
+    WHILE_STATEMENT: (Token(OPEN_WHILE, None), Token(SKIP_WHILE, None))
+}
+
+def is_name_leaf(my_AST):
+    return type(my_AST) == Leaf_node and my_AST.type == NAME_KEYWORD
+
+def is_literal_leaf(my_AST, literal_classes):
+    return type(my_AST) == Leaf_node and TOKEN_TYPES_TO_VIRTUAL_CLASSES.get(my_AST.type) in literal_classes
+
+# gives the python value of a literal leaf
+def get_literal_value(my_AST):
+    return convert_to_virtual_variable(Token(my_AST.type, my_AST.value)).get_value()
+
+# gives a function which reads the python value of a leaf operand, from the variable it names 
+#   or the literal it holds
+def make_operand_reader(my_AST):
+    if is_name_leaf(my_AST):
+        name = my_AST.value
+        def read_operand(virtual_environment):
+            return virtual_environment.read_virtual_variable(name).get_value()
+    else:
+        value = get_literal_value(my_AST)
+        def read_operand(virtual_environment):
+            return value
+    return read_operand
+
+# x = x + literal or x = x - literal, where the result is the same type as x
+def fuse_increment(my_AST):
+    name_node, value_node = my_AST.child_nodes
+    if not (is_name_leaf(name_node) and type(value_node) == Typed_operator_node \
+            and value_node.type in [CONCATENATION_OR_ADDITION, SUBTRACTION]):
+        return None
+    variable_node, amount_node = value_node.child_nodes
+    variable_class = value_node.operand_types[0]
+    if not (is_name_leaf(variable_node) and variable_node.value == name_node.value \
+            and variable_class in [Integer_virtual, Float_virtual] \
+            and is_literal_leaf(amount_node, [Integer_virtual, Float_virtual]) \
+            and TYPED_IMPLEMENTATIONS[(value_node.type, None, value_node.operand_types)][1] == variable_class):
+        return None
+    name = name_node.value
+    amount = get_literal_value(amount_node)
+    if value_node.type == SUBTRACTION:
+        amount = -amount
+    def implementation(virtual_environment):
+        frame = virtual_environment.find_variable_frame(name)
+        frame.store_item(variable_class(frame.read_item_value(name).get_value() + amount), name)
+        return NON_ACTIONABLE_ROOT_NODE_TOKEN
+    return Fused_operator_node(my_AST, FUSED_INCREMENT, implementation)
+
+# s = s + literal, for a string s
+def fuse_append_concatenation(my_AST):
+    name_node, value_node = my_AST.child_nodes
+    if not (is_name_leaf(name_node) and type(value_node) == Typed_operator_node \
+            and value_node.type == CONCATENATION_OR_ADDITION \
+            and value_node.operand_types == (String_virtual, String_virtual)):
+        return None
+    variable_node, text_node = value_node.child_nodes
+    if not (is_name_leaf(variable_node) and variable_node.value == name_node.value \
+            and is_literal_leaf(text_node, [String_virtual])):
+        return None
+    name = name_node.value
+    text = get_literal_value(text_node)
+    def implementation(virtual_environment):
+        frame = virtual_environment.find_variable_frame(name)
+        frame.store_item(String_virtual(frame.read_item_value(name).get_value() + text), name)
+        return NON_ACTIONABLE_ROOT_NODE_TOKEN
+    return Fused_operator_node(my_AST, FUSED_APPEND_CONCATENATION, implementation)
+
+# a % n compared to an integer literal, where a and n are integer variables or literals
+def fuse_modulo_comparison(my_AST):
+    if type(my_AST) != Typed_operator_node or my_AST.type != BOOLEAN_COMPARISON:
+        return None
+    modulo_node, comparator_node, constant_node = my_AST.child_nodes
+    if not (type(modulo_node) == Typed_operator_node and modulo_node.type == MODULO_DIVIDE \
+            and all(type(child_node) == Leaf_node for child_node in modulo_node.child_nodes) \
+            and is_literal_leaf(constant_node, [Integer_virtual])):
+        return None
+    comparison = COMPARATOR_FUNCTIONS[comparator_node.type]
+    constant = get_literal_value(constant_node)
+    read_dividend = make_operand_reader(modulo_node.child_nodes[0])
+    # the divisor is most often a literal, so it is used directly when it is
+    if is_name_leaf(modulo_node.child_nodes[1]):
+        read_divisor = make_operand_reader(modulo_node.child_nodes[1])
+        def condition(virtual_environment):
+            return comparison(read_dividend(virtual_environment) % read_divisor(virtual_environment), constant)
+    else:
+        divisor = get_literal_value(modulo_node.child_nodes[1])
+        def condition(virtual_environment):
+            return comparison(read_dividend(virtual_environment) % divisor, constant)
+    def implementation(virtual_environment):
+        return Token(VIRTUAL_BOOLEAN, Boolean_virtual(1 if condition(virtual_environment) else 0))
+    return Fused_operator_node(my_AST, FUSED_MODULO_COMPARISON, implementation, condition)
+
+# an IF or WHILE statement whose condition is a fused comparison or a typed comparison of leaves,
+#   which gives the token opening or skipping the statement without making a boolean first
+def fuse_compare_and_branch(my_AST):
+    if len(my_AST.child_nodes) != 1:
+        return None
+    condition_node = my_AST.child_nodes[0]
+    if type(condition_node) == Fused_operator_node and condition_node.condition != None:
+        condition = condition_node.condition
+    elif type(condition_node) == Typed_operator_node and condition_node.type == BOOLEAN_COMPARISON \
+            and type(condition_node.child_nodes[0]) == Leaf_node and type(condition_node.child_nodes[2]) == Leaf_node:
+        comparison = COMPARATOR_FUNCTIONS[condition_node.child_nodes[1].type]
+        read_operand_1 = make_operand_reader(condition_node.child_nodes[0])
+        read_operand_2 = make_operand_reader(condition_node.child_nodes[2])
+        def condition(virtual_environment):
+            return comparison(read_operand_1(virtual_environment), read_operand_2(virtual_environment))
+    else:
+        return None
+    open_token, skip_token = BRANCH_TOKENS[my_AST.type]
+    def implementation(virtual_environment):
+        if condition(virtual_environment):
+            return open_token
+        return skip_token
+    return Fused_operator_node(my_AST, FUSED_COMPARE_AND_BRANCH, implementation)
+
+# the functions which try to fuse each type of node, each gives the fused node or None if the 
+#   node isn't the shape it fuses
+operation_fusers = {}
+
+def register_operation_fuser(operation, fuser):
+    operation_fusers.setdefault(operation, []).append(fuser)
+
+register_operation_fuser(ASSIGNMENT, fuse_increment)
+register_operation_fuser(ASSIGNMENT, fuse_append_concatenation)
+register_operation_fuser(BOOLEAN_COMPARISON, fuse_modulo_comparison)
+register_operation_fuser(IF_STATEMENT, fuse_compare_and_branch)
+register_operation_fuser(WHILE_STATEMENT, fuse_compare_and_branch)
+
+# fuses the nodes of an AST from the leaves up, so a fused comparison can be the condition of a 
+#   compare and branch
+# nodes are shared between lines, so new nodes are made rather than changing them
+def fuse_operations(my_AST):
+    if type(my_AST) == Leaf_node:
+        return my_AST
+    fused_child_nodes = [fuse_operations(child_node) for child_node in my_AST.child_nodes]
+    if fused_child_nodes != list(my_AST.child_nodes):
+        if type(my_AST) == Typed_operator_node:
+            my_AST = Typed_operator_node(my_AST.type, fused_child_nodes, my_AST.operand_types, \
+                my_AST.operand_indices, my_AST.implementation)
+        else:
+            my_AST = Operator_node(my_AST.type, fused_child_nodes)
+    for fuser in operation_fusers.get(my_AST.type, []):
+        fused_node = fuser(my_AST)
+        if fused_node != None:
+            return fused_node
+    return my_AST
+
+def fuse_program_operations(ast_lines):
+    return [fuse_operations(my_AST) for my_AST in ast_lines]
+
+# --- Optimiser Controller --- #
+
+# runs each optimisation pass that is turned on over the ASTs of a program
+def optimise_program(ast_lines):
+    if FOLD_CONSTANTS:
+        ast_lines = fold_program_constants(ast_lines)
+    if INFER_TYPES:
+        ast_lines = infer_program_types(ast_lines)
+    if FUSE_OPERATIONS:
+        ast_lines = fuse_program_operations(ast_lines)
+    return ast_lines
+
+# the streaming equivalent of optimise_program, type inference has to see every declaration
+#   in the program before it can be used so only constant folding is done, and operation 
+#   fusion needs the types it finds
+def optimise_program_stream(ast_lines):
+    if FOLD_CONSTANTS:
+        ast_lines = fold_program_constants_stream(ast_lines)
+    return ast_lines
+
+
+# ------------------------------ CLOSURE COMPILER ------------------------------ #
+
+# execution engines, the one used is chosen by the EXECUTION_ENGINE flag at the bottom of this file
+# the tree walking interpreter runs each line by passing its AST to process_AST, the closure 
+#   compiler turns each line's AST into python closures once before the program runs, the
+#   python transpiler turns the whole program into python source (see PYTHON TRANSPILER) and 
+#   the bytecode virtual machine runs the program compiled into bytecode (see BYTECODE VIRTUAL MACHINE)
+TREE_WALKING_INTERPRETER = "tree walking interpreter"
+CLOSURE_COMPILER = "closure compiler"
+PYTHON_TRANSPILER = "python transpiler"
+BYTECODE_VM = "bytecode virtual machine"
+
+# compiled nodes are closures which take the virtual environment and return the token their
+#   node is condensed into, as process_AST does for the node
+# everything process_AST decides each time it reaches a node, what kind of node it is, which
+#   handler carries out the operation and whether variable names are resolved, is decided 
+#   once when the node is compiled, and literals are made into virtual variables
+
+# compiles an AST into a closure, resolves_names is set if the operation the AST is an 
+#   operand of converts variable names into their values
+def compile_AST(my_AST, resolves_names=False):
+    if type(my_AST) == Leaf_node:
+        return compile_leaf_node(my_AST, resolves_names)
+    elif type(my_AST) == Typed_operator_node:
+        return compile_typed_operator_node(my_AST)
+    # fused operator nodes are already closures which take the virtual environment
+    elif type(my_AST) == Fused_operator_node:
+        return my_AST.implementation
+    elif my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT and len(my_AST.child_nodes) == 3:
+        return compile_logical_statement_node(my_AST)
+    else:
+        return compile_operator_node(my_AST)
+
+# variable names being resolved are fetched from the virtual environment, any other leaf 
+#   always gives the same token
+# literals are only made into virtual variables for operations which resolve names, as those 
+#   only use the values of their inputs, which are the same for a literal and its virtual variable
+def compile_leaf_node(my_AST, resolves_names):
+    if my_AST.type == NAME_KEYWORD and resolves_names:
+        name = my_AST.value
+        def evaluate(virtual_environment):
+            return virtual_environment.fetch_virtual_variable(name)
+    else:
+        if resolves_names:
+            my_AST = make_virtual_leaf_node(my_AST)
+        token = Token(my_AST.type, my_AST.value)
+        def evaluate(virtual_environment):
+            return token
+    return evaluate
+
+# gives a closure which raises an error when it is run, used for nodes which are invalid so 
+#   that the error is raised when the line is run as it is by process_AST
+def compile_error(message):
+    def evaluate(virtual_environment):
+        raise Exception(message)
+    return evaluate
+
+def compile_operator_node(my_AST):
+    operation_handler = operation_handlers.get(my_AST.type)
+    resolves_names = operation_handler != None and operation_handler.resolves_names
+    child_evaluators = []
+    for child_node in my_AST.child_nodes:
+        if child_node.type in ROOT_NODE_TYPES:
+            child_evaluators.append(compile_error(f"The root node {child_node} has been passed to a {my_AST.type}"))
+        else:
+            child_evaluators.append(compile_AST(child_node, resolves_names))
+
+    if operation_handler == None:
+        message = f"Invalid operation: {my_AST.type}"
+        def evaluate(virtual_environment):
+            for evaluate_child in child_evaluators:
+                evaluate_child(virtual_environment)
+            raise Exception(message)
+        return evaluate
+
+    function = operation_handler.function
+    if operation_handler.uses_environment:
+        def evaluate(virtual_environment):
+            output = function([evaluate_child(virtual_environment) for evaluate_child in child_evaluators], \
+                virtual_environment)
+            if output == None:
+                output = NON_ACTIONABLE_ROOT_NODE_TOKEN
+            return output
+    else:
+        def evaluate(virtual_environment):
+            output = function([evaluate_child(virtual_environment) for evaluate_child in child_evaluators])
+            if output == None:
+                output = NON_ACTIONABLE_ROOT_NODE_TOKEN
+            return output
+    return evaluate
+
+# compiles an operand of a typed operator node into a closure giving its python value, 
+#   variables are read directly and the values of literals are found when compiled
+def compile_operand(my_AST):
+    if type(my_AST) == Leaf_node and my_AST.type == NAME_KEYWORD:
+        name = my_AST.value
+        def evaluate(virtual_environment):
+            return virtual_environment.read_virtual_variable(name).get_value()
+    elif type(my_AST) == Leaf_node:
+        value = convert_to_virtual_variable(Token(my_AST.type, my_AST.value)).get_value()
+        def evaluate(virtual_environment):
+            return value
+    else:
+        evaluate_child = compile_AST(my_AST)
+        def evaluate(virtual_environment):
+            return get_operand_value(evaluate_child(virtual_environment), virtual_environment)
+    return evaluate
+
+# the right operand is only evaluated if the left one doesn't decide the result (see Short Circuiting)
+def compile_logical_statement_node(my_AST):
+    child_evaluators = []
+    for child_node in my_AST.child_nodes:
+        if child_node.type in ROOT_NODE_TYPES:
+            child_evaluators.append(compile_error(f"The root node {child_node} has been passed to a {my_AST.type}"))
+        else:
+            child_evaluators.append(compile_AST(child_node, True))
+    evaluate_left, evaluate_keyword, evaluate_right = child_evaluators
+    function = operation_handlers[BINARY_BOOLEAN_LOGICAL_STATEMENT].function
+    def evaluate(virtual_environment):
+        left_token = evaluate_left(virtual_environment)
+        keyword_token = evaluate_keyword(virtual_environment)
+        result_token = get_short_circuit_result(left_token, keyword_token)
+        if result_token != None:
+            return result_token
+        return function([left_token, keyword_token, evaluate_right(virtual_environment)])
+    return evaluate
+
+def compile_typed_operator_node(my_AST):
+    implementation = my_AST.implementation
+    operand_evaluators = [compile_operand(my_AST.child_nodes[index]) for index in my_AST.operand_indices]
+    if my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT:
+        evaluate_operand_1, evaluate_operand_2 = operand_evaluators
+        deciding_value, result_token = SHORT_CIRCUIT_RESULTS[my_AST.child_nodes[1].type]
+        def evaluate(virtual_environment):
+            value_1 = evaluate_operand_1(virtual_environment)
+            if value_1 == deciding_value:
+                return result_token
+            return implementation(value_1, evaluate_operand_2(virtual_environment))
+        return evaluate
+    # binary operations are the most common so their operands are called directly
+    if len(operand_evaluators) == 2:
+        evaluate_operand_1, evaluate_operand_2 = operand_evaluators
+        def evaluate(virtual_environment):
+            return implementation(evaluate_operand_1(virtual_environment), evaluate_operand_2(virtual_environment))
+    else:
+        def evaluate(virtual_environment):
+            return implementation(*[evaluate_operand(virtual_environment) for evaluate_operand in operand_evaluators])
+    return evaluate
+
+# compiles each line of a program, lines that share an AST share its closure
+def compile_program(ast_lines):
+    compiled_ASTs = {}
+    line_evaluators = []
+    for my_AST in ast_lines:
+        if id(my_AST) not in compiled_ASTs:
+            compiled_ASTs[id(my_AST)] = compile_AST(my_AST)
+        line_evaluators.append(compiled_ASTs[id(my_AST)])
+    return line_evaluators
+
+# used in place of the list of compiled lines when the program is streamed, each line is 
+#   compiled when it is first reached and forgotten along with its AST
+class Streamed_line_evaluators(object):
+    def __init__(self, ast_lines):
+        self.ast_lines = ast_lines
+        self.line_evaluators = {}
+        self.released_before = 0
+
+    def __getitem__(self, index):
+        evaluate = self.line_evaluators.get(index)
+        if evaluate == None:
+            evaluate = compile_AST(self.ast_lines[index])
+            self.line_evaluators[index] = evaluate
+        return evaluate
+
+    # forgets the compiled lines before the index
+    def release_before(self, index):
+        for line_index in range(self.released_before, index):
+            self.line_evaluators.pop(line_index, None)
+        self.released_before = max(self.released_before, index)
+
+
+# ------------------------------ PYTHON TRANSPILER ------------------------------ #
+
+# Translates a whole program into the source of a python function, which is compiled once and 
+#   run in place of the program's lines
+# IF, WHILE and FOR statements become python if statements and loops, and variables become 
+#   local variables of the function. Variables whose type is known before the program is run
+#   (see find_variable_types) hold their python value, which typed operator nodes use 
+#   directly, so their types only need checking when they are given a value of unknown type.
+#   Any other variable holds its virtual variable
+# Errors raised while the program runs are raised again with the number of the line they came from
+
+# used to find the name of each token type for the generated source
+import tokenTypesDefinitionLib
+
+# the name each token type has in the generated source
+TOKEN_TYPE_IDENTIFIERS = {}
+for identifier, value in vars(tokenTypesDefinitionLib).items():
+    if type(value) == Token_type and value not in TOKEN_TYPE_IDENTIFIERS:
+        TOKEN_TYPE_IDENTIFIERS[value] = identifier
+
+# the python operators which typed operator nodes become
+PYTHON_ARITHMETIC_OPERATORS = {
+    CONCATENATION_OR_ADDITION: "+",
+    SUBTRACTION: "-",
+    MULTIPLICATION: "*",
+    DIVISION: "/",
+    INTEGER_DIVISION: "//",
+    MODULO_DIVIDE: "%"
+}
+PYTHON_COMPARATORS = {
+    IS_EQUAL_TO: "==",
+    IS_NOT_EQUAL_TO: "!=",
+    IS_LESS_THAN: "<",
+    IS_LESS_THAN_OR_EQUAL_TO: "<=",
+    IS_GREATER_THAN: ">",
+    IS_GREATER_THAN_OR_EQUAL_TO: ">="
+}
+# booleans are held as 1 or 0, and python's and and or give their left operand if it decides 
+#   the result and their right operand otherwise, so give the same results as AND and OR and 
+#   only work out the right operand when it is needed (see Short Circuiting)
+PYTHON_LOGICAL_OPERATORS = {
+    AND: "and",
+    OR: "or"
+}
+
+# the lines which change a data structure, with the function which gives its changed copy and 
+#   whether each input after the data structure is given to it as a virtual variable rather 
+#   than a token
+DATA_STRUCTURE_CHANGES = {
+    ARRAY_APPEND: ("append_to_array", [False]),
+    PRIORITY_QUEUE_ADD_ITEM: ("add_to_priority_queue", [False, True]),
+    STACK_QUEUE_ADD_ITEM: ("add_to_stack_or_queue", [False]),
+    STACK_QUEUE_ITEM_POP: ("pop_from_stack_or_queue", []),
+    DICTIONARY_INSERT: ("insert_into_dictionary", [True]),
+    DICTIONARY_REMOVE: ("remove_from_dictionary", [True])
+}
+
+# the file name given to the generated source, used to find the lines errors come from
+TRANSPILED_FILE_NAME = "<transpiled BigLang program>"
+
+# python can't compile more than 20 loops nested in each other, or lines indented more than 
+#   99 levels, which the generated function reaches with 98 nested blocks
+MAX_TRANSPILED_LOOP_DEPTH = 20
+MAX_TRANSPILED_BLOCK_DEPTH = 98
+
+# --- Transpiled Program Support --- #
+
+# gives the new value of a variable being assigned to, which must be the same type as its old value
+def get_assigned_value(value_token, original_value):
+    value = convert_to_virtual_variable(value_token)
+    if type(original_value) != type(value):
+        raise Exception(f"Wrong type: {original_value} and {value} are not of the same type")
+    return value
+
+# checks whether the condition of an IF or WHILE statement is met
+def is_condition_met(condition_token):
+    value = convert_to_virtual_variable(condition_token).get_value()
+    if value == 1:
+        return True
+    elif value == 0:
+        return False
+    else:
+        raise Exception("Invalid boolean value")
+
+# gives the items a FOR statement gives its variable, in order
+def get_for_statement_items(values_token):
+    values_list = convert_to_virtual_variable(values_token)
+    if type(values_list) != Array_virtual:
+        raise Exception(f"Input {values_list} is not an array")
+    return values_list.get_value()
+
+# used in place of nodes which raise an error when they are run, the operands are worked out
+#   first as they are by the other execution engines
+def raise_runtime_error(message, *operands):
+    raise Exception(message)
+
+# gives the depth of the frame a variable is moved into when the frame holding it is closed, 
+#   which raises an error if that frame holds the variable it was declared over
+def close_variable_frame(shadowed_depth, depth, name):
+    if shadowed_depth == depth-1:
+        raise Exception(f"Variable {name} already exists")
+    return depth-1
+
+# python literals can't be made for floats which aren't finite
+def can_be_python_literal(value):
+    return type(value) != float or (value == value and abs(value) != float("inf"))
+
+# --- Translation --- #
+
+# Redeclaring variables:
+#   every variable is a local of the generated function, but the other execution engines hold 
+#   each in the frame of the block it was declared in. Declaring a variable only raises an 
+#   error if the innermost frame already holds one with its name, one declared over a variable 
+#   of an outer frame hides it until the frames are moved into each other as their blocks 
+#   close, which raises the error when the frame holding the hidden variable is reached
+#   the depth of the frame holding each local that can be declared again is kept in another 
+#   local (frame_depth_<local>), along with the depth of the variable it hid 
+#   (shadowed_depth_<local>), so that the error is raised at the same line
+#   the other engines check a closing frame's variables in the order they were made, which is 
+#   only known as the program runs, so when more than one of them is already in the frame 
+#   below the error may name a different one of them
+
+# a block of the program being translated, holding the local variables that are certain to 
+#   have been declared at the current line of it
+class Transpiled_block(object):
+    def __init__(self, block_type, loop_variable, loop_local_name, items_name):
+        self.type = block_type
+        # for statements, the BigLang and local name of their variable and the local name of
+        #   the items it is given
+        self.loop_variable = loop_variable
+        self.loop_local_name = loop_local_name
+        self.items_name = items_name
+        # the local variable of a variable with the same name as the for statement's variable 
+        #   that may exist outside of it
+        self.shadowed_local_name = None
+        self.declared = set()
+        # the tracked locals that may be held in the block's frame when it closes, in the order
+        #   they are declared
+        self.tracked = {}
+        self.has_statement = False
+
+class Python_transpiler(object):
+    def __init__(self, ast_lines):
+        # the block structure is checked before anything is translated
+        find_block_jumps(ast_lines)
+        self.ast_lines = ast_lines
+        self.find_nesting_depths()
+        self.variable_types = find_variable_types(ast_lines)
+        self.declaration_counts = {}
+        for my_AST in ast_lines:
+            if my_AST.type in [DECLARATION_NORMAL_WITH_VALUE, DECLARATION_NORMAL_WITHOUT_VALUE]:
+                name = my_AST.child_nodes[1].value
+                self.declaration_counts[name] = self.declaration_counts.get(name, 0) + 1
+        self.find_tracked_variables()
+        # the locals whose frame is tracked, for statement variables are added as they are translated
+        self.tracked_locals = {f"var_{name}" for name in self.tracked_names}
+        self.line_translators = {
+            DECLARATION_NORMAL_WITH_VALUE: self.translate_declaration,
+            DECLARATION_NORMAL_WITHOUT_VALUE: self.translate_declaration,
+            ASSIGNMENT: self.translate_assignment,
+            IF_STATEMENT: self.translate_if_statement,
+            ELSE: self.translate_else,
+            END_IF: self.translate_block_end,
+            WHILE_STATEMENT: self.translate_while_statement,
+            END_WHILE: self.translate_block_end,
+            FOR_STATEMENT: self.translate_for_statement,
+            END_FOR: self.translate_for_statement_end,
+            OUTPUT_CALL: self.translate_output
+        }
+        for operation in DATA_STRUCTURE_CHANGES:
+            self.line_translators[operation] = self.translate_data_structure_change
+        self.source_lines = ["def run_program():"]
+        # the BigLang line number of each line of source, None for lines which aren't from one
+        self.line_numbers = [None]
+        self.line_number = None
+        # the names the generated source uses, along with everything in this file
+        self.namespace = dict(globals())
+        self.constant_comments = []
+        # the BigLang name of each local variable
+        self.variable_names = {}
+        # the open blocks from outermost to innermost, the first is the function itself
+        self.blocks = [Transpiled_block(None, None, None, None)]
+        self.for_statement_count = 0
+        self.logical_statement_count = 0
+
+    # finds the variables whose frame must be tracked (see Redeclaring variables), those that can
+    #   be declared while they exist, as they are declared more than once or in a loop, and 
+    #   those a for statement's variable can be moved into when it ends
+    # tracked_names holds the BigLang names of the tracked variables outside of for statements, 
+    #   tracked_for_statements the line indices of the for statements whose variable is tracked
+    def find_tracked_variables(self):
+        self.tracked_names = set()
+        self.tracked_for_statements = set()
+        # the line index, type and for statement variable name of each open block
+        open_blocks = []
+        for line_index, my_AST in enumerate(self.ast_lines):
+            line_type = my_AST.type
+            if line_type in [END_IF, END_WHILE, END_FOR]:
+                open_blocks.pop()
+            elif line_type in [IF_STATEMENT, WHILE_STATEMENT]:
+                open_blocks.append((line_index, line_type, None))
+            elif line_type in [FOR_STATEMENT, DECLARATION_NORMAL_WITH_VALUE, DECLARATION_NORMAL_WITHOUT_VALUE]:
+                name = my_AST.child_nodes[0 if line_type == FOR_STATEMENT else 1].value
+                # a name within a for statement with the same variable name refers to its variable
+                loop_line_index = None
+                for block_line_index, block_type, loop_variable in reversed(open_blocks):
+                    if loop_variable == name:
+                        loop_line_index = block_line_index
+                        break
+                if loop_line_index != None:
+                    self.tracked_for_statements.add(loop_line_index)
+                elif line_type == FOR_STATEMENT:
+                    if name in self.declaration_counts:
+                        self.tracked_names.add(name)
+                elif self.declaration_counts[name] > 1 \
+                        or any(block[1] in [WHILE_STATEMENT, FOR_STATEMENT] for block in open_blocks):
+                    self.tracked_names.add(name)
+                if line_type == FOR_STATEMENT:
+                    open_blocks.append((line_index, line_type, name))
+
+    # finds how deeply blocks and loops are nested in each other, programs nested too deeply 
+    #   can't be compiled once translated
+    def find_nesting_depths(self):
+        self.block_depth, self.loop_depth = 0, 0
+        open_block_types = []
+        for my_AST in self.ast_lines:
+            if my_AST.type in [END_IF, END_WHILE, END_FOR]:
+                open_block_types.pop()
+            elif my_AST.type in [IF_STATEMENT, WHILE_STATEMENT, FOR_STATEMENT]:
+                open_block_types.append(my_AST.type)
+                self.block_depth = max(self.block_depth, len(open_block_types))
+                self.loop_depth = max(self.loop_depth, len(open_block_types) - open_block_types.count(IF_STATEMENT))
+
+    def can_be_compiled(self):
+        return self.block_depth <= MAX_TRANSPILED_BLOCK_DEPTH and self.loop_depth <= MAX_TRANSPILED_LOOP_DEPTH
+
+    def translate(self):
+        # tracked variables are in no frame until they are declared
+        for name in sorted(self.tracked_names):
+            self.source_lines.append(f"    frame_depth_var_{name} = None")
+            self.line_numbers.append(None)
+        for line_index, my_AST in enumerate(self.ast_lines):
+            self.line_number = line_index + 1
+            # python already runs the shapes fused nodes are made from in one step
+            while type(my_AST) == Fused_operator_node:
+                my_AST = my_AST.original_node
+            line_translator = self.line_translators.get(my_AST.type)
+            if line_translator != None:
+                line_translator(my_AST)
+            # any other leaf is a line which does nothing when run
+            elif type(my_AST) != Leaf_node:
+                self.emit(self.translate_token(my_AST))
+        if not self.blocks[0].has_statement:
+            self.emit("pass")
+        # the constants used are listed at the top of the source
+        source_lines = self.constant_comments + self.source_lines
+        line_numbers = [None]*len(self.constant_comments) + self.line_numbers
+        return "\n".join(source_lines) + "\n", line_numbers
+
+    # adds a line of source in the innermost open block, noting the line it comes from
+    def emit(self, source_line):
+        self.source_lines.append("    "*len(self.blocks) + f"{source_line}  # line {self.line_number}")
+        self.line_numbers.append(self.line_number)
+        self.blocks[-1].has_statement = True
+
+    # raises an error for a line that can't be translated
+    def untranslatable(self, reason):
+        raise Exception(f"Line {self.line_number} can't be transpiled: {reason}")
+
+    # --- Names and Values --- #
+
+    # gives the local variable a BigLang variable name refers to at the current line and the 
+    #   class of the python value it holds, which is None if it holds a virtual variable
+    # a for statement's variable only refers to its own local variable within the statement
+    def get_variable(self, name):
+        for block in reversed(self.blocks):
+            if block.loop_variable == name:
+                return block.loop_local_name, None
+        local_name = f"var_{name}"
+        self.variable_names[local_name] = name
+        return local_name, self.variable_types.get(name)
+
+    # checks whether a local variable is certain to have been declared at the current line
+    def is_declared(self, local_name):
+        return any(local_name in block.declared for block in self.blocks)
+
+    # makes a constant available to the generated source, returning its name
+    def add_constant(self, value):
+        constant_name = f"constant_{len(self.constant_comments)}"
+        self.namespace[constant_name] = value
+        self.constant_comments.append(f"# {constant_name} = {value}")
+        return constant_name
+
+    # gives the name an operation's handler function has in the generated source
+    def get_handler_name(self, operation):
+        handler_name = f"operation_{TOKEN_TYPE_IDENTIFIERS[operation]}"
+        self.namespace[handler_name] = operation_handlers[operation].function
+        return handler_name
+
+    # gives the source of a token holding the python value worked out by the source given
+    def make_token(self, source, value_class):
+        token_type = TOKEN_TYPE_IDENTIFIERS[VIRTUAL_CLASSES_TO_TOKEN_TYPES[value_class]]
+        return f"Token({token_type}, {value_class.__name__}({source}))"
+
+    # gives the source of the virtual variable a local variable holds
+    def make_virtual_variable(self, local_name, variable_class):
+        if variable_class == None:
+            return local_name
+        return f"{variable_class.__name__}({local_name})"
+
+    # --- Expressions --- #
+
+    # gives the source that works out the value of the AST, and the class of the python value 
+    #   it gives, if the class is None the source gives a token
+    def translate_value(self, my_AST):
+        if type(my_AST) == Leaf_node:
+            if my_AST.type == NAME_KEYWORD:
+                local_name, variable_class = self.get_variable(my_AST.value)
+                if variable_class != None:
+                    return local_name, variable_class
+                return f"{local_name}.convert_to_token()", None
+            value_class = TOKEN_TYPES_TO_VIRTUAL_CLASSES.get(my_AST.type)
+            if value_class != None:
+                value = convert_to_virtual_variable(Token(my_AST.type, my_AST.value)).get_value()
+                if can_be_python_literal(value):
+                    return repr(value), value_class
+            return self.translate_token(my_AST), None
+        elif type(my_AST) == Typed_operator_node:
+            return self.translate_typed_operator_node(my_AST)
+        elif type(my_AST) == Fused_operator_node:
+            return self.translate_value(my_AST.original_node)
+        # brackets give the value of what they surround
+        elif my_AST.type == BRACKETS and len(my_AST.child_nodes) == 1 and my_AST.child_nodes[0].type not in ROOT_NODE_TYPES:
+            return self.translate_value(my_AST.child_nodes[0])
+        elif my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT and len(my_AST.child_nodes) == 3:
+            return self.translate_logical_statement_node(my_AST), None
+        else:
+            return self.translate_operator_node(my_AST), None
+
+    # gives the source that works out the token the AST is condensed into, resolves_names is 
+    #   set if the operation the AST is an operand of converts variable names into their values
+    def translate_token(self, my_AST, resolves_names=True):
+        if type(my_AST) == Leaf_node:
+            if my_AST.type == NAME_KEYWORD and resolves_names:
+                local_name, variable_class = self.get_variable(my_AST.value)
+                if variable_class != None:
+                    return self.make_token(local_name, variable_class)
+                return f"{local_name}.convert_to_token()"
+            if resolves_names:
+                my_AST = make_virtual_leaf_node(my_AST)
+            return self.add_constant(Token(my_AST.type, my_AST.value))
+        source, value_class = self.translate_value(my_AST)
+        if value_class != None:
+            return self.make_token(source, value_class)
+        return source
+
+    # gives the source of the token each child node is condensed into
+    def translate_child_nodes(self, my_AST, resolves_names):
+        operand_sources = []
+        for child_node in my_AST.child_nodes:
+            if child_node.type in ROOT_NODE_TYPES:
+                message = f"The root node {child_node} has been passed to a {my_AST.type}"
+                operand_sources.append(f"raise_runtime_error({message!r})")
+            else:
+                operand_sources.append(self.translate_token(child_node, resolves_names))
+        return operand_sources
+
+    def translate_operator_node(self, my_AST):
+        operation_handler = operation_handlers.get(my_AST.type)
+        resolves_names = operation_handler != None and operation_handler.resolves_names
+        operand_sources = self.translate_child_nodes(my_AST, resolves_names)
+        if operation_handler == None:
+            message = f"Invalid operation: {my_AST.type}"
+            return f"raise_runtime_error({', '.join([repr(message)] + operand_sources)})"
+        if operation_handler.uses_environment:
+            self.untranslatable(f"{my_AST.type} operations change variables so must be a line of their own")
+        return f"{self.get_handler_name(my_AST.type)}([{', '.join(operand_sources)}])"
+
+    # the left operand's token and the result, if it is decided by the left operand, are held 
+    #   in locals so that the right operand is only worked out when it is needed
+    def translate_logical_statement_node(self, my_AST):
+        left_source, keyword_source, right_source = self.translate_child_nodes(my_AST, True)
+        self.logical_statement_count += 1
+        left_name = f"logic_left_{self.logical_statement_count}"
+        result_name = f"logic_result_{self.logical_statement_count}"
+        decided_source = f"({result_name} := get_short_circuit_result({left_name} := {left_source}, {keyword_source}))"
+        full_source = f"{self.get_handler_name(my_AST.type)}([{left_name}, {keyword_source}, {right_source}])"
+        return f"({result_name} if {decided_source} != None else {full_source})"
+
+    def translate_typed_operator_node(self, my_AST):
+        operand_sources = []
+        for index in my_AST.operand_indices:
+            source, value_class = self.translate_value(my_AST.child_nodes[index])
+            if value_class == None:
+                source = f"convert_to_virtual_variable({source}).get_value()"
+            operand_sources.append(source)
+        keyword_index = TYPED_OPERATION_LAYOUTS[my_AST.type][1]
+        if keyword_index == None:
+            keyword_type = None
+        else:
+            keyword_type = my_AST.child_nodes[keyword_index].type
+        result_class = TYPED_IMPLEMENTATIONS[(my_AST.type, keyword_type, my_AST.operand_types)][1]
+        if my_AST.type in PYTHON_ARITHMETIC_OPERATORS:
+            # the first operand is converted to a float first, as the typed implementation does
+            if result_class == Float_virtual and my_AST.operand_types[0] == Integer_virtual:
+                operand_sources[0] = f"float({operand_sources[0]})"
+            source = f"({operand_sources[0]} {PYTHON_ARITHMETIC_OPERATORS[my_AST.type]} {operand_sources[1]})"
+        elif my_AST.type == BOOLEAN_COMPARISON:
+            source = f"int({operand_sources[0]} {PYTHON_COMPARATORS[keyword_type]} {operand_sources[1]})"
+        elif my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT:
+            source = f"({operand_sources[0]} {PYTHON_LOGICAL_OPERATORS[keyword_type]} {operand_sources[1]})"
+        else:
+            source = f"(1 - {operand_sources[0]})"
+        return source, result_class
+
+    # gives the source of the condition of an IF or WHILE statement
+    def translate_condition(self, my_AST):
+        source, value_class = self.translate_value(my_AST.child_nodes[0])
+        # booleans are held as 1 or 0 so can be used as the condition
+        if value_class == Boolean_virtual:
+            return source
+        elif value_class != None:
+            source = self.make_token(source, value_class)
+        return f"is_condition_met({source})"
+
+    # --- Lines --- #
+
+    def translate_declaration(self, my_AST):
+        name = my_AST.child_nodes[1].value
+        local_name, variable_class = self.get_variable(name)
+        self.emit(f"{local_name} = {self.translate_declared_value(my_AST, variable_class)}")
+        self.blocks[-1].declared.add(local_name)
+        # the variable is made in the innermost frame, which mustn't already hold one with its name
+        if local_name in self.tracked_locals:
+            depth = len(self.blocks)-1
+            self.emit(f"if frame_depth_{local_name} == {depth}: raise_runtime_error({f'Variable {name} already exists'!r})")
+            self.emit(f"shadowed_depth_{local_name} = frame_depth_{local_name}")
+            self.emit(f"frame_depth_{local_name} = {depth}")
+            self.blocks[-1].tracked[local_name] = name
+
+    # gives the source of the value a variable is declared with
+    def translate_declared_value(self, my_AST, variable_class):
+        declaration_type = TOKEN_TYPE_IDENTIFIERS[my_AST.child_nodes[0].type]
+        if my_AST.type == DECLARATION_NORMAL_WITH_VALUE:
+            source, value_class = self.translate_value(my_AST.child_nodes[2])
+            if variable_class != None and value_class == variable_class:
+                return source
+            elif variable_class == Float_virtual and value_class == Integer_virtual:
+                return f"float({source})"
+            if value_class != None:
+                source = self.make_token(source, value_class)
+            value_source = f"make_declaration_value({declaration_type}, {source}).value"
+        else:
+            value_source = f"make_empty_declaration_value({declaration_type}).value"
+        # the declaration functions check the value's type and give a virtual variable
+        if variable_class != None:
+            value_source += ".get_value()"
+        return value_source
+
+    def translate_assignment(self, my_AST):
+        if type(my_AST.child_nodes[0]) != Leaf_node:
+            self.untranslatable("only variables can be assigned to")
+        local_name, variable_class = self.get_variable(my_AST.child_nodes[0].value)
+        source, value_class = self.translate_value(my_AST.child_nodes[1])
+        if variable_class != None and value_class == variable_class:
+            # reading the variable raises an error if it hasn't been declared
+            if not self.is_declared(local_name):
+                self.emit(local_name)
+            self.emit(f"{local_name} = {source}")
+        else:
+            if value_class != None:
+                source = self.make_token(source, value_class)
+            assigned_value = f"get_assigned_value({source}, {self.make_virtual_variable(local_name, variable_class)})"
+            if variable_class != None:
+                assigned_value += ".get_value()"
+            self.emit(f"{local_name} = {assigned_value}")
+
+    def translate_data_structure_change(self, my_AST):
+        function_name, convert_inputs = DATA_STRUCTURE_CHANGES[my_AST.type]
+        data_structure_node = my_AST.child_nodes[0]
+        if type(data_structure_node) != Leaf_node or data_structure_node.type != NAME_KEYWORD:
+            self.untranslatable("only data structures held by variables can be changed")
+        if len(my_AST.child_nodes) != len(convert_inputs) + 1:
+            self.untranslatable(f"{my_AST.type} was given the wrong number of inputs")
+        local_name, variable_class = self.get_variable(data_structure_node.value)
+        input_sources = [self.make_virtual_variable(local_name, variable_class)]
+        for child_node, convert_input in zip(my_AST.child_nodes[1:], convert_inputs):
+            input_source = self.translate_token(child_node)
+            if convert_input:
+                input_source = f"convert_to_virtual_variable({input_source})"
+            input_sources.append(input_source)
+        self.emit(f"{local_name} = {function_name}({', '.join(input_sources)})")
+
+    def translate_output(self, my_AST):
+        output_sources = [self.translate_token(child_node) for child_node in my_AST.child_nodes]
+        self.emit(f"handle_outputs([{', '.join(output_sources)}])")
+
+    def translate_if_statement(self, my_AST):
+        self.emit(f"if {self.translate_condition(my_AST)}:")
+        self.blocks.append(Transpiled_block(IF_STATEMENT, None, None, None))
+
+    def translate_else(self, my_AST):
+        self.translate_block_end(my_AST)
+        self.emit("else:")
+        self.blocks.append(Transpiled_block(ELSE, None, None, None))
+
+    def translate_while_statement(self, my_AST):
+        self.emit(f"while {self.translate_condition(my_AST)}:")
+        self.blocks.append(Transpiled_block(WHILE_STATEMENT, None, None, None))
+
+    def translate_for_statement(self, my_AST):
+        name = my_AST.child_nodes[0].value
+        self.for_statement_count += 1
+        loop_local_name = f"for_{self.for_statement_count}_{name}"
+        items_name = f"for_items_{self.for_statement_count}"
+        self.variable_names[loop_local_name] = name
+        self.emit(f"{items_name} = get_for_statement_items({self.translate_token(my_AST.child_nodes[1])})")
+        self.emit(f"for {loop_local_name} in {items_name}:")
+        outer_local_name = self.get_variable(name)[0]
+        block = Transpiled_block(FOR_STATEMENT, name, loop_local_name, items_name)
+        if outer_local_name != f"var_{name}" or name in self.declaration_counts:
+            block.shadowed_local_name = outer_local_name
+        block.declared.add(loop_local_name)
+        self.blocks.append(block)
+        # the variable is made in the for statement's frame on every pass through it
+        if self.line_number-1 in self.tracked_for_statements:
+            self.tracked_locals.add(loop_local_name)
+            self.emit(f"frame_depth_{loop_local_name} = {len(self.blocks)-1}")
+
+    # the for statement's variable is moved into the frame below when each pass through it 
+    #   ends and then removed, so that frame can't hold a variable with its name
+    # a for statement given an empty array skips to its end, where the frame it opened isn't 
+    #   one that ENDFOR can close
+    def translate_for_statement_end(self, my_AST):
+        block = self.blocks[-1]
+        if block.shadowed_local_name != None:
+            message = f"Variable {block.loop_variable} already exists"
+            self.emit(f"if frame_depth_{block.shadowed_local_name} == {len(self.blocks)-2}: raise_runtime_error({message!r})")
+        block.tracked.pop(block.loop_local_name, None)
+        items_name = block.items_name
+        self.translate_block_end(my_AST)
+        self.emit(f"if len({items_name}) == 0: raise_runtime_error('ENDFOR can only be placed to end a for statement')")
+
+    # the tracked variables the block's frame may hold are moved into the frame below
+    def translate_block_end(self, my_AST):
+        block = self.blocks[-1]
+        depth = len(self.blocks)-1
+        for local_name, name in block.tracked.items():
+            self.emit(f"if frame_depth_{local_name} == {depth}: frame_depth_{local_name} = " \
+                f"close_variable_frame(shadowed_depth_{local_name}, {depth}, {name!r})")
+        if not block.has_statement:
+            self.emit("pass")
+        self.blocks.pop()
+        self.blocks[-1].tracked.update(block.tracked)
+
+# a program translated into python source, which can be run any number of times
+class Transpiled_program(object):
+    def __init__(self, source, namespace, line_numbers, variable_names):
+        self.source = source
+        self.line_numbers = line_numbers
+        self.variable_names = variable_names
+        code = compile(source, TRANSPILED_FILE_NAME, "exec")
+        exec(code, namespace)
+        self.run_program = namespace["run_program"]
+
+    def run(self):
+        try:
+            self.run_program()
+        except Exception as error:
+            raise Exception(f"Error on line {self.find_line_number(error)}: {self.describe_error(error)}") from error
+
+    # finds the BigLang line of the innermost line of generated source the error passed through
+    def find_line_number(self, error):
+        line_number = None
+        traceback = error.__traceback__
+        while traceback != None:
+            if traceback.tb_frame.f_code.co_filename == TRANSPILED_FILE_NAME:
+                line_number = self.line_numbers[traceback.tb_lineno-1]
+            traceback = traceback.tb_next
+        return line_number
+
+    # reading a local variable that hasn't been given a value is reading a BigLang variable 
+    #   that hasn't been declared
+    def describe_error(self, error):
+        if isinstance(error, NameError):
+            # local variables that are read before being given a value don't give their name
+            local_name = error.name
+            if local_name == None and str(error).count("'") >= 2:
+                local_name = str(error).split("'")[1]
+            if local_name in self.variable_names:
+                return f"there is no variable with the name keyword {self.variable_names[local_name]} available in the current scope"
+        return str(error)
+
+# translates a program into python, writing the source to TRANSPILED_SOURCE_FILE if it is set
+# gives None for a program nested too deeply for python to compile once translated
+# the source is written before it is compiled, so source python can't compile can be read
+def transpile_program(ast_lines):
+    python_transpiler = Python_transpiler(ast_lines)
+    if not python_transpiler.can_be_compiled():
+        return None
+    source, line_numbers = python_transpiler.translate()
+    if TRANSPILED_SOURCE_FILE != None:
+        file = open(TRANSPILED_SOURCE_FILE, "w")
+        file.write(source)
+        file.close()
+    if DEBUG_OUTPUTS : print(source)
+    return Transpiled_program(source, python_transpiler.namespace, line_numbers, python_transpiler.variable_names)
+
+
+# ------------------------------ BYTECODE VIRTUAL MACHINE ------------------------------ #
+
+# Compiles a whole program into a flat array of instructions which a stack based virtual 
+#   machine runs
+# Every instruction is an opcode followed by one argument, both integers, the argument is either
+#   the index of the instruction's entry in the operand table, the position of the instruction 
+#   it jumps to or a count. The blocks of IF, WHILE and FOR statements are run with jumps in 
+#   place of moving between lines, while still opening and closing frames in the virtual 
+#   environment as the other execution engines do
+# Expressions leave their tokens on the value stack, or the python values of their operands 
+#   for typed operator nodes, which are taken off the stack by the instruction that uses them
+
+# used to store instructions compactly in bytecode files
+from array import array
+
+# used to save bytecode to files, the operand table is saved as plain python values which are 
+#   made back into tokens, virtual variables and layouts when it is loaded (see Bytecode Files),
+#   so loading a bytecode file never runs anything held in it
+import marshal
+
+# pushes the operand, a token or the python value of a typed operand
+OP_LOAD_CONSTANT = 0
+# pushes the token of the value of the variable named by the operand
+OP_LOAD_VARIABLE = 1
+# pushes the python value of the variable named by the operand
+OP_LOAD_VALUE = 2
+# replaces the token on top of the stack with its python value
+OP_TO_VALUE = 3
+# removes the token on top of the stack, used once the line it is the result of has been run
+OP_POP = 4
+# carry out an operation on the tokens (or values for typed operations) on top of the stack, 
+#   the operand is the operation and how many inputs it takes
+OP_CALL_OPERATION = 5
+OP_CALL_ENVIRONMENT_OPERATION = 6
+OP_CALL_TYPED = 7
+# takes the inputs off the stack then raises an error, the operand is the message and the 
+#   number of inputs
+OP_RAISE_ERROR = 8
+# outputs the number of tokens given by the argument
+OP_OUTPUT = 9
+# block instructions, those that can skip a block jump to the instruction given by their argument
+OP_OPEN_IF = 10
+OP_ELSE = 11
+OP_END_IF = 12
+OP_OPEN_WHILE = 13
+OP_END_WHILE = 14
+OP_OPEN_FOR = 15
+OP_END_FOR = 16
+# short circuiting AND and OR (see Short Circuiting), if the left operand decides the result it
+#   is replaced by the result token and they jump past the right operand and the operation to
+#   the instruction given by their argument
+# the left operand and logical keyword tokens of a binary boolean logical statement are on top 
+#   of the stack
+OP_SHORT_CIRCUIT = 17
+# the python value of the left operand of a typed AND or OR is on top of the stack
+OP_SHORT_CIRCUIT_AND = 18
+OP_SHORT_CIRCUIT_OR = 19
+# makes the operand the scope of the lines being run (see Variable Resolution), it begins each
+#   line whose scope isn't the same as the line before's and each line that is jumped to
+OP_SET_SCOPE = 20
+
+OPCODE_NAMES = {
+    OP_LOAD_CONSTANT: "LOAD_CONSTANT",
+    OP_LOAD_VARIABLE: "LOAD_VARIABLE",
+    OP_LOAD_VALUE: "LOAD_VALUE",
+    OP_TO_VALUE: "TO_VALUE",
+    OP_POP: "POP",
+    OP_CALL_OPERATION: "CALL_OPERATION",
+    OP_CALL_ENVIRONMENT_OPERATION: "CALL_ENVIRONMENT_OPERATION",
+    OP_CALL_TYPED: "CALL_TYPED",
+    OP_RAISE_ERROR: "RAISE_ERROR",
+    OP_OUTPUT: "OUTPUT",
+    OP_OPEN_IF: "OPEN_IF",
+    OP_ELSE: "ELSE",
+    OP_END_IF: "END_IF",
+    OP_OPEN_WHILE: "OPEN_WHILE",
+    OP_END_WHILE: "END_WHILE",
+    OP_OPEN_FOR: "OPEN_FOR",
+    OP_END_FOR: "END_FOR",
+    OP_SHORT_CIRCUIT: "SHORT_CIRCUIT",
+    OP_SHORT_CIRCUIT_AND: "SHORT_CIRCUIT_AND",
+    OP_SHORT_CIRCUIT_OR: "SHORT_CIRCUIT_OR",
+    OP_SET_SCOPE: "SET_SCOPE"
+}
+
+# the opcodes whose argument is the index of an entry in the operand table, or the position
+#   of an instruction
+OPERAND_OPCODES = {OP_LOAD_CONSTANT, OP_LOAD_VARIABLE, OP_LOAD_VALUE, OP_CALL_OPERATION, \
+    OP_CALL_ENVIRONMENT_OPERATION, OP_CALL_TYPED, OP_RAISE_ERROR, OP_SET_SCOPE}
+JUMP_OPCODES = {OP_OPEN_IF, OP_ELSE, OP_OPEN_WHILE, OP_END_WHILE, OP_OPEN_FOR, OP_SHORT_CIRCUIT, \
+    OP_SHORT_CIRCUIT_AND, OP_SHORT_CIRCUIT_OR}
+
+# the lines that end blocks and the instruction each is compiled into
+BLOCK_ENDING_OPCODES = {ELSE: OP_ELSE, END_IF: OP_END_IF, END_WHILE: OP_END_WHILE, END_FOR: OP_END_FOR}
+# the instruction that short circuits each typed logical statement
+TYPED_SHORT_CIRCUIT_OPCODES = {AND: OP_SHORT_CIRCUIT_AND, OR: OP_SHORT_CIRCUIT_OR}
+
+# --- Compilation --- #
+
+class Bytecode_compiler(object):
+    def __init__(self, ast_lines):
+        self.ast_lines = ast_lines
+        self.block_jumps = find_block_jumps(ast_lines)
+        # the while statement each ENDWHILE returns to
+        self.while_statements = {}
+        for line_index, jump in self.block_jumps.items():
+            if ast_lines[line_index].type == WHILE_STATEMENT:
+                self.while_statements[jump] = line_index
+        if RESOLVE_VARIABLES:
+            self.base_layout, self.line_scopes = resolve_variables(ast_lines)
+        else:
+            self.base_layout, self.line_scopes = None, None
+        # the lines that can be reached other than from the line before, which are skipped to, 
+        #   returned to by ENDWHILE or, after a for statement, returned to by ENDFOR
+        self.jumped_to_lines = set(self.block_jumps.values()) | set(self.while_statements.values()) \
+            | {line_index+1 for line_index, my_AST in enumerate(ast_lines) if my_AST.type == FOR_STATEMENT}
+        # opcodes and arguments, one after the other
+        self.code = []
+        self.operands = []
+        # the index of each operand that can be shared by instructions which use the same one
+        self.operand_indices = {}
+        # the BigLang line number of each instruction
+        self.line_numbers = []
+        # the position of each line's first instruction
+        self.line_starts = []
+        # the positions of the arguments of jumps and the index of the line they jump to, 
+        #   which are filled in once every line's position is known
+        self.line_jumps = []
+
+    def compile(self):
+        previous_line_scope = None
+        for line_index, my_AST in enumerate(self.ast_lines):
+            self.line_number = line_index + 1
+            self.line_starts.append(len(self.code))
+            if self.line_scopes != None:
+                line_scope = self.line_scopes[line_index]
+                if line_scope is not previous_line_scope or line_index in self.jumped_to_lines:
+                    self.emit(OP_SET_SCOPE, self.add_operand(line_scope))
+                previous_line_scope = line_scope
+            self.compile_line(line_index, my_AST)
+        for argument_position, line_index in self.line_jumps:
+            self.code[argument_position] = self.line_starts[line_index]
+        return Bytecode_program(self.code, self.operands, self.line_numbers, self.base_layout)
+
+    def emit(self, opcode, argument=0):
+        self.code.append(opcode)
+        self.code.append(argument)
+        self.line_numbers.append(self.line_number)
+
+    # emits a jump to the first instruction of a line
+    def emit_line_jump(self, opcode, line_index):
+        self.emit(opcode)
+        self.line_jumps.append((len(self.code)-1, line_index))
+
+    # emits a jump forwards within a line, giving the position of its argument so that it can be
+    #   filled in by patch_jump once the instruction it jumps to is reached
+    def emit_forward_jump(self, opcode):
+        self.emit(opcode)
+        return len(self.code)-1
+
+    # makes a forward jump go to the next instruction emitted
+    def patch_jump(self, argument_position):
+        self.code[argument_position] = len(self.code)
+
+    # adds an entry to the operand table, returning its index
+    def add_operand(self, operand):
+        if type(operand) in [str, tuple, Line_scope]:
+            # line scopes are shared by the lines in the same block so are the same object
+            if type(operand) == Line_scope:
+                operand_key = (Line_scope, id(operand))
+            else:
+                operand_key = (type(operand), operand)
+            if operand_key not in self.operand_indices:
+                self.operand_indices[operand_key] = len(self.operands)
+                self.operands.append(operand)
+            return self.operand_indices[operand_key]
+        self.operands.append(operand)
+        return len(self.operands)-1
+
+    def compile_line(self, line_index, my_AST):
+        # fused nodes are compiled as the nodes they replace
+        while type(my_AST) == Fused_operator_node:
+            my_AST = my_AST.original_node
+        line_type = my_AST.type
+        if line_type == OUTPUT_CALL:
+            self.compile_child_nodes(my_AST)
+            self.emit(OP_OUTPUT, len(my_AST.child_nodes))
+        elif line_type == IF_STATEMENT:
+            self.compile_child_nodes(my_AST)
+            self.emit_line_jump(OP_OPEN_IF, self.block_jumps[line_index])
+        elif line_type == WHILE_STATEMENT:
+            self.compile_child_nodes(my_AST)
+            self.emit_line_jump(OP_OPEN_WHILE, self.block_jumps[line_index])
+        elif line_type == FOR_STATEMENT:
+            # the name of the variable is given as a token and the values to iterate over as theirs
+            self.compile_token(my_AST.child_nodes[0])
+            self.compile_token(my_AST.child_nodes[1], resolves_names=True)
+            self.emit_line_jump(OP_OPEN_FOR, self.block_jumps[line_index])
+        elif line_type == ELSE:
+            self.emit_line_jump(OP_ELSE, self.block_jumps[line_index])
+        elif line_type == END_WHILE:
+            # ENDWHILE jumps back to the while statement its block was opened by
+            self.emit_line_jump(OP_END_WHILE, self.while_statements[line_index])
+        elif line_type in BLOCK_ENDING_OPCODES:
+            self.emit(BLOCK_ENDING_OPCODES[line_type])
+        # any other leaf is a line which does nothing when run
+        elif type(my_AST) != Leaf_node:
+            self.compile_token(my_AST)
+            self.emit(OP_POP)
+
+    # pushes the tokens of a node's children, resolving names if its operation does
+    def compile_child_nodes(self, my_AST):
+        operation_handler = operation_handlers.get(my_AST.type)
+        resolves_names = operation_handler != None and operation_handler.resolves_names
+        for child_node in my_AST.child_nodes:
+            self.compile_child_node(my_AST, child_node, resolves_names)
+
+    def compile_child_node(self, my_AST, child_node, resolves_names):
+        if child_node.type in ROOT_NODE_TYPES:
+            message = f"The root node {child_node} has been passed to a {my_AST.type}"
+            self.emit(OP_RAISE_ERROR, self.add_operand((message, 0)))
+        else:
+            self.compile_token(child_node, resolves_names)
+
+    # emits the instructions that push the token the AST is condensed into, resolves_names is 
+    #   set if the operation the AST is an operand of converts variable names into their values
+    def compile_token(self, my_AST, resolves_names=False):
+        if type(my_AST) == Leaf_node:
+            if my_AST.type == NAME_KEYWORD and resolves_names:
+                self.emit(OP_LOAD_VARIABLE, self.add_operand(my_AST.value))
+            else:
+                if resolves_names:
+                    my_AST = make_virtual_leaf_node(my_AST)
+                self.emit(OP_LOAD_CONSTANT, self.add_operand(Token(my_AST.type, my_AST.value)))
+        elif type(my_AST) == Typed_operator_node:
+            self.compile_typed_operator_node(my_AST)
+        elif type(my_AST) == Fused_operator_node:
+            self.compile_token(my_AST.original_node, resolves_names)
+        elif my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT and len(my_AST.child_nodes) == 3:
+            self.compile_logical_statement_node(my_AST)
+        else:
+            self.compile_child_nodes(my_AST)
+            operation_handler = operation_handlers.get(my_AST.type)
+            input_count = len(my_AST.child_nodes)
+            if operation_handler == None:
+                self.emit(OP_RAISE_ERROR, self.add_operand((f"Invalid operation: {my_AST.type}", input_count)))
+            elif operation_handler.uses_environment:
+                self.emit(OP_CALL_ENVIRONMENT_OPERATION, self.add_operand((my_AST.type, input_count)))
+            else:
+                self.emit(OP_CALL_OPERATION, self.add_operand((my_AST.type, input_count)))
+
+    # the right operand is only pushed if the left one doesn't decide the result
+    def compile_logical_statement_node(self, my_AST):
+        left_node, keyword_node, right_node = my_AST.child_nodes
+        self.compile_child_node(my_AST, left_node, True)
+        self.compile_child_node(my_AST, keyword_node, True)
+        jump_position = self.emit_forward_jump(OP_SHORT_CIRCUIT)
+        self.compile_child_node(my_AST, right_node, True)
+        self.emit(OP_CALL_OPERATION, self.add_operand((my_AST.type, 3)))
+        self.patch_jump(jump_position)
+
+    # the key of the implementation is saved rather than the implementation, so that it can be
+    #   found again when the bytecode is loaded
+    def compile_typed_operator_node(self, my_AST):
+        keyword_index = TYPED_OPERATION_LAYOUTS[my_AST.type][1]
+        if keyword_index == None:
+            keyword_type = None
+        else:
+            keyword_type = my_AST.child_nodes[keyword_index].type
+        jump_position = None
+        for index in my_AST.operand_indices:
+            self.compile_operand(my_AST.child_nodes[index])
+            if my_AST.type == BINARY_BOOLEAN_LOGICAL_STATEMENT and jump_position == None:
+                jump_position = self.emit_forward_jump(TYPED_SHORT_CIRCUIT_OPCODES[keyword_type])
+        implementation_key = (my_AST.type, keyword_type, my_AST.operand_types)
+        self.emit(OP_CALL_TYPED, self.add_operand((implementation_key, len(my_AST.operand_indices))))
+        if jump_position != None:
+            self.patch_jump(jump_position)
+
+    # emits the instructions that push the python value of an operand of a typed operator node
+    def compile_operand(self, my_AST):
+        if type(my_AST) == Leaf_node and my_AST.type == NAME_KEYWORD:
+            self.emit(OP_LOAD_VALUE, self.add_operand(my_AST.value))
+        elif type(my_AST) == Leaf_node:
+            value = convert_to_virtual_variable(Token(my_AST.type, my_AST.value)).get_value()
+            self.emit(OP_LOAD_CONSTANT, self.add_operand(value))
+        else:
+            self.compile_token(my_AST)
+            self.emit(OP_TO_VALUE)
+
+# --- Virtual Machine --- #
+
+# a program compiled into bytecode, which can be run any number of times
+class Bytecode_program(object):
+    def __init__(self, code, operands, line_numbers, base_layout=None):
+        self.code = list(code)
+        self.operands = operands
+        self.line_numbers = line_numbers
+        self.base_layout = base_layout
+        # the operand table used when running, where operations are replaced by the functions 
+        #   that carry them out
+        self.run_operands = list(operands)
+        for position in range(0, len(self.code), 2):
+            opcode = self.code[position]
+            operand_index = self.code[position+1]
+            if opcode in [OP_CALL_OPERATION, OP_CALL_ENVIRONMENT_OPERATION]:
+                operation, input_count = operands[operand_index]
+                self.run_operands[operand_index] = (operation_handlers[operation].function, input_count)
+            elif opcode == OP_CALL_TYPED:
+                implementation_key, input_count = operands[operand_index]
+                self.run_operands[operand_index] = (TYPED_IMPLEMENTATIONS[implementation_key][0], input_count)
+
+    # the dispatch loop, the most common instructions are checked for first
+    def run(self):
+        code = self.code
+        operands = self.run_operands
+        virtual_environment = Virtual_environment(None, self.base_layout)
+        stack = []
+        position = 0
+        end_position = len(code)
+        try:
+            while position < end_position:
+                opcode = code[position]
+                argument = code[position+1]
+                position += 2
+                if opcode == OP_LOAD_VALUE:
+                    stack.append(virtual_environment.read_virtual_variable(operands[argument]).get_value())
+                elif opcode == OP_LOAD_CONSTANT:
+                    stack.append(operands[argument])
+                elif opcode == OP_CALL_TYPED:
+                    implementation, input_count = operands[argument]
+                    # binary operations are the most common so their operands are taken directly
+                    if input_count == 2:
+                        value_2 = stack.pop()
+                        stack[-1] = implementation(stack[-1], value_2)
+                    else:
+                        values = stack[len(stack)-input_count:]
+                        del stack[len(stack)-input_count:]
+                        stack.append(implementation(*values))
+                elif opcode == OP_LOAD_VARIABLE:
+                    stack.append(virtual_environment.fetch_virtual_variable(operands[argument]))
+                elif opcode == OP_CALL_ENVIRONMENT_OPERATION:
+                    function, input_count = operands[argument]
+                    input_tokens = stack[len(stack)-input_count:]
+                    del stack[len(stack)-input_count:]
+                    output = function(input_tokens, virtual_environment)
+                    stack.append(NON_ACTIONABLE_ROOT_NODE_TOKEN if output == None else output)
+                elif opcode == OP_POP:
+                    stack.pop()
+                elif opcode == OP_SET_SCOPE:
+                    virtual_environment.line_scope = operands[argument]
+                elif opcode == OP_CALL_OPERATION:
+                    function, input_count = operands[argument]
+                    input_tokens = stack[len(stack)-input_count:]
+                    del stack[len(stack)-input_count:]
+                    output = function(input_tokens)
+                    stack.append(NON_ACTIONABLE_ROOT_NODE_TOKEN if output == None else output)
+                elif opcode == OP_OPEN_IF:
+                    # the condition of an if frame is whether its else section should be run
+                    if is_condition_met(stack.pop()):
+                        virtual_environment.new_stack_frame(IF_FRAME, False)
+                    else:
+                        virtual_environment.new_stack_frame(IF_FRAME, True)
+                        position = argument
+                elif opcode == OP_END_IF:
+                    frame_type, run_else_bool = virtual_environment.constructive_pop_stack_frame()
+                    if frame_type != IF_FRAME:
+                        raise Exception("ENDIF can only be placed to end an if statement")
+                elif opcode == OP_OPEN_WHILE:
+                    # the condition of a while frame is whether ENDWHILE returns to the while statement
+                    if is_condition_met(stack.pop()):
+                        virtual_environment.new_stack_frame(WHILE_FRAME, True)
+                    else:
+                        virtual_environment.new_stack_frame(WHILE_FRAME, None)
+                        position = argument
+                elif opcode == OP_END_WHILE:
+                    frame_type, returns = virtual_environment.constructive_pop_stack_frame()
+                    if frame_type != WHILE_FRAME:
+                        raise Exception("ENDWHILE can only be placed to end an while statement")
+                    if returns:
+                        position = argument
+                elif opcode == OP_ELSE:
+                    frame_type, run_else_bool = virtual_environment.constructive_pop_stack_frame()
+                    if frame_type != IF_FRAME:
+                        raise Exception("ELSE can only be placed to end an if statement")
+                    virtual_environment.new_stack_frame(IF_FRAME, None)
+                    if not run_else_bool:
+                        position = argument
+                elif opcode == OP_OUTPUT:
+                    output_tokens = stack[len(stack)-argument:]
+                    del stack[len(stack)-argument:]
+                    handle_outputs(output_tokens)
+                elif opcode == OP_OPEN_FOR:
+                    values_list = convert_to_virtual_variable(stack.pop())
+                    name = stack.pop().value
+                    if type(values_list) != Array_virtual:
+                        raise Exception(f"Input {values_list} is not an array")
+                    if values_list.get_length() == 0:
+                        # skipping a for statement opens a while frame, as SKIP_FOR and 
+                        #   SKIP_WHILE are handled the same way by Program_runner
+                        virtual_environment.new_stack_frame(WHILE_FRAME, None)
+                        position = argument
+                    else:
+                        # the condition of a for frame is the name of its variable, the values 
+                        #   still to be iterated over and the position the block starts at
+                        virtual_environment.new_stack_frame(FOR_FRAME, \
+                            [name, values_list.read_item([Integer_virtual(1), \
+                                Integer_virtual(values_list.get_length()-1)]), position])
+                        virtual_environment.make_variable(values_list.read_item(0).convert_to_token(), name)
+                elif opcode == OP_END_FOR:
+                    frame_type, conditions = virtual_environment.constructive_pop_stack_frame()
+                    if frame_type != FOR_FRAME:
+                        raise Exception("ENDFOR can only be placed to end a for statement")
+                    if conditions:
+                        name, values_list, block_position = conditions
+                        virtual_environment.delete_variable(name)
+                        if len(values_list) != 0:
+                            virtual_environment.new_stack_frame(FOR_FRAME, [name, values_list[1:], block_position])
+                            virtual_environment.make_variable(values_list[0].convert_to_token(), name)
+                            position = block_position
+                elif opcode == OP_TO_VALUE:
+                    stack[-1] = get_operand_value(stack[-1], virtual_environment)
+                elif opcode == OP_SHORT_CIRCUIT_AND:
+                    if stack[-1] == 0:
+                        stack[-1] = SHORT_CIRCUIT_RESULTS[AND][1]
+                        position = argument
+                elif opcode == OP_SHORT_CIRCUIT_OR:
+                    if stack[-1] == 1:
+                        stack[-1] = SHORT_CIRCUIT_RESULTS[OR][1]
+                        position = argument
+                elif opcode == OP_SHORT_CIRCUIT:
+                    result_token = get_short_circuit_result(stack[-2], stack[-1])
+                    if result_token != None:
+                        del stack[-2:]
+                        stack.append(result_token)
+                        position = argument
+                elif opcode == OP_RAISE_ERROR:
+                    message, input_count = operands[argument]
+                    raise Exception(message)
+                else:
+                    raise Exception(f"Invalid opcode: {opcode}")
+        except Exception as error:
+            raise Exception(f"Error on line {self.line_numbers[position//2-1]}: {error}") from error
+
+        if DEBUG_OUTPUTS : print(virtual_environment)
+        if virtual_environment.get_frame_stack_len() != 1:
+            raise Exception(f"Program ended without working back to base \
+                frame, length: {virtual_environment.get_frame_stack_len()}")
+
+# gives the readable form of an entry in the operand table
+def describe_operand(opcode, operand):
+    if opcode in [OP_CALL_OPERATION, OP_CALL_ENVIRONMENT_OPERATION]:
+        operation, input_count = operand
+        return f"{operation} of {input_count} inputs"
+    elif opcode == OP_CALL_TYPED:
+        (operation, keyword_type, operand_types), input_count = operand
+        class_names = ", ".join(operand_type.__name__ for operand_type in operand_types)
+        if keyword_type == None:
+            return f"{operation} of {class_names}"
+        return f"{operation} {keyword_type} of {class_names}"
+    elif opcode == OP_RAISE_ERROR:
+        return operand[0]
+    elif opcode == OP_SET_SCOPE:
+        return f"{len(operand.addresses)} resolved variables"
+    return repr(operand) if type(operand) == str else str(operand)
+
+# gives the readable form of every instruction of a program, grouped by the line they come from
+def disassemble_bytecode(bytecode_program):
+    code = bytecode_program.code
+    operands = bytecode_program.operands
+    line_numbers = bytecode_program.line_numbers
+    text_lines = []
+    for position in range(0, len(code), 2):
+        opcode = code[position]
+        argument = code[position+1]
+        line_number = line_numbers[position//2]
+        if position == 0 or line_numbers[position//2-1] != line_number:
+            text_lines.append(f"line {line_number}:")
+        if opcode in OPERAND_OPCODES:
+            description = f"({describe_operand(opcode, operands[argument])})"
+        elif opcode in JUMP_OPCODES:
+            if argument < len(code):
+                description = f"(to line {line_numbers[argument//2]})"
+            else:
+                description = "(to the end)"
+        else:
+            description = ""
+        text_lines.append(f"    {position:>6} {OPCODE_NAMES[opcode]:<28} {argument:>5}  {description}".rstrip())
+    return "\n".join(text_lines)
+
+# --- Bytecode Files --- #
+
+# compiled programs can be saved to a bytecode file (.blb) and run from it later without being 
+#   parsed or compiled again, a bytecode file records the version stamp of the interpreter that 
+#   made it as it can only be run by the same version
+# The file is two marshalled values, a header of the bytecode format and version stamp which is 
+#   checked before anything else is read, and the program. Marshal only holds plain python 
+#   values, so the entries of the operand table are saved as tuples of token type codes, class 
+#   names, strings and numbers, which are checked as they are made back into what they stood for
+BYTECODE_FILE_EXTENSION = ".blb"
+BYTECODE_FORMAT = 4
+
+# the virtual variable classes that can be saved, found again by their names
+SAVED_VIRTUAL_CLASSES = {virtual_class.__name__: virtual_class for virtual_class in [Integer_virtual, \
+    Float_virtual, String_virtual, Character_virtual, Boolean_virtual, Tuple_virtual, Array_virtual, \
+    Stack_virtual, Queue_virtual, Priority_queue_virtual, Dictionary_pair, Dictionary_virtual]}
+# the python values typed operands can have
+SAVED_VALUE_TYPES = [int, float, str]
+
+# a virtual variable is saved as the name of its class and its value, with the virtual variables 
+#   within data structures saved the same way
+def encode_virtual_variable(variable):
+    variable_class = type(variable)
+    if variable_class in [Tuple_virtual, Array_virtual, Stack_virtual, Queue_virtual]:
+        value = tuple(encode_virtual_variable(item) for item in variable.value)
+    elif variable_class == Priority_queue_virtual:
+        value = tuple((encode_virtual_variable(item), priority) for item, priority in variable.value)
+    elif variable_class == Dictionary_pair:
+        value = (encode_virtual_variable(variable.key), encode_virtual_variable(variable.value))
+    elif variable_class == Dictionary_virtual:
+        entries = []
+        for key, entry_value, used in variable.dictionary_list:
+            if key == None:
+                entries.append((None, None, used))
+            else:
+                entries.append((encode_virtual_variable(key), encode_virtual_variable(entry_value), used))
+        value = (variable.dictionary_length, variable.max_length, tuple(entries))
+    else:
+        value = variable.value
+    return (variable_class.__name__, value)
+
+def decode_virtual_variable(encoded_variable):
+    class_name, value = encoded_variable
+    variable_class = SAVED_VIRTUAL_CLASSES[class_name]
+    if variable_class in [Tuple_virtual, Array_virtual, Stack_virtual, Queue_virtual]:
+        variable = variable_class([decode_virtual_variable(item) for item in value])
+    elif variable_class == Priority_queue_virtual:
+        variable = variable_class([[decode_virtual_variable(item), int(priority)] for item, priority in value])
+    elif variable_class == Dictionary_pair:
+        variable = variable_class(decode_virtual_variable(value[0]), decode_virtual_variable(value[1]))
+    elif variable_class == Dictionary_virtual:
+        dictionary_length, max_length, entries = value
+        dictionary_list = []
+        for key, entry_value, used in entries:
+            if key == None:
+                dictionary_list.append([None, None, bool(used)])
+            else:
+                dictionary_list.append([decode_virtual_variable(key), decode_virtual_variable(entry_value), bool(used)])
+        if len(dictionary_list) != max_length:
+            raise ValueError("dictionary list doesn't match its length")
+        variable = variable_class(int(dictionary_length), int(max_length), dictionary_list)
+    elif type(value) in SAVED_VALUE_TYPES:
+        variable = variable_class(value)
+    else:
+        raise ValueError(f"{class_name} can't have the value {value!r}")
+    return variable
+
+# a token is saved as the code of its type and its value, which is a string, None or a virtual variable
+def encode_token(token):
+    if isinstance(token.value, Virtual_variable):
+        return (int(token.type), True, encode_virtual_variable(token.value))
+    return (int(token.type), False, token.value)
+
+def decode_token(encoded_token):
+    type_code, is_virtual, value = encoded_token
+    if is_virtual:
+        value = decode_virtual_variable(value)
+    elif value != None and type(value) != str:
+        raise ValueError(f"a token can't have the value {value!r}")
+    return Token(get_saved_token_type(type_code), value)
+
+def get_saved_token_type(type_code):
+    if type(type_code) != int or not 0 <= type_code < len(token_types):
+        raise ValueError(f"{type_code!r} is not a token type code")
+    return get_token_type(type_code)
+
+# layouts are saved once as the names of their slots and referred to by their index, as the 
+#   frames of a running program are checked against them by identity
+def encode_layout(layout, layouts, layout_indices):
+    if layout == None:
+        return None
+    if id(layout) not in layout_indices:
+        layout_indices[id(layout)] = len(layouts)
+        layouts.append(tuple(layout.slot_names))
+    return layout_indices[id(layout)]
+
+def decode_layout(layout_index, layouts):
+    if layout_index == None:
+        return None
+    return layouts[layout_index]
+
+# every operand is saved in the form for the instructions that use it, encode_operand and 
+#   decode_operand are the two halves of each form
+def encode_operand(opcode, operand, layouts, layout_indices):
+    if opcode in [OP_CALL_OPERATION, OP_CALL_ENVIRONMENT_OPERATION]:
+        operation, input_count = operand
+        return (int(operation), input_count)
+    elif opcode == OP_CALL_TYPED:
+        (operation, keyword_type, operand_types), input_count = operand
+        keyword_code = None if keyword_type == None else int(keyword_type)
+        class_names = tuple(operand_type.__name__ for operand_type in operand_types)
+        return ((int(operation), keyword_code, class_names), input_count)
+    elif opcode == OP_SET_SCOPE:
+        addresses = tuple((name, depth, slot, encode_layout(layout, layouts, layout_indices)) \
+            for name, (depth, slot, layout) in operand.addresses.items())
+        return (addresses, encode_layout(operand.opened_layout, layouts, layout_indices))
+    elif opcode == OP_LOAD_CONSTANT and type(operand) == Token:
+        return encode_token(operand)
+    # names, error messages and the python values of typed operands are already plain values
+    return operand
+
+def decode_operand(opcode, encoded_operand, layouts):
+    if opcode in [OP_CALL_OPERATION, OP_CALL_ENVIRONMENT_OPERATION]:
+        type_code, input_count = encoded_operand
+        operation = get_saved_token_type(type_code)
+        if operation not in operation_handlers:
+            raise ValueError(f"{operation} is not an operation")
+        return (operation, int(input_count))
+    elif opcode == OP_CALL_TYPED:
+        (type_code, keyword_code, class_names), input_count = encoded_operand
+        keyword_type = None if keyword_code == None else get_saved_token_type(keyword_code)
+        operand_types = tuple(SAVED_VIRTUAL_CLASSES[class_name] for class_name in class_names)
+        implementation_key = (get_saved_token_type(type_code), keyword_type, operand_types)
+        if implementation_key not in TYPED_IMPLEMENTATIONS:
+            raise ValueError(f"{implementation_key} is not a typed implementation")
+        return (implementation_key, int(input_count))
+    elif opcode == OP_SET_SCOPE:
+        encoded_addresses, opened_layout_index = encoded_operand
+        addresses = {}
+        for name, depth, slot, layout_index in encoded_addresses:
+            addresses[str(name)] = (int(depth), int(slot), decode_layout(layout_index, layouts))
+        return Line_scope(addresses, decode_layout(opened_layout_index, layouts))
+    elif opcode == OP_LOAD_CONSTANT and type(encoded_operand) == tuple:
+        return decode_token(encoded_operand)
+    elif opcode == OP_RAISE_ERROR:
+        message, input_count = encoded_operand
+        return (str(message), int(input_count))
+    elif type(encoded_operand) not in SAVED_VALUE_TYPES:
+        raise ValueError(f"{encoded_operand!r} is not a valid operand")
+    return encoded_operand
+
+def save_bytecode_file(file_name, bytecode_program):
+    code = bytecode_program.code
+    layouts = []
+    layout_indices = {}
+    base_layout_index = encode_layout(bytecode_program.base_layout, layouts, layout_indices)
+    encoded_operands = [None] * len(bytecode_program.operands)
+    for position in range(0, len(code), 2):
+        opcode, operand_index = code[position], code[position+1]
+        if opcode in OPERAND_OPCODES:
+            encoded_operands[operand_index] = encode_operand(opcode, bytecode_program.operands[operand_index], \
+                layouts, layout_indices)
+    header = (BYTECODE_FORMAT, get_interpreter_version_stamp())
+    contents = (array("q", code).tobytes(), tuple(encoded_operands), \
+        array("q", bytecode_program.line_numbers).tobytes(), tuple(layouts), base_layout_index)
+    with open(file_name, "wb") as file:
+        marshal.dump(header, file)
+        marshal.dump(contents, file)
+
+def load_bytecode_file(file_name):
+    with open(file_name, "rb") as file:
+        try:
+            header = marshal.load(file)
+        except (EOFError, ValueError, TypeError):
+            header = None
+        if header != (BYTECODE_FORMAT, get_interpreter_version_stamp()):
+            raise Exception(f"{file_name} was made by a different version of the interpreter, it must be compiled again")
+        try:
+            contents = marshal.load(file)
+            return decode_bytecode_program(contents)
+        except (EOFError, ValueError, TypeError, KeyError, IndexError):
+            raise Exception(f"{file_name} is not a valid bytecode file, it must be compiled again")
+
+# checks every instruction only refers to operands and positions that exist before rebuilding 
+#   the operand table, so a damaged file is refused rather than failing part way through running
+def decode_bytecode_program(contents):
+    code_bytes, encoded_operands, line_number_bytes, saved_layouts, base_layout_index = contents
+    code = array("q")
+    code.frombytes(code_bytes)
+    line_numbers = array("q")
+    line_numbers.frombytes(line_number_bytes)
+    if len(code) % 2 != 0 or len(line_numbers) != len(code)//2:
+        raise ValueError("the code and line numbers don't match")
+    layouts = []
+    for slot_names in saved_layouts:
+        layout = Frame_layout()
+        for name in slot_names:
+            layout.add_slot(str(name))
+        layouts.append(layout)
+    operands = [None] * len(encoded_operands)
+    for position in range(0, len(code), 2):
+        opcode, argument = code[position], code[position+1]
+        if opcode not in OPCODE_NAMES:
+            raise ValueError(f"{opcode} is not an opcode")
+        if opcode in OPERAND_OPCODES:
+            if not 0 <= argument < len(operands):
+                raise ValueError(f"{argument} is not in the operand table")
+            operands[argument] = decode_operand(opcode, encoded_operands[argument], layouts)
+        elif opcode in JUMP_OPCODES and not 0 <= argument <= len(code):
+            raise ValueError(f"{argument} is not a position in the code")
+    return Bytecode_program(code, operands, list(line_numbers), decode_layout(base_layout_index, layouts))
+
+# compiles a program into bytecode, saving it to BYTECODE_FILE if it is set
+def compile_bytecode(ast_lines):
+    bytecode_program = Bytecode_compiler(ast_lines).compile()
+    if BYTECODE_FILE != None:
+        save_bytecode_file(BYTECODE_FILE, bytecode_program)
+    if DEBUG_OUTPUTS : print(disassemble_bytecode(bytecode_program))
+    return bytecode_program
+
+
 # ------------------------------ TOP-LEVEL FLOW MANAGEMENT ------------------------------ #
 
+# used in place of a list of abstract syntax trees when the program is streamed, it pulls
+#   ASTs from a generator only when a line is asked for, so lines are lexed and parsed just
+#   before they are run
+# lines that have been run are forgotten once nothing can jump back to them, so only the 
+#   lines from the start of the outermost running loop onwards are held in memory
+class Streamed_ast_lines(object):
+    def __init__(self, ast_generator):
+        self.ast_generator = ast_generator
+        # buffer holds the ASTs from line number buffer_start onwards
+        self.buffer = []
+        self.buffer_start = 0
+        self.exhausted = False
+
+    # pulls lines from the generator until the line at the index has been 
+    #   parsed, returns False if the program ends before that line
+    def has_line(self, index):
+        while not self.exhausted and index >= self.buffer_start + len(self.buffer):
+            try:
+                self.buffer.append(next(self.ast_generator))
+            except StopIteration:
+                self.exhausted = True
+        return index < self.buffer_start + len(self.buffer)
+
+    # forgets every line before the index
+    def release_before(self, index):
+        if index > self.buffer_start:
+            del self.buffer[0:index-self.buffer_start]
+            self.buffer_start = index
+
+    def __getitem__(self, index):
+        if index < self.buffer_start:
+            raise Exception(f"Line {index} has already been released from the stream")
+        if not self.has_line(index):
+            raise Exception(f"Line {index} is past the end of the program")
+        return self.buffer[index-self.buffer_start]
+
+# --- Block Structure --- #
+
+# the line types that open each kind of block with the line type that closes it, and the 
+#   keyword of each closing line type for error messages
+BLOCK_OPENING_TYPES = {IF_STATEMENT: END_IF, WHILE_STATEMENT: END_WHILE, FOR_STATEMENT: END_FOR}
+BLOCK_CLOSING_TYPES = {END_IF: "ENDIF", END_WHILE: "ENDWHILE", END_FOR: "ENDFOR"}
+
+# Works out once, before a program is run, where each skip in it goes to
+# Returns a dictionary from the line index of every IF, ELSE, WHILE and FOR to the line that 
+#   skipping its block moves to, an IF skips to its first ELSE or otherwise its ENDIF, an ELSE 
+#   to its ENDIF and a WHILE or FOR to its ENDWHILE or ENDFOR
+# Any block which isn't closed, or is closed by the wrong kind of line, raises an error here 
+#   rather than when the program reaches it
+def find_block_jumps(ast_lines):
+    block_jumps = {}
+    # each open block's opening line index, the line type that closes it and the lines 
+    #   that jump to its closing line
+    open_blocks = []
+    for line_index in range(len(ast_lines)):
+        line_type = ast_lines[line_index].type
+        if line_type in BLOCK_OPENING_TYPES:
+            open_blocks.append((line_index, BLOCK_OPENING_TYPES[line_type], [line_index]))
+        elif line_type == ELSE:
+            if not open_blocks or open_blocks[-1][1] != END_IF:
+                raise Exception(f"ELSE on line {line_index+1} is not inside an if statement")
+            opening_line_index, closing_type, jumping_lines = open_blocks[-1]
+            # the if statement skips to its first ELSE, every ELSE skips to the ENDIF
+            if opening_line_index in jumping_lines:
+                jumping_lines.remove(opening_line_index)
+                block_jumps[opening_line_index] = line_index
+            jumping_lines.append(line_index)
+        elif line_type in BLOCK_CLOSING_TYPES:
+            if not open_blocks or open_blocks[-1][1] != line_type:
+                raise Exception(f"{BLOCK_CLOSING_TYPES[line_type]} on line {line_index+1} does not close the statement it is in")
+            opening_line_index, closing_type, jumping_lines = open_blocks.pop()
+            for jumping_line_index in jumping_lines:
+                block_jumps[jumping_line_index] = line_index
+    if open_blocks:
+        raise Exception(f"The statement on line {open_blocks[-1][0]+1} is never closed")
+    return block_jumps
+
+# --- Variable Resolution --- #
+
+# Variables are found by name by looking through the frame stack from the top frame down, which
+#   takes longer the more blocks are open. The resolver works out before the program runs which
+#   frame each variable a line uses is held in, as its index in the frame stack, and gives the
+#   variable a slot in that frame's array of values so that it is read and written directly
+# A block's frame holds the variables declared in it, and as closing a frame moves its variables
+#   into the frame below, those declared in the blocks inside it once they have closed. So a
+#   variable with one declaration is held in the frame of the innermost block that contains both
+#   the declaration and the line using it, if it has been declared yet
+# Only variables declared once, by a declaration that isn't inside a while or for statement so
+#   is run at most once, are given slots, as is the variable of a for statement within its block.
+#   Every other variable, and any variable used while its slot is empty, is found by name, which
+#   also raises the same errors as before for variables that haven't been declared
+
+# the lines which declare a variable, the name of which is their second child node
+DECLARATION_LINE_TYPES = [DECLARATION_NORMAL_WITH_VALUE, DECLARATION_NORMAL_WITHOUT_VALUE]
+
+# a block of the program as the resolver sees it, the base frame's block has no parent
+class Resolved_block(object):
+    __slots__ = ("parent", "depth", "in_loop", "layout", "names")
+
+    def __init__(self, parent, line_type):
+        self.parent = parent
+        if parent == None:
+            self.depth = 0
+            self.in_loop = False
+        else:
+            self.depth = parent.depth + 1
+            self.in_loop = parent.in_loop or line_type in [WHILE_STATEMENT, FOR_STATEMENT]
+        self.layout = Frame_layout()
+        # the variables used by the lines run directly in the block
+        self.names = set()
+
+# gives the innermost block containing both blocks
+def find_common_block(block_1, block_2):
+    while block_1.depth > block_2.depth:
+        block_1 = block_1.parent
+    while block_2.depth > block_1.depth:
+        block_2 = block_2.parent
+    while block_1 is not block_2:
+        block_1 = block_1.parent
+        block_2 = block_2.parent
+    return block_1
+
+# adds the name of every variable the AST uses to the set
+def find_variable_names(my_AST, names):
+    if type(my_AST) == Leaf_node:
+        if my_AST.type == NAME_KEYWORD:
+            names.add(my_AST.value)
+    else:
+        for child_node in my_AST.child_nodes:
+            find_variable_names(child_node, names)
+
+# Returns the layout of the base frame and the Line_scope of every line
+# The block structure must already have been checked by find_block_jumps
+def resolve_variables(ast_lines):
+    base_block = Resolved_block(None, None)
+    open_blocks = [base_block]
+    # the block each line's expressions are run in, and the block of each frame a line opens
+    line_blocks = []
+    opened_blocks = {}
+    # the blocks each variable is declared in, and whether it is a for statement's variable
+    declarations = {}
+    for line_index, my_AST in enumerate(ast_lines):
+        line_type = my_AST.type
+        # lines that close a block are run in the block around it
+        if line_type == ELSE or line_type in BLOCK_CLOSING_TYPES:
+            closed_block = open_blocks.pop()
+            if line_type == ELSE:
+                opened_blocks[line_index] = Resolved_block(open_blocks[-1], IF_STATEMENT)
+            # ENDFOR opens the frame of the for statement's next iteration
+            elif line_type == END_FOR:
+                opened_blocks[line_index] = closed_block
+        line_blocks.append(open_blocks[-1])
+        find_variable_names(my_AST, open_blocks[-1].names)
+        if line_type in BLOCK_OPENING_TYPES:
+            opened_blocks[line_index] = Resolved_block(open_blocks[-1], line_type)
+            if line_type == FOR_STATEMENT:
+                declarations.setdefault(my_AST.child_nodes[0].value, []).append((opened_blocks[line_index], True))
+        elif line_type in DECLARATION_LINE_TYPES:
+            declarations.setdefault(my_AST.child_nodes[1].value, []).append((open_blocks[-1], False))
+        if line_type == ELSE or line_type in BLOCK_OPENING_TYPES:
+            open_blocks.append(opened_blocks[line_index])
+
+    # the block each variable that can be given a slot is declared in, every block it is moved
+    #   into when blocks close has a slot for it
+    declaring_blocks = {}
+    for name, declaring_block_list in declarations.items():
+        if len(declaring_block_list) != 1:
+            continue
+        declaring_block, is_loop_variable = declaring_block_list[0]
+        if is_loop_variable:
+            # a for statement's variable is deleted when the statement ends
+            declaring_block.layout.add_slot(name)
+        elif not declaring_block.in_loop:
+            block = declaring_block
+            while block != None:
+                block.layout.add_slot(name)
+                block = block.parent
+        else:
+            continue
+        declaring_blocks[name] = (declaring_block, is_loop_variable)
+
+    # the lines run directly in the same block share their addresses
+    block_addresses = {}
+    line_scopes = []
+    for line_index, block in enumerate(line_blocks):
+        if id(block) not in block_addresses:
+            addresses = {}
+            for name in block.names:
+                if name not in declaring_blocks:
+                    continue
+                declaring_block, is_loop_variable = declaring_blocks[name]
+                holding_block = find_common_block(block, declaring_block)
+                if is_loop_variable and holding_block is not declaring_block:
+                    continue
+                addresses[name] = (holding_block.depth, holding_block.layout.slot_indices[name], holding_block.layout)
+            block_addresses[id(block)] = Line_scope(addresses, None)
+        line_scope = block_addresses[id(block)]
+        if line_index in opened_blocks:
+            line_scope = Line_scope(line_scope.addresses, opened_blocks[line_index].layout)
+        line_scopes.append(line_scope)
+    return base_block.layout, line_scopes
+
 # instantiated with an array of abstract syntax trees and can run them.
+# ast_lines can also be a Streamed_ast_lines, in which case lines are parsed as they are reached
 class Program_runner(object):
     def __init__(self, ast_lines):
         self.ast_lines = ast_lines
+        # a streamed program isn't known in full before it runs, so its skips move through 
+        #   it a line at a time instead of using block jumps
+        if type(ast_lines) == Streamed_ast_lines:
+            self.block_jumps = None
+        else:
+            self.block_jumps = find_block_jumps(ast_lines)
+        # lines are compiled when the closure compiler is used, otherwise their ASTs are 
+        #   run by process_AST
+        # a streamed program can't be transpiled or compiled into bytecode as the whole program 
+        #   isn't known before it runs, so the closure compiler is used for it instead, as it 
+        #   is for a program nested too deeply to be transpiled
+        self.transpiled_program = None
+        self.bytecode_program = None
+        self.line_evaluators = None
+        if EXECUTION_ENGINE == PYTHON_TRANSPILER and type(ast_lines) != Streamed_ast_lines:
+            self.transpiled_program = transpile_program(ast_lines)
+        elif EXECUTION_ENGINE == BYTECODE_VM and type(ast_lines) != Streamed_ast_lines:
+            self.bytecode_program = compile_bytecode(ast_lines)
+        elif EXECUTION_ENGINE not in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM]:
+            raise Exception(f"Invalid execution engine: {EXECUTION_ENGINE}")
+        if EXECUTION_ENGINE in [CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM] \
+                and self.transpiled_program == None and self.bytecode_program == None:
+            if type(ast_lines) == Streamed_ast_lines:
+                self.line_evaluators = Streamed_line_evaluators(ast_lines)
+            else:
+                self.line_evaluators = compile_program(ast_lines)
+        # the variables of lines run one at a time are resolved here, bytecode is resolved when 
+        #   it is compiled, variables of a streamed program are always found by name as the 
+        #   whole program isn't known before it runs
+        self.base_layout, self.line_scopes = None, None
+        if RESOLVE_VARIABLES and self.transpiled_program == None and self.bytecode_program == None \
+                and type(ast_lines) != Streamed_ast_lines:
+            self.base_layout, self.line_scopes = resolve_variables(ast_lines)
     
     def run(self):
+        # transpiled programs and bytecode run as a whole rather than line by line
+        if self.transpiled_program != None:
+            self.transpiled_program.run()
+            return
+        if self.bytecode_program != None:
+            self.bytecode_program.run()
+            return
+
         # setting up values
-        self.my_virtual_environment = Virtual_environment(None)
+        self.my_virtual_environment = Virtual_environment(None, self.base_layout)
         self.line_index = -1
         
         # runs each line in sequence
-        while self.line_index < len(self.ast_lines)-1:
+        while self.has_line(self.line_index+1):
             self.increment()
-            result, self.my_virtual_environment = process_AST(self.ast, self.my_virtual_environment)
+            if self.line_scopes != None:
+                self.my_virtual_environment.line_scope = self.line_scopes[self.line_index]
+            if self.line_evaluators == None:
+                result, self.my_virtual_environment = process_AST(self.ast, self.my_virtual_environment)
+            else:
+                result = self.line_evaluators[self.line_index](self.my_virtual_environment)
             # if an actionable root node is passed up to run() this signals an action that needs
             #   to be taken, these are handled by handle_root_nodes()
-            if result and type(result) == Token and (result.type in ACTIONABLE_ROOT_NODE_TYPES):
+            # actionable root nodes without a registered handler are ignored
+            if result and type(result) == Token and (result.type in root_node_handlers):
                 self.handle_root_nodes(result)
+            # streamed lines that can no longer be returned to are forgotten
+            if type(self.ast_lines) == Streamed_ast_lines:
+                earliest_needed_line = self.earliest_needed_line()
+                self.ast_lines.release_before(earliest_needed_line)
+                if self.line_evaluators != None:
+                    self.line_evaluators.release_before(earliest_needed_line)
         
         # debug info
         if DEBUG_OUTPUTS : print(self.my_virtual_environment)
@@ -1212,117 +3965,139 @@ class Program_runner(object):
             raise Exception(f"Program ended without working back to base \
                 frame, length: {self.my_virtual_environment.get_frame_stack_len()}")
 
+    # carries out the action signalled by an actionable root node using the root node 
+    #   handler table
     def handle_root_nodes(self, result):
         if DEBUG_OUTPUTS : print(self.my_virtual_environment)
+        root_node_handlers[result.type](self, result)
 
-        # for outputting values
-        if result.type == OUTPUT_REQUEST:
-            handle_outputs(result.value)
-        
-        elif result.type == OPEN_IF:
-            # begins a new if statement, which will work through the lines in the if section 
-            #   but will skip those in the else section if there is one
-            # the boolean condition indicates whether else lines should be run
-            self.my_virtual_environment.new_stack_frame(IF_FRAME, False)
-        elif result.type == SKIP_IF:
-            # begins a new if statement, which will skip the lines in the if statement but 
-            #   run those in the else section if there is one
-            self.my_virtual_environment.new_stack_frame(IF_FRAME, True)
-            self.skip_until([END_IF, ELSE])
-        elif result.type == ELSE:
-            # checks the boolean condition (run_else_bool) on an if frame and runs the code after 
-            #   the else statement if it = True
-            frame_type, run_else_bool = self.my_virtual_environment.constructive_pop_stack_frame()
-            if frame_type != IF_FRAME:
-                raise Exception("ELSE can only be placed to end an if statement")
+    # for outputting values
+    def handle_output_request(self, result):
+        handle_outputs(result.value)
+
+    def handle_open_if(self, result):
+        # begins a new if statement, which will work through the lines in the if section 
+        #   but will skip those in the else section if there is one
+        # the boolean condition indicates whether else lines should be run
+        self.my_virtual_environment.new_stack_frame(IF_FRAME, False)
+
+    def handle_skip_if(self, result):
+        # begins a new if statement, which will skip the lines in the if statement but 
+        #   run those in the else section if there is one
+        self.my_virtual_environment.new_stack_frame(IF_FRAME, True)
+        self.skip_until([END_IF, ELSE])
+
+    def handle_else(self, result):
+        # checks the boolean condition (run_else_bool) on an if frame and runs the code after 
+        #   the else statement if it = True
+        frame_type, run_else_bool = self.my_virtual_environment.constructive_pop_stack_frame()
+        if frame_type != IF_FRAME:
+            raise Exception("ELSE can only be placed to end an if statement")
+        else:
+            if run_else_bool:
+                self.my_virtual_environment.new_stack_frame(IF_FRAME, None)
             else:
-                if run_else_bool:
-                    self.my_virtual_environment.new_stack_frame(IF_FRAME, None)
-                else:
-                    self.my_virtual_environment.new_stack_frame(IF_FRAME, None)
-                    self.skip_until([END_IF])
-        elif result.type == END_IF:
-            # closes an if statement
-            frame_type, run_else_bool = self.my_virtual_environment.constructive_pop_stack_frame()
-            if frame_type != IF_FRAME:
-                raise Exception("ENDIF can only be placed to end an if statement")
+                self.my_virtual_environment.new_stack_frame(IF_FRAME, None)
+                self.skip_until([END_IF])
+
+    def handle_end_if(self, result):
+        # closes an if statement
+        frame_type, run_else_bool = self.my_virtual_environment.constructive_pop_stack_frame()
+        if frame_type != IF_FRAME:
+            raise Exception("ENDIF can only be placed to end an if statement")
+        else:
+            pass
+
+    def handle_open_while(self, result):
+        # begins a new while statement, the 'condition' in a while statement is the line 
+        #   where it began so it can be returned to when the code block has been run
+        self.my_virtual_environment.new_stack_frame(WHILE_FRAME, self.line_index)
+
+    def handle_skip_while(self, result):
+        # skips until the end of a while statement, used when the boolean condition 
+        #   returns false
+        self.my_virtual_environment.new_stack_frame(WHILE_FRAME, None)
+        self.skip_until([END_WHILE])
+
+    def handle_end_while(self, result):
+        # closes a while statement, returns to the beginning for another boolean condition 
+        #   check ifthe condition part of the stack frame contains an index (the absence 
+        #   of an index is an indication that the statement is complete/skip while has been used)
+        frame_type, return_index = self.my_virtual_environment.constructive_pop_stack_frame()
+        if frame_type != WHILE_FRAME:
+            raise Exception("ENDWHILE can only be placed to end an while statement")
+        else:
+            if return_index != None:
+                # the next increment moves to the while statement, which may be the first 
+                #   line, so only the index is set as the run loop does before the first line
+                self.line_index = return_index-1
             else:
                 pass
-        
-        elif result.type == OPEN_WHILE:
-            # begins a new while statement, the 'condition' in a while statement is the line 
-            #   where it began so it can be returned to when the code block has been run
-            self.my_virtual_environment.new_stack_frame(WHILE_FRAME, self.line_index)
-        elif result.type == SKIP_WHILE:
-            # skips until the end of a while statement, used when the boolean condition 
-            #   returns false
-            self.my_virtual_environment.new_stack_frame(WHILE_FRAME, None)
-            self.skip_until([END_WHILE])
-        elif result.type == END_WHILE:
-            # closes a while statement, returns to the beginning for another boolean condition 
-            #   check ifthe condition part of the stack frame contains an index (the absence 
-            #   of an index is an indication that the statement is complete/skip while has been used)
-            frame_type, return_index = self.my_virtual_environment.constructive_pop_stack_frame()
-            if frame_type != WHILE_FRAME:
-                raise Exception("ENDWHILE can only be placed to end an while statement")
-            else:
-                if return_index:
-                    self.set_index(return_index-1)
+
+    def handle_open_for(self, result):
+        # begins a new for statement, the 'condition' in a while stack frame is made up of 
+        #   the name of the value that is being assigned, the list of values remaining to 
+        #   be iterated over and the index of the beginning of the statement
+    
+        # extracting values
+        input_info = result.value
+        name = input_info[0]
+        values_list = input_info[1]
+        if values_list.get_length() == 0:
+            raise Exception(f"values_list is empty")
+        else:
+            # sets up the stack frame and variable
+            self.my_virtual_environment.new_stack_frame(FOR_FRAME, \
+                [name, values_list.read_item([Integer_virtual(1), \
+                    Integer_virtual(values_list.get_length()-1)]), self.line_index])
+            self.my_virtual_environment.make_variable(\
+                values_list.read_item(0).convert_to_token(), name)
+
+    def handle_end_for(self, result):
+        # closes a for statement and removes its temporary variable, if the list 
+        #   to be iterated over is not empty it returns to the beginning of the
+        #   statement and creates a new temporary variable
+        frame_type, conditions = self.my_virtual_environment.constructive_pop_stack_frame()
+        if frame_type != FOR_FRAME:
+            raise Exception("ENDFOR can only be placed to end a for statement")
+        else:
+            if conditions:
+                # extracting information and removing most recent iteration of the variable
+                name = conditions[0]
+                values_list = conditions[1]
+                return_index = conditions[2]
+                self.my_virtual_environment.delete_variable(name)
+                if len(values_list) != 0:
+                    # setting up next iteration
+                    self.my_virtual_environment.new_stack_frame(FOR_FRAME, \
+                        [name, values_list[1:], return_index])
+                    self.my_virtual_environment.make_variable(\
+                        values_list[0].convert_to_token(), name)
+                    self.set_index(return_index)
                 else:
                     pass
-        
-        elif result.type == OPEN_FOR:
-            # begins a new for statement, the 'condition' in a while stack frame is made up of 
-            #   the name of the value that is being assigned, the list of values remaining to 
-            #   be iterated over and the index of the beginning of the statement
-        
-            # extracting values
-            input_info = result.value
-            name = input_info[0]
-            values_list = input_info[1]
-            if values_list.get_length() == 0:
-                raise Exception(f"values_list is empty")
-            else:
-                # sets up the stack frame and variable
-                self.my_virtual_environment.new_stack_frame(FOR_FRAME, \
-                    [name, values_list.read_item([Integer_virtual(1), \
-                        Integer_virtual(values_list.get_length()-1)]), self.line_index])
-                self.my_virtual_environment.make_variable(\
-                    values_list.read_item(0).convert_to_token(), name)
-        elif result.type == SKIP_FOR:
-            # used if the initial call of for contains an empty list for iterating over, 
-            #   just skips until the end of the statement
-            if result.value:
-                raise Exception(f"A value should not be passed to skip for, \
-                    the value is {result.value}")
             else:
-                self.my_virtual_environment.new_stack_frame(FOR_FRAME, None)
-                self.skip_until(END_FOR)
-        elif result.type == END_FOR:
-            # closes a for statement and removes its temporary variable, if the list 
-            #   to be iterated over is not empty it returns to the beginning of the
-            #   statement and creates a new temporary variable
-            frame_type, conditions = self.my_virtual_environment.constructive_pop_stack_frame()
-            if frame_type != FOR_FRAME:
-                raise Exception("ENDFOR can only be placed to end a for statement")
-            else:
-                if conditions:
-                    # extracting information and removing most recent iteration of the variable
-                    name = conditions[0]
-                    values_list = conditions[1]
-                    return_index = conditions[2]
-                    self.my_virtual_environment.delete_variable(name)
-                    if len(values_list) != 0:
-                        # setting up next iteration
-                        self.my_virtual_environment.new_stack_frame(FOR_FRAME, \
-                            [name, values_list[1:], return_index])
-                        self.my_virtual_environment.make_variable(\
-                            values_list[0].convert_to_token(), name)
-                        self.set_index(return_index)
-                    else:
-                        pass
-                else:
-                    pass
+                pass
+
+    # checks if there is a line at the index
+    def has_line(self, index):
+        if type(self.ast_lines) == Streamed_ast_lines:
+            return self.ast_lines.has_line(index)
+        else:
+            return index < len(self.ast_lines)
+
+    # finds the first line that may still be run again, this is either the current line or 
+    #   the line that the outermost running while or for statement will jump back to
+    # ENDWHILE moves to the line before the while statement and ENDFOR to the for statement 
+    #   itself, as the next increment moves forward a line
+    def earliest_needed_line(self):
+        earliest_line = self.line_index
+        for frame in self.my_virtual_environment.frame_stack:
+            if frame.type == WHILE_FRAME and frame.condition != None:
+                earliest_line = min(earliest_line, frame.condition-1)
+            elif frame.type == FOR_FRAME and frame.condition != None:
+                earliest_line = min(earliest_line, frame.condition[2])
+        return earliest_line
 
     # moves to the specified line
     def set_index(self, index_value):
@@ -1332,7 +4107,7 @@ class Program_runner(object):
     # moves to the next line
     def increment(self):
         self.line_index += 1
-        if self.line_index == len(self.ast_lines):
+        if not self.has_line(self.line_index):
             raise Exception("End has been reached")
         self.ast = self.ast_lines[self.line_index]
     
@@ -1343,52 +4118,76 @@ class Program_runner(object):
         self.line_index -= 1
         self.ast = self.ast_lines[self.line_index]
 
-    # moves through the 
+    # moves to the line before the end of the block that the current line opens, so that 
+    #   the next increment runs the line which ends it
     def skip_until(self, ending_token_list):
-        found = False
-
-        # used so that process_AST will run
-        temp_virtual_environment = copy.deepcopy(self.my_virtual_environment)
+        if self.block_jumps != None:
+            self.set_index(self.block_jumps[self.line_index]-1)
+        else:
+            found = False
 
-        # the resolver counts are used to ensure that if, while and for statements 
-        #   contained within other statements are complete. This is ensured by
-        #   this is done by keeping a running count for each which increases on an
-        #   open line and decreases on an end line
-        # IF, WHILE, FOR
-        resolver_count = [0,0,0]
+            # the resolver counts are used to ensure that if, while and for statements 
+            #   contained within other statements are complete. This is ensured by
+            #   this is done by keeping a running count for each which increases on an
+            #   open line and decreases on an end line
+            # IF, WHILE, FOR
+            resolver_count = [0,0,0]
 
-        while not found:
-            self.increment()
-            try:
-                # extracts the root node
-                ast_root_type = self.ast.type
-                if ast_root_type in OPERATION_TYPE_TO_ROOT_NODE.keys():
-                    root_type = OPERATION_TYPE_TO_ROOT_NODE.get(ast_root_type)
-                else:
-                    root_type = ast_root_type
+            while not found:
+                self.increment()
+                try:
+                    # extracts the root node
+                    ast_root_type = self.ast.type
+                    if ast_root_type in OPERATION_TYPE_TO_ROOT_NODE.keys():
+                        root_type = OPERATION_TYPE_TO_ROOT_NODE.get(ast_root_type)
+                    else:
+                        root_type = ast_root_type
                 
-                # checks if the end has been reached
-                if all(counter == 0 for counter in resolver_count):
-                    if root_type in ending_token_list:
-                        found = True
+                    # checks if the end has been reached
+                    if all(counter == 0 for counter in resolver_count):
+                        if root_type in ending_token_list:
+                            found = True
                 
-                # manages resolver counts
-                if root_type == OPEN_IF or root_type == SKIP_IF:
-                    resolver_count[0] += 1
-                elif root_type == END_IF:
-                    resolver_count[0] -= 1
-                elif root_type == OPEN_WHILE or root_type == SKIP_WHILE:
-                    resolver_count[1] += 1
-                elif root_type == END_WHILE:
-                    resolver_count[1] -= 1
-                elif root_type == OPEN_FOR or root_type == SKIP_FOR:
-                    resolver_count[2] += 1
-                elif root_type == END_FOR:
-                    resolver_count[2] -= 1
-            except Exception as e:
-                if DEBUG_OUTPUTS : print(f"Error: {e}")
-        # moves back to the correct position to run the line that has been skipped to
-        self.decrement()
+                    # manages resolver counts
+                    if root_type == OPEN_IF or root_type == SKIP_IF:
+                        resolver_count[0] += 1
+                    elif root_type == END_IF:
+                        resolver_count[0] -= 1
+                    elif root_type == OPEN_WHILE or root_type == SKIP_WHILE:
+                        resolver_count[1] += 1
+                    elif root_type == END_WHILE:
+                        resolver_count[1] -= 1
+                    elif root_type == OPEN_FOR or root_type == SKIP_FOR:
+                        resolver_count[2] += 1
+                    elif root_type == END_FOR:
+                        resolver_count[2] -= 1
+                except Exception as e:
+                    if DEBUG_OUTPUTS : print(f"Error: {e}")
+            # moves back to the correct position to run the line that has been skipped to
+            self.decrement()
+
+# --- Root Node Handler Table --- #
+
+# the Program_runner method that carries out each actionable root node, by root node type
+root_node_handlers = {}
+
+# adds an actionable root node to the table, or replaces the handler of one already in it
+# the handler is called with the Program_runner and the root node token
+def register_root_node_handler(root_node_type, handler):
+    root_node_handlers[root_node_type] = handler
+
+register_root_node_handler(OUTPUT_REQUEST, Program_runner.handle_output_request)
+register_root_node_handler(OPEN_IF, Program_runner.handle_open_if)
+register_root_node_handler(SKIP_IF, Program_runner.handle_skip_if)
+register_root_node_handler(ELSE, Program_runner.handle_else)
+register_root_node_handler(END_IF, Program_runner.handle_end_if)
+register_root_node_handler(OPEN_WHILE, Program_runner.handle_open_while)
+register_root_node_handler(END_WHILE, Program_runner.handle_end_while)
+register_root_node_handler(OPEN_FOR, Program_runner.handle_open_for)
+register_root_node_handler(END_FOR, Program_runner.handle_end_for)
+# SKIP_FOR and SKIP_WHILE share a type, so skip while also skips the for statements given an 
+#   empty array, opening a while frame which ENDFOR then reports as not ending a for statement
+register_root_node_handler(SKIP_WHILE, Program_runner.handle_skip_while)
 
 # outputs each of the values entered on a single line
 def handle_outputs(values):
@@ -1403,12 +4202,35 @@ def handle_outputs(values):
 # ------------------------------ MAIN CONTROLLER ------------------------------ #
 
 # The component that runs each of the main parts of the program in sequence
+# When STREAM_PROGRAM is set, lines are read, lexed and parsed only as they are reached
+#   so the program starts running without waiting for the whole file to be processed
+# When WATCH_PROGRAM is set, the program is run again every time its file changes
 def main_controller():
-    code_lines = get_code()
-    print("\nRunning program...\n")
-    if DEBUG_OUTPUTS or LOW_DEBUG_OUTPUTS : print(code_lines)
-    processed_code_lines = process_code(code_lines)
-    if DEBUG_OUTPUTS or LOW_DEBUG_OUTPUTS : print(processed_code_lines)
+    # watch mode keeps running the program until it is stopped
+    if WATCH_PROGRAM:
+        watch_program(get_file_name())
+        exit()
+    file_name = get_file_name()
+    # saved bytecode is run without the program being parsed or compiled again
+    if file_name.endswith(BYTECODE_FILE_EXTENSION):
+        print("\nRunning program...\n")
+        load_bytecode_file(file_name).run()
+        print("\nProgram complete! Exiting...\n")
+        exit()
+    if STREAM_PROGRAM:
+        print("\nRunning program...\n")
+        ast_stream = optimise_program_stream(process_code_stream(stream_code(file_name)))
+        processed_code_lines = Streamed_ast_lines(ast_stream)
+    else:
+        code_lines = get_code(file_name)
+        print("\nRunning program...\n")
+        if DEBUG_OUTPUTS or LOW_DEBUG_OUTPUTS : print(code_lines)
+        if USE_AST_CACHE:
+            processed_code_lines = process_code_with_cache(file_name, code_lines)
+        else:
+            processed_code_lines = process_code(code_lines)
+        processed_code_lines = optimise_program(processed_code_lines)
+        if DEBUG_OUTPUTS or LOW_DEBUG_OUTPUTS : print(processed_code_lines)
     program_run = Program_runner(processed_code_lines)
     program_run.run()
     print("\nProgram complete! Exiting...\n")
@@ -1420,8 +4242,21 @@ import sys
 # handles input from the Command Line either as a parameter or as an input 
 #   when the program is run
 # also validates the file name is valid using regex
-valid_file_name_pattern = "^.+\.bl$"
-def get_code():
+valid_file_name_pattern = "^.+\.blb?$"
+def get_code(file_name):
+    file = open(file_name, "r")
+    code_lines = file.readlines()
+    file.close()
+    return code_lines
+
+# reads the lines of the file one at a time, as they are asked for
+# the file is closed once every line is read, or as soon as the generator is closed by a 
+#   program that stops early
+def stream_code(file_name):
+    with open(file_name, "r") as file:
+        yield from file
+
+def get_file_name():
     # extract file name or request from user
     arguments = sys.argv
     if len(arguments) == 2:
@@ -1435,26 +4270,245 @@ def get_code():
         raise Exception("Invalid number of arguments in the CLI")
     # file name validation
     if not re.match(valid_file_name_pattern, file_name):
-        raise Exception("Invalid file name, must have the extension .bl")
-    else:
-        file = open(file_name, "r")
-        code_lines = file.readlines()
-        file.close()
-    return code_lines
+        raise Exception("Invalid file name, must have the extension .bl or .blb")
+    return file_name
 
 # takes an array of code lines and returns an array of the equivalent 
 #   Abstract Syntax Trees
 def process_code(code_lines):
+    # large programs can be split up and parsed by several processes at once
+    if PARALLEL_PARSE and len(code_lines) >= PARALLEL_PARSE_THRESHOLD:
+        return process_code_parallel(code_lines)
     processed_lines = []
     for code_line in code_lines:
-        AST = form_AST(process_text(code_line))
+        AST = parse_line(code_line)
         processed_lines.append(AST)
     return processed_lines
 
+# used to lex and parse lines in several processes at once
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+# run in each worker process, parses a chunk of lines and returns their ASTs in compact form
+def parse_chunk(code_lines):
+    return [compact_AST(parse_line(code_line)) for code_line in code_lines]
+
+# every line is lexed and parsed independently of the others, so the lines are split into
+#   chunks which are parsed by a pool of processes, the ASTs are returned in the original order
+def process_code_parallel(code_lines):
+    worker_count = PARALLEL_PARSE_WORKERS or os.cpu_count() or 1
+    # a few chunks per worker keeps every worker busy even if some chunks are slower
+    chunk_size = max(1, -(-len(code_lines) // (worker_count*4)))
+    chunks = [code_lines[index:index+chunk_size] for index in range(0, len(code_lines), chunk_size)]
+    processed_lines = []
+    with ProcessPoolExecutor(max_workers=worker_count) as executor:
+        for compact_chunk in executor.map(parse_chunk, chunks):
+            processed_lines += [expand_AST(compact_node) for compact_node in compact_chunk]
+    return processed_lines
+
+# the streaming equivalent of process_code, takes any iterable of code lines and 
+#   produces each line's Abstract Syntax Tree only when it is asked for
+def process_code_stream(code_lines):
+    for code_line in code_lines:
+        yield parse_line(code_line)
+
+# --- Incremental Parsing --- #
+
+# used to find which lines of a program have changed since it was last parsed
+from difflib import SequenceMatcher
+
+# used to wait between checks for changes in watch mode
+import time
+
+# Keeps the lines of a program and their ASTs so that when the program is edited only the 
+#   lines that have changed are lexed and parsed again
+# The new lines are matched up against the old ones, so inserting or deleting lines doesn't 
+#   make every line after them count as changed
+class Incremental_parser:
+    def __init__(self):
+        self.code_lines = []
+        self.processed_lines = []
+        self.reparsed_line_count = 0
+
+    # returns the ASTs of the new version of the program, reusing the ASTs of unchanged lines
+    def update(self, code_lines):
+        processed_lines = []
+        reparsed_line_count = 0
+        line_matcher = SequenceMatcher(None, self.code_lines, code_lines, autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in line_matcher.get_opcodes():
+            if tag == "equal":
+                processed_lines += self.processed_lines[old_start:old_end]
+            else:
+                processed_lines += process_code(code_lines[new_start:new_end])
+                reparsed_line_count += new_end - new_start
+        # nothing is kept until every changed line has been parsed, so a line with a syntax
+        #   error leaves the last good version in place
+        self.code_lines = list(code_lines)
+        self.processed_lines = processed_lines
+        self.reparsed_line_count = reparsed_line_count
+        return processed_lines
+
+# Runs the program every time its file is saved, only reparsing the lines that have changed
+# Errors are printed rather than stopping watch mode so that they can be fixed and the 
+#   program run again, press Ctrl+C to stop watching
+def watch_program(file_name):
+    incremental_parser = Incremental_parser()
+    last_modified_time = None
+    try:
+        while True:
+            # editors that save by renaming a new file over the old one leave a moment where 
+            #   there is no file, which is waited out as a file that doesn't exist yet is
+            try:
+                modified_time = os.path.getmtime(file_name)
+            except OSError:
+                modified_time = last_modified_time
+            if modified_time != last_modified_time:
+                last_modified_time = modified_time
+                try:
+                    processed_code_lines = incremental_parser.update(get_code(file_name))
+                    print(f"\nReparsed {incremental_parser.reparsed_line_count} of " \
+                        f"{len(processed_code_lines)} lines\n\nRunning program...\n")
+                    processed_code_lines = optimise_program(processed_code_lines)
+                    Program_runner(processed_code_lines).run()
+                    print("\nProgram complete! Waiting for changes...\n")
+                except Exception as error:
+                    print(f"\n{error}\n\nWaiting for changes...\n")
+            time.sleep(WATCH_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print("\nStopped watching, exiting...\n")
+
+# --- Compiled AST Cache --- #
+
+# used to hash the source of programs and of the interpreter
+import hashlib
+
+# used to save ASTs to files, it is the format python uses for its own compiled files and 
+#   is very quick to load the nested tuples of compact ASTs
+import marshal
+
+# the Python version's magic number changes whenever the marshal format might
+from importlib.util import MAGIC_NUMBER
+
+# The ASTs of a program are saved in its compiled file (.blc) after it is parsed, so that 
+#   running it again without changing it skips lexing and parsing
+# A compiled file records the hash of the program's source and the version stamp of the 
+#   interpreter that made it, if either doesn't match (or the file can't be read) the 
+#   program is parsed again and the compiled file replaced
+AST_CACHE_FORMAT = 1
+
+# the version stamp is made from the source of every file that decides what a line is parsed
+#   into, so any change to the lexer, parser, structure graphs or token types makes every 
+#   compiled file out of date
+interpreter_version_stamp = None
+def get_interpreter_version_stamp():
+    global interpreter_version_stamp
+    if interpreter_version_stamp == None:
+        stamp_hash = hashlib.sha256(MAGIC_NUMBER + bytes([AST_CACHE_FORMAT]))
+        for module_name in [__name__, "tokenTypesDefinitionLib", "regexTemplatesLib", "structureGraphsLib"]:
+            file = open(sys.modules[module_name].__file__, "rb")
+            stamp_hash.update(file.read())
+            file.close()
+        interpreter_version_stamp = stamp_hash.hexdigest()
+    return interpreter_version_stamp
+
+def get_source_hash(code_lines):
+    return hashlib.sha256("".join(code_lines).encode("utf-8")).hexdigest()
+
+# compiled files are kept next to the program, or in AST_CACHE_DIRECTORY when it is set, 
+#   where the name includes a hash of the program's full path so programs with the same 
+#   name in different folders don't share one
+def get_compiled_file_name(file_name):
+    if AST_CACHE_DIRECTORY == None:
+        compiled_file_name = file_name[:-len(".bl")] + ".blc"
+    else:
+        path_hash = hashlib.sha256(os.path.abspath(file_name).encode("utf-8")).hexdigest()[:16]
+        base_name = os.path.basename(file_name)[:-len(".bl")]
+        compiled_file_name = os.path.join(AST_CACHE_DIRECTORY, f"{base_name}-{path_hash}.blc")
+    return compiled_file_name
+
+# returns the ASTs saved in the compiled file, or None if there isn't a valid one for this source
+def load_compiled_file(compiled_file_name, source_hash):
+    try:
+        with open(compiled_file_name, "rb") as file:
+            compiled_contents = marshal.loads(file.read())
+        version_stamp, saved_source_hash, compact_ASTs = compiled_contents
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version_stamp != get_interpreter_version_stamp() or saved_source_hash != source_hash:
+        return None
+    return [expand_AST(compact_node) for compact_node in compact_ASTs]
+
+# writes the compiled file under a temporary name first and then swaps it in, so a run 
+#   that is stopped part way or another run reading it never sees half a file
+def save_compiled_file(compiled_file_name, source_hash, processed_lines):
+    compiled_contents = (get_interpreter_version_stamp(), source_hash, \
+        tuple(compact_AST(my_AST) for my_AST in processed_lines))
+    temporary_file_name = f"{compiled_file_name}.{os.getpid()}.tmp"
+    try:
+        directory = os.path.dirname(compiled_file_name)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(temporary_file_name, "wb") as file:
+            file.write(marshal.dumps(compiled_contents))
+        os.replace(temporary_file_name, compiled_file_name)
+    except OSError:
+        # not being able to save the compiled file only means the next run parses again
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
+
+# the equivalent of process_code for a program read from a file, using its compiled file 
+#   when it is up to date
+def process_code_with_cache(file_name, code_lines):
+    compiled_file_name = get_compiled_file_name(file_name)
+    source_hash = get_source_hash(code_lines)
+    processed_lines = load_compiled_file(compiled_file_name, source_hash)
+    if processed_lines == None:
+        processed_lines = process_code(code_lines)
+        save_compiled_file(compiled_file_name, source_hash, processed_lines)
+    return processed_lines
+
 # Flags used for developing and debugging
 DEBUG_OUTPUTS = False
 LOW_DEBUG_OUTPUTS = False
 RUN_PROGRAM_WITHOUT_INPUT = False
+STREAM_PROGRAM = False
+WATCH_PROGRAM = False
+# seconds between checks for changes to the program's file in watch mode
+WATCH_POLL_INTERVAL = 0.5
+
+# Flags used to turn optimisation passes on and off
+FOLD_CONSTANTS = True
+INFER_TYPES = True
+FUSE_OPERATIONS = True
+# gives variables slots in their frames before the program is run (see Variable Resolution)
+RESOLVE_VARIABLES = True
+
+# Flags used to pick between interchangeable engines
+LEXER_ENGINE = MASTER_REGEX_LEXER
+PARSER_ENGINE = PRECEDENCE_CLIMBING_PARSER
+EXECUTION_ENGINE = CLOSURE_COMPILER
+# when set, the python source programs are transpiled into is written to this file
+TRANSPILED_SOURCE_FILE = None
+# when set, the bytecode programs are compiled into is saved to this file, which can be run 
+#   by giving its name in place of a program's
+BYTECODE_FILE = None
+
+# Parallel parsing settings, programs with fewer lines than the threshold are always 
+#   parsed in this process as starting the worker processes would take longer
+# when the number of workers is None, one is used for each CPU
+PARALLEL_PARSE = False
+PARALLEL_PARSE_THRESHOLD = 20000
+PARALLEL_PARSE_WORKERS = None
+
+# Line AST cache settings, the cache is shared by every program processed
+USE_LINE_AST_CACHE = True
+LINE_AST_CACHE_SIZE = 1024
+line_AST_cache = Line_AST_cache(LINE_AST_CACHE_SIZE)
+
+# Compiled AST cache settings, when the directory is None compiled files are kept next to 
+#   the programs they are made from
+USE_AST_CACHE = True
+AST_CACHE_DIRECTORY = None
 
 if __name__ == "__main__":
     main_controller()
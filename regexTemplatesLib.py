@@ -1,17 +1,22 @@
 from tokenTypesDefinitionLib import *
+import re
 
 
 # TOKEN TYPE PATTERN RETRIEVAL AND COMPLETION
-# used so the extra bits don't have to be included in the base templates
-def get_template(pattern_key):
-    # extracts the template from the template lists and adds a word ending 
-    #   if the token type is a keyword
+# extracts the template from the template lists and adds a word ending 
+#   if the token type is a keyword
+def get_base_template(pattern_key):
     if pattern_value := regex_templates_keywords.get(pattern_key):
         pattern_value += "\\b"
     else:
         pattern_value = regex_templates_non_keywords.get(pattern_key)
     if not pattern_value:
         raise Exception("No valid pattern")
+    return pattern_value
+
+# used so the extra bits don't have to be included in the base templates
+def get_template(pattern_key):
+    pattern_value = get_base_template(pattern_key)
     # these extra parts are applied to every pattern and do a couple of things:
     # a) '^' - ensures recognition is done from the begining of the string
     # b) '\s*' - burns off any whitespace before the pattern
@@ -20,6 +25,14 @@ def get_template(pattern_key):
     pattern = f"^\s*{pattern_value}(.*)$"
     return pattern
 
+# produces a compiled template for matching at a position within a line using 
+#   pattern.match(line, position), rather than at the start of a copy of the rest of the line
+# there is no '^' (which would only match at the real start of the line) and no '(.*)$', 
+#   the end of the match is used as the position of the next token instead
+def get_offset_template(pattern_key):
+    pattern_value = get_base_template(pattern_key)
+    return re.compile(f"\\s*{pattern_value}")
+
 
 # BASE REGEX TEMPLATES
 # all templates for token types where a value needs to be extracted have a capture group 
@@ -180,4 +193,120 @@ to_test = [
     IS_LESS_THAN_OR_EQUAL_TO,
     # name keywords
     NAME_KEYWORD
-]
\ No newline at end of file
+]
+
+# KEYWORD TABLE
+# every keyword template only ever matches whole words made of name characters, so rather 
+#   than trying each keyword template in turn a lexer can scan one word with word_pattern 
+#   and look it up in keyword_table, falling back to a NAME_KEYWORD if it isn't there
+# the table maps each word to its token type and whether the word is also the token's value
+WORD_TOKEN_TYPE = "word (keyword or name keyword)"
+# every keyword template (including NAME_KEYWORD) ends with '\b', so a word directly followed 
+#   by a word character outside of the name characters (like 'é') is not matched by any of them
+WORD_TEMPLATE = "[a-zA-Z0-9_]+\\b"
+word_pattern = re.compile(f"\\s*({WORD_TEMPLATE})")
+
+def build_keyword_table():
+    keyword_table = {}
+    for token_type in to_test:
+        if token_type in regex_templates_keywords and token_type != NAME_KEYWORD:
+            template = regex_templates_keywords[token_type]
+            # the words are the literal parts of the template, each is checked to make 
+            #   sure the template really does match it
+            for word in re.findall("[a-zA-Z_][a-zA-Z0-9_]*", template):
+                match_output = re.fullmatch(template, word)
+                if not match_output:
+                    raise Exception(f"Keyword template for {token_type} does not match {word}")
+                # earlier token types in to_test take priority, as they would if tested in order
+                if word not in keyword_table:
+                    keyword_table[word] = (token_type, len(match_output.groups()) == 1)
+    return keyword_table
+
+keyword_table = build_keyword_table()
+
+# takes a word found with word_pattern and returns the token type and value that testing 
+#   the keyword templates one by one would have produced
+def resolve_word(word):
+    keyword = keyword_table.get(word)
+    if keyword:
+        token_type, word_is_value = keyword
+        if word_is_value:
+            return token_type, word
+        else:
+            return token_type, None
+    else:
+        return NAME_KEYWORD, word
+
+# the keyword templates (including NAME_KEYWORD) have to come one after another at the end 
+#   of to_test for a single word scan to be able to replace them without changing the order
+def check_keywords_are_last():
+    keyword_found = False
+    for token_type in to_test:
+        if token_type in regex_templates_keywords:
+            keyword_found = True
+        elif keyword_found:
+            raise Exception(f"{token_type} is tested after a keyword, so keywords cannot be scanned as words")
+
+check_keywords_are_last()
+
+
+# MASTER PATTERN COMPILATION
+# all of the templates are joined, in the to_test order, into one alternation which is
+#   compiled once at import time. Python tries the alternatives of a regex left to right 
+#   so the first template that matches wins, exactly as it does when testing them one by one
+# each template is wrapped in a named group ('T' followed by its position in to_test) so 
+#   the lexer can tell which token type matched using match.lastgroup
+# all of the keyword templates are replaced by one group matching a word, which is 
+#   resolved with resolve_word
+# a final catch-all group matches any single character that no template accepts, this 
+#   means the pattern can be scanned along a whole line with finditer without silently 
+#   skipping over text that cannot be lexed
+MISMATCH_GROUP = "MISMATCH"
+WORD_GROUP = "WORD"
+def build_master_pattern():
+    alternatives = []
+    # maps each named group to the token type it represents and the number of the group 
+    #   holding the token's value (None if the token type has no value)
+    group_token_types = {}
+    group_number = 1
+    for position, token_type in enumerate(to_test):
+        if token_type in regex_templates_keywords:
+            # the word group is added in place of the first keyword template
+            if WORD_GROUP in group_token_types:
+                continue
+            pattern_value = WORD_TEMPLATE
+            group_name = WORD_GROUP
+            token_type = WORD_TOKEN_TYPE
+        else:
+            pattern_value = get_base_template(token_type)
+            group_name = f"T{position}"
+        alternatives.append(f"(?P<{group_name}>{pattern_value})")
+        # templates have at most one capture group, which holds the value
+        value_groups = re.compile(pattern_value).groups
+        if value_groups == 0:
+            group_token_types[group_name] = (token_type, None)
+        elif value_groups == 1:
+            group_token_types[group_name] = (token_type, group_number + 1)
+        else:
+            raise Exception(f"Too many capture groups in the template for {token_type}")
+        group_number += 1 + value_groups
+    alternatives.append(f"(?P<{MISMATCH_GROUP}>[\\s\\S])")
+    # '\s*' burns off any whitespace before the token, as in get_template
+    master_pattern = re.compile("\\s*(?:" + "|".join(alternatives) + ")")
+    return master_pattern, group_token_types
+
+master_pattern, master_group_token_types = build_master_pattern()
+
+# OFFSET TEMPLATES
+# every template compiled once, paired with its token type and kept in the to_test order
+# the keyword templates are replaced by one word_pattern, paired with WORD_TOKEN_TYPE
+def build_offset_templates():
+    templates = []
+    for token_type in to_test:
+        if token_type not in regex_templates_keywords:
+            templates.append((token_type, get_offset_template(token_type)))
+        elif (WORD_TOKEN_TYPE, word_pattern) not in templates:
+            templates.append((WORD_TOKEN_TYPE, word_pattern))
+    return templates
+
+offset_templates = build_offset_templates()
@@ -465,4 +465,107 @@ structure_graphs = [
             }
         ]
     ],
-]
\ No newline at end of file
+]
+
+
+# GRAPH COMPILATION
+# each structure graph is compiled at import time into a form that is quicker to traverse:
+# Compiled Graph: AST node type, starting state, ending state, transition table
+# Transition Table: list indexed by state number, holding a tuple of the state's edges 
+#   (None for the ending state)
+# Compiled Edges: next state number, edge label, capture code
+# Edge labels are a frozenset of the token types accepted, or ANY_LABEL if any token is accepted
+# the graphs are checked while being compiled so that a broken graph stops the program at 
+#   import rather than when a line happens to need it
+ANY_LABEL = None
+
+# integer codes used in place of the capture constants
+NO_CAPTURE_CODE = 0
+CAPTURE_ALONE_CODE = 1
+CAPTURE_TOGETHER_CODE = 2
+CAPTURE_CODES = {
+    NO_CAPTURE : NO_CAPTURE_CODE,
+    CAPTURE_ALONE : CAPTURE_ALONE_CODE,
+    CAPTURE_TOGETHER : CAPTURE_TOGETHER_CODE
+}
+
+def compile_structure_graph(structure):
+    node_type = structure[0]
+    start_node_name, end_node_name, main_graph = structure[1]
+    if start_node_name not in main_graph:
+        raise Exception(f"{node_type} graph has no starting node {start_node_name}")
+    if end_node_name not in main_graph:
+        raise Exception(f"{node_type} graph has no ending node {end_node_name}")
+    if main_graph[end_node_name] != None:
+        raise Exception(f"{node_type} graph's ending node {end_node_name} has edges leaving it")
+    # numbering the nodes, in the order they are written
+    state_numbers = {}
+    for node_name in main_graph:
+        state_numbers[node_name] = len(state_numbers)
+    transitions = []
+    for node_name, edges in main_graph.items():
+        if node_name == end_node_name:
+            transitions.append(None)
+        elif not edges:
+            raise Exception(f"{node_type} graph's node {node_name} has no edges, only the ending node can")
+        else:
+            compiled_edges = []
+            for next_node_name, to_match, capture_preference in edges:
+                if next_node_name not in state_numbers:
+                    raise Exception(f"{node_type} graph's node {node_name} has an edge to missing node {next_node_name}")
+                if capture_preference not in CAPTURE_CODES:
+                    raise Exception(f"Invalid capture preference in {node_type} graph: {capture_preference}")
+                if to_match == ANY:
+                    label = ANY_LABEL
+                elif type(to_match) == list:
+                    label = frozenset(to_match)
+                else:
+                    label = frozenset([to_match])
+                compiled_edges.append((state_numbers[next_node_name], label, CAPTURE_CODES[capture_preference]))
+            transitions.append(tuple(compiled_edges))
+    # every node must be reachable from the starting node
+    reached = {state_numbers[start_node_name]}
+    to_visit = [state_numbers[start_node_name]]
+    while to_visit:
+        edges = transitions[to_visit.pop()]
+        if edges:
+            for next_state, label, capture_code in edges:
+                if next_state not in reached:
+                    reached.add(next_state)
+                    to_visit.append(next_state)
+    for node_name, state in state_numbers.items():
+        if state not in reached:
+            raise Exception(f"{node_type} graph's node {node_name} cannot be reached from the starting node")
+    return (node_type, state_numbers[start_node_name], state_numbers[end_node_name], tuple(transitions))
+
+compiled_structure_graphs = [compile_structure_graph(structure) for structure in structure_graphs]
+
+
+# FIRST TOKEN INDEX
+# a structure graph can only match a token list if one of the edges leaving its starting node 
+#   accepts the first token, so the graphs worth trying can be looked up by the first token's type
+# first_token_index maps each token type to the compiled graphs whose starting edges accept it, 
+#   along with every graph that has an ANY starting edge, in their original priority order
+# any_first_token_graphs are the graphs to try for token types that are not in the index
+def build_first_token_index(graphs):
+    any_first_token_graphs = []
+    graphs_by_first_token = {}
+    for graph in graphs:
+        starting_edges = graph[3][graph[1]]
+        for next_state, label, capture_code in starting_edges:
+            if label == ANY_LABEL:
+                any_first_token_graphs.append(graph)
+                break
+            for token_type in label:
+                graphs_by_first_token.setdefault(token_type, [])
+    # filling in each token type's graphs, in the original order
+    for graph in graphs:
+        starting_edges = graph[3][graph[1]]
+        for token_type, candidate_graphs in graphs_by_first_token.items():
+            for next_state, label, capture_code in starting_edges:
+                if label == ANY_LABEL or token_type in label:
+                    candidate_graphs.append(graph)
+                    break
+    return graphs_by_first_token, any_first_token_graphs
+
+first_token_index, any_first_token_graphs = build_first_token_index(compiled_structure_graphs)
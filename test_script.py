@@ -2,4 +2,713 @@ from mainScript import *
 
 print(form_AST(process_text("variable_name = 3+(5*3+1)")))
 print(form_AST(process_text("array_variable = [\"Alice\", \"Bob\", \"Eve\"]")))
-print(form_AST(process_text("IF number ISEQUALTO 5 DO ")))
\ No newline at end of file
+print(form_AST(process_text("IF number ISEQUALTO 5 DO ")))
+
+import mainScript
+
+# used to catch the outputs of the programs run
+import io
+from contextlib import redirect_stdout
+
+# used to save bytecode and compiled files somewhere they can be removed afterwards
+import os
+import tempfile
+import pathlib
+
+# the expressions checked as well as the lines of testing_program.bl, chosen to cover how 
+#   the structure graphs group operators
+EXPRESSION_TEST_LINES = [
+    "a - b - c + d * e / f // g % h",
+    "a + b - c ISEQUALTO NOT d AND e OR NOT (f ISLESSTHAN g)",
+    "a + NOT b ISEQUALTO c - NOT d * e",
+    "((1 + 2) * (3 - (4 / 5))) % 6",
+    "x = NOT a AND (b ISNOTEQUALTO c) OR d",
+    "OUTPUT(a * (b + c) - d)",
+    "a + * b",
+    "(a + b",
+]
+
+# forms the AST of a line with the chosen parser, invalid lines give their error message
+def parse_with_engine(code_line, parser_engine):
+    original_engine = mainScript.PARSER_ENGINE
+    mainScript.PARSER_ENGINE = parser_engine
+    try:
+        my_AST = str(form_AST(process_text(code_line)))
+    except Exception as error:
+        my_AST = f"error: {error}"
+    mainScript.PARSER_ENGINE = original_engine
+    return my_AST
+
+# differential test, the precedence climbing parser must give the same AST as the graph parser
+def test_precedence_climbing_parser_matches_graph_parser():
+    file = open("testing_program.bl", "r")
+    code_lines = file.readlines() + EXPRESSION_TEST_LINES
+    file.close()
+    for code_line in code_lines:
+        graph_AST = parse_with_engine(code_line, GRAPH_PARSER)
+        precedence_AST = parse_with_engine(code_line, PRECEDENCE_CLIMBING_PARSER)
+        assert graph_AST == precedence_AST, f"parsers disagree on {code_line}"
+
+# gives the type and value of each token the lexer makes from a line, or its error message
+def lex_with_lexer(code_line, lexer):
+    try:
+        return [(token.type, token.value) for token in lexer(code_line)]
+    except Exception as error:
+        return f"error: {error}"
+
+# the pieces random lines are made from, including words that begin with keywords, characters
+#   that no template matches and a word character outside of the name characters
+LEXER_TEST_PIECES = ["x", "ANDY", "IFX", "_a1", "\u00e9", "1", "12.5", "-3", "\"s t\"", "'c'", "'", "\"", "(", ")", \
+    "[", "]", "{", "}", "<", ">", ",", ":", ".", "=", "+", "-", "*", "/", "//", "%", "\t", "#", "?", "$"]
+
+# the offset and master regex lexers, with keywords found through the keyword table, must give 
+#   the same tokens and errors as testing every template in turn
+def test_lexers_match_trial_match_lexer():
+    import random
+    from regexTemplatesLib import keyword_table
+    file = open("testing_program.bl", "r")
+    code_lines = file.readlines() + EXPRESSION_TEST_LINES
+    file.close()
+    pieces = LEXER_TEST_PIECES + list(keyword_table)
+    random_generator = random.Random(0)
+    for _ in range(2000):
+        code_lines.append("".join(random_generator.choice(pieces) + random_generator.choice(["", " "]) \
+            for _ in range(random_generator.randint(1, 8))))
+    for code_line in code_lines:
+        trial_tokens = lex_with_lexer(code_line, process_text_trial_match)
+        assert lex_with_lexer(code_line, process_text_offset_trial_match) == trial_tokens, \
+            f"offset trial match lexer disagrees on {code_line!r}"
+        assert lex_with_lexer(code_line, process_text_master_regex) == trial_tokens, \
+            f"master regex lexer disagrees on {code_line!r}"
+    # every keyword is found in the table as the keyword templates would find it
+    for word in list(keyword_table) + ["ANDY", "IFX", "_a1", "x"]:
+        assert lex_with_lexer(word, process_text_trial_match) == [resolve_word(word), (END, None)], word
+
+# only the edited and inserted lines should be reparsed, and the ASTs should be the same as
+#   parsing the edited program from scratch
+# an AST cached for a line is only reused by the lexer and parser engines that made it
+def test_line_AST_cache_is_kept_apart_for_each_engine():
+    cache = Line_AST_cache(10)
+    original_engines = (mainScript.LEXER_ENGINE, mainScript.PARSER_ENGINE)
+    try:
+        cache.get_AST("x = 1 + 2 * 3\n")
+        cache.get_AST("  x = 1 + 2 * 3")
+        assert (cache.hits, cache.misses) == (1, 1)
+        mainScript.PARSER_ENGINE = GRAPH_PARSER if original_engines[1] != GRAPH_PARSER else PRECEDENCE_CLIMBING_PARSER
+        cache.get_AST("x = 1 + 2 * 3\n")
+        assert (cache.hits, cache.misses) == (1, 2)
+        mainScript.LEXER_ENGINE = TRIAL_MATCH_LEXER if original_engines[0] != TRIAL_MATCH_LEXER else MASTER_REGEX_LEXER
+        cache.get_AST("x = 1 + 2 * 3\n")
+        assert (cache.hits, cache.misses) == (1, 3)
+        mainScript.LEXER_ENGINE, mainScript.PARSER_ENGINE = original_engines
+        cache.get_AST("x = 1 + 2 * 3\n")
+        assert (cache.hits, cache.misses) == (2, 3)
+    finally:
+        mainScript.LEXER_ENGINE, mainScript.PARSER_ENGINE = original_engines
+
+def test_incremental_parser_only_reparses_changed_lines():
+    file = open("testing_program.bl", "r")
+    code_lines = file.readlines()
+    file.close()
+    incremental_parser = Incremental_parser()
+    incremental_parser.update(code_lines)
+    assert incremental_parser.reparsed_line_count == len(code_lines)
+    edited_code_lines = code_lines[:5] + ["OUTPUT(\"inserted\")\n"] + code_lines[5:]
+    edited_code_lines[20] = "OUTPUT(\"edited\")\n"
+    processed_lines = incremental_parser.update(edited_code_lines)
+    assert incremental_parser.reparsed_line_count == 2
+    assert [str(my_AST) for my_AST in processed_lines] == [str(my_AST) for my_AST in process_code(edited_code_lines)]
+
+# watch mode waits for a file that doesn't exist yet, or that is missing for a moment while 
+#   an editor replaces it, rather than stopping
+def test_watch_mode_waits_for_a_missing_file(tmp_path):
+    file_name = str(tmp_path / "program.bl")
+    # each poll of the file carries out the next change to it, the last stops watching
+    def write_program(code_line, modified_time):
+        with open(file_name, "w") as file:
+            file.write(code_line)
+        os.utime(file_name, (modified_time, modified_time))
+    file_changes = [lambda: None, lambda: write_program("OUTPUT(1)\n", 1000), lambda: os.remove(file_name), \
+        lambda: write_program("OUTPUT(2)\n", 2000)]
+    def next_poll(poll_interval):
+        if not file_changes:
+            raise KeyboardInterrupt
+        file_changes.pop(0)()
+    original_sleep = mainScript.time.sleep
+    mainScript.time.sleep = next_poll
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            watch_program(file_name)
+    finally:
+        mainScript.time.sleep = original_sleep
+    assert [line for line in output.getvalue().splitlines() if line.startswith(">")] == ["> 1", "> 2"]
+    assert "Stopped watching" in output.getvalue()
+
+# runs a program made of the lines given, returning the lines it outputs
+# with catch_errors, the lines output before any error are given along with the error's 
+#   message, which is None if the program ran to its end
+def run_program(code_lines, catch_errors=False):
+    output = io.StringIO()
+    error_message = None
+    try:
+        with redirect_stdout(output):
+            Program_runner(optimise_program(process_code([code_line + "\n" for code_line in code_lines]))).run()
+    except Exception as error:
+        if not catch_errors:
+            raise
+        error_message = str(error)
+    if catch_errors:
+        return output.getvalue().splitlines(), error_message
+    return output.getvalue().splitlines()
+
+# values are shared rather than copied, changing a data structure must never change another
+#   variable that holds the same one
+def test_changing_a_shared_data_structure_leaves_the_others_unchanged():
+    assert run_program(["ARRAY a = [1, 2]", "ARRAY b = a", "b.APPEND(3)", "OUTPUT(a)", "OUTPUT(b)"]) \
+        == ["> [1, 2]", "> [1, 2, 3]"]
+    assert run_program(["ARRAY inner = [1]", "ARRAY outer = [inner]", "inner.APPEND(2)", "OUTPUT(outer)"]) \
+        == ["> [[1]]"]
+    assert run_program(["ARRAY a = [1, 2]", "FOR item IN a DO", "a.APPEND(item)", "ENDFOR", "OUTPUT(a)"]) \
+        == ["> [1, 2, 1, 2]"]
+    assert run_program(["STACK a", "a.ADDITEM(1)", "STACK b", "b = a", "b.ADDITEM(2)", "b.POPITEM", \
+        "b.POPITEM", "OUTPUT(LENGTH(a))", "OUTPUT(LENGTH(b))"]) == ["> 1", "> 0"]
+    assert run_program(["QUEUE a", "a.ADDITEM(1)", "QUEUE b", "b = a", "b.POPITEM", "OUTPUT(LENGTH(a))"]) \
+        == ["> 1"]
+    assert run_program(["PRIORITYQUEUE a", "a.ADDITEM(\"x\", 1)", "PRIORITYQUEUE b", "b = a", \
+        "b.ADDITEM(\"y\", 2)", "OUTPUT(LENGTH(a))", "OUTPUT(a.READITEM)"]) == ["> 1", "> x"]
+    assert run_program(["DICTIONARY a = {'a':1}", "DICTIONARY b = a", "b.INSERTPAIR('b':2)", \
+        "b.REMOVEPAIR('a')", "OUTPUT(LENGTH(a))", "OUTPUT(a.LOOKUPVALUE('a'))", "OUTPUT(LENGTH(b))"]) \
+        == ["> 1", "> 1", "> 1"]
+
+# scalars are shared between variables and with the folded values in the AST, arithmetic 
+#   must give new values rather than changing them
+def test_arithmetic_leaves_shared_values_unchanged():
+    assert run_program(["INTEGER x = 1", "INTEGER y = x", "x = x + 1", "OUTPUT(y)", \
+        "STRING s = \"a\"", "STRING t = s", "s = s + \"b\"", "OUTPUT(t)"]) == ["> 1", "> a"]
+    code_lines = ["INTEGER i = 0", "INTEGER j = 0", "WHILE i ISLESSTHAN 3 DO", "j = 2 + 3", \
+        "j = j + i", "OUTPUT(j)", "i = i + 1", "ENDWHILE"]
+    assert run_program(code_lines) == ["> 5", "> 6", "> 7"]
+
+# repeated literals share one leaf node while they are used, and are forgotten once nothing
+#   that is kept uses them
+def test_interned_leaf_nodes_are_forgotten_once_unused():
+    import gc
+    leaf_key = (STRING, "only used by this test")
+    incremental_parser = Incremental_parser()
+    processed_lines = incremental_parser.update(["OUTPUT(\"only used by this test\")\n", \
+        "STRING s = \"only used by this test\"\n"])
+    assert processed_lines[0].child_nodes[0] is processed_lines[1].child_nodes[2]
+    assert leaf_key in interned_leaf_nodes
+    # editing the lines that use the literal leaves only the line AST cache holding it
+    processed_lines = incremental_parser.update(["OUTPUT(1)\n"])
+    line_AST_cache.clear()
+    gc.collect()
+    assert leaf_key not in interned_leaf_nodes
+
+# the programs every execution engine is checked against the tree walking interpreter with
+TEST_PROGRAM_FILES = ["testing_program.bl", "program_code.bl"]
+
+# gives the lines of a program file without their line endings
+def read_code_lines(file_name):
+    file = open(file_name, "r")
+    code_lines = [code_line.rstrip("\n") for code_line in file.readlines()]
+    file.close()
+    return code_lines
+
+# the closure compiler, python transpiler and bytecode virtual machine must give the same 
+#   outputs as the tree walking interpreter
+def test_execution_engines_match_tree_walking_interpreter():
+    original_engine = mainScript.EXECUTION_ENGINE
+    try:
+        for file_name in TEST_PROGRAM_FILES:
+            code_lines = read_code_lines(file_name)
+            mainScript.EXECUTION_ENGINE = TREE_WALKING_INTERPRETER
+            expected_outputs = run_program(code_lines)
+            for execution_engine in [CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM]:
+                mainScript.EXECUTION_ENGINE = execution_engine
+                assert run_program(code_lines) == expected_outputs, f"{execution_engine} disagrees on {file_name}"
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+
+# errors raised by a transpiled program are given the BigLang line they came from
+def test_python_transpiler_gives_the_line_of_errors():
+    original_engine = mainScript.EXECUTION_ENGINE
+    mainScript.EXECUTION_ENGINE = PYTHON_TRANSPILER
+    try:
+        try:
+            run_program(["INTEGER count = 0", "WHILE count ISLESSTHAN 3 DO", "count = count + 1", "ENDWHILE", "OUTPUT(count // 0)"])
+            assert False, "dividing by zero should raise an error"
+        except Exception as error:
+            assert str(error).startswith("Error on line 5:"), str(error)
+        try:
+            run_program(["IF FALSE DO", "INTEGER hidden = 1", "ENDIF", "OUTPUT(hidden)"])
+            assert False, "reading an undeclared variable should raise an error"
+        except Exception as error:
+            assert str(error) == "Error on line 4: there is no variable with the name keyword hidden available in the current scope"
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+
+# programs nested too deeply for python to compile once transpiled are run by the closure 
+#   compiler instead
+def test_deeply_nested_programs_run_when_transpiling():
+    nested_programs = [
+        ["INTEGER i = 0"] + ["FOR i{} IN [1] DO".format(depth) for depth in range(21)] + ["i = i + 1"] \
+            + ["ENDFOR"]*21 + ["OUTPUT(i)"],
+        ["INTEGER i = 0"] + ["WHILE i ISLESSTHAN 1 DO"]*21 + ["i = i + 1"] + ["ENDWHILE"]*21 + ["OUTPUT(i)"],
+        ["INTEGER i = 1"] + ["IF TRUE DO"]*99 + ["OUTPUT(i)"] + ["ENDIF"]*99
+    ]
+    original_engine = mainScript.EXECUTION_ENGINE
+    mainScript.EXECUTION_ENGINE = PYTHON_TRANSPILER
+    try:
+        for code_lines in nested_programs:
+            assert run_program(code_lines) == ["> 1"]
+            ast_lines = optimise_program(process_code([code_line + "\n" for code_line in code_lines]))
+            assert transpile_program(ast_lines) == None
+            # one block less deep is still transpiled
+            del code_lines[1], code_lines[-2]
+            ast_lines = optimise_program(process_code([code_line + "\n" for code_line in code_lines]))
+            assert transpile_program(ast_lines) != None
+            assert run_program(code_lines) == ["> 1"]
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+
+# the bytecode loaded from a file runs the same as the bytecode it was saved from
+def test_bytecode_survives_being_saved_and_loaded():
+    for file_name in TEST_PROGRAM_FILES:
+        code_lines = read_code_lines(file_name)
+        bytecode_program = compile_bytecode(optimise_program(process_code([code_line + "\n" for code_line in code_lines])))
+        bytecode_file_name = os.path.join(tempfile.mkdtemp(), "program.blb")
+        save_bytecode_file(bytecode_file_name, bytecode_program)
+        loaded_program = load_bytecode_file(bytecode_file_name)
+        os.remove(bytecode_file_name)
+        os.rmdir(os.path.dirname(bytecode_file_name))
+        assert loaded_program.code == bytecode_program.code
+        assert disassemble_bytecode(loaded_program) == disassemble_bytecode(bytecode_program)
+        outputs = []
+        for program in [bytecode_program, loaded_program]:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                program.run()
+            outputs.append(output.getvalue().splitlines())
+        assert outputs[1] == outputs[0], f"loaded bytecode disagrees on {file_name}"
+
+# a pickled object that removes a file when it is unpickled
+class Removing_pickle(object):
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    def __reduce__(self):
+        return (os.remove, (self.file_name,))
+
+# bytecode files that weren't made by this interpreter or are damaged are refused, without 
+#   anything held in them being run
+def test_bytecode_files_are_checked_before_they_are_loaded():
+    import pickle
+    import marshal
+    from array import array
+    directory = tempfile.mkdtemp()
+    bytecode_file_name = os.path.join(directory, "program.blb")
+    marker_file_name = os.path.join(directory, "marker")
+    open(marker_file_name, "w").close()
+    with open(bytecode_file_name, "wb") as file:
+        file.write(pickle.dumps((BYTECODE_FORMAT, Removing_pickle(marker_file_name))))
+    damaged_files = [bytecode_file_name]
+    code_lines = ["INTEGER x = 1\n", "WHILE x ISLESSTHAN 3 DO\n", "x = x + 1\n", "ENDWHILE\n", "OUTPUT(x)\n"]
+    bytecode_program = compile_bytecode(optimise_program(process_code(code_lines)))
+    save_bytecode_file(os.path.join(directory, "valid.blb"), bytecode_program)
+    with open(os.path.join(directory, "valid.blb"), "rb") as file:
+        valid_contents = file.read()
+    # cut short, and with an instruction that refers to an operand that doesn't exist
+    with open(os.path.join(directory, "truncated.blb"), "wb") as file:
+        file.write(valid_contents[:len(valid_contents)//2])
+    damaged_files.append(os.path.join(directory, "truncated.blb"))
+    with open(os.path.join(directory, "valid.blb"), "rb") as file:
+        header = marshal.load(file)
+        contents = marshal.load(file)
+    code = array("q", contents[0])
+    code[1] = 1000
+    with open(os.path.join(directory, "bad_operand.blb"), "wb") as file:
+        marshal.dump(header, file)
+        marshal.dump((code.tobytes(),) + contents[1:], file)
+    damaged_files.append(os.path.join(directory, "bad_operand.blb"))
+    for damaged_file_name in damaged_files:
+        try:
+            load_bytecode_file(damaged_file_name)
+            refused = False
+        except Exception:
+            refused = True
+        assert refused, f"{damaged_file_name} was loaded"
+    assert os.path.exists(marker_file_name), "the pickled file was run"
+    for file_name in os.listdir(directory):
+        os.remove(os.path.join(directory, file_name))
+    os.rmdir(directory)
+
+# the data structures are saved to bytecode files as plain values and made back into the same 
+#   virtual variables
+def test_virtual_variables_survive_being_saved_as_plain_values():
+    import marshal
+    priority_queue = Priority_queue_virtual(None)
+    priority_queue.add_item(Token(STRING, "low"), 1)
+    priority_queue.add_item(Token(STRING, "high"), 5)
+    stack = Stack_virtual(None)
+    stack.add_item(Token(INTEGER, "4"))
+    dictionary = Dictionary_virtual(None, None, [Dictionary_pair(Character_virtual("a"), \
+        Array_virtual([Float_virtual("1.5"), Boolean_virtual("TRUE")])).convert_to_token()])
+    for variable in [priority_queue, stack, dictionary, Tuple_virtual([Integer_virtual(1), String_virtual("b")])]:
+        encoded_variable = marshal.loads(marshal.dumps(encode_virtual_variable(variable)))
+        decoded_variable = decode_virtual_variable(encoded_variable)
+        assert type(decoded_variable) == type(variable)
+        assert str(decoded_variable) == str(variable)
+    assert dictionary.find_value(Character_virtual("a")).output_representation() == "[1.5, TRUE]"
+    assert decode_virtual_variable(encode_virtual_variable(dictionary)).find_value(Character_virtual("a")) \
+        .output_representation() == "[1.5, TRUE]"
+
+# gives the fused operation of every fused node in the AST
+def find_fused_operations(my_AST):
+    if type(my_AST) == Fused_operator_node:
+        return [my_AST.fused_operation] + find_fused_operations(my_AST.original_node)
+    elif type(my_AST) == Leaf_node:
+        return []
+    return [fused_operation for child_node in my_AST.child_nodes for fused_operation in find_fused_operations(child_node)]
+
+# checks that the fused operation is used in the program and that it gives the same outputs, 
+#   or the same error, as the operations it replaces
+def check_fused_operation_matches_generic_path(code_lines, fused_operation):
+    ast_lines = optimise_program(process_code([code_line + "\n" for code_line in code_lines]))
+    assert fused_operation in [found for my_AST in ast_lines for found in find_fused_operations(my_AST)]
+    check_optimisation_leaves_programs_unchanged("FUSE_OPERATIONS", [code_lines], [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER])
+
+def test_fused_increment_matches_generic_path():
+    check_fused_operation_matches_generic_path(["INTEGER x = 1", "FLOAT f = 0.5", "INTEGER n = 0", \
+        "WHILE n ISLESSTHAN 3 DO", "x = x + 2", "f = f - 1", "n = n + 1", "ENDWHILE", "OUTPUT(x)", "OUTPUT(f)"], FUSED_INCREMENT)
+    check_fused_operation_matches_generic_path(["IF FALSE DO", "INTEGER x = 1", "ENDIF", "x = x + 1"], FUSED_INCREMENT)
+
+def test_fused_append_concatenation_matches_generic_path():
+    check_fused_operation_matches_generic_path(["STRING s = \"a\"", "STRING t = s", "s = s + \"b\"", \
+        "s = s + \"\"", "OUTPUT(s)", "OUTPUT(t)"], FUSED_APPEND_CONCATENATION)
+    check_fused_operation_matches_generic_path(["IF FALSE DO", "STRING s = \"a\"", "ENDIF", "s = s + \"b\""], \
+        FUSED_APPEND_CONCATENATION)
+
+def test_fused_modulo_comparison_matches_generic_path():
+    check_fused_operation_matches_generic_path(["INTEGER a = 7", "INTEGER n = 3", "BOOLEAN b = a % n ISEQUALTO 1", \
+        "OUTPUT(b)", "OUTPUT(a % 2 ISNOTEQUALTO 0)", "OUTPUT(-7 % n ISLESSTHAN 2)"], FUSED_MODULO_COMPARISON)
+    check_fused_operation_matches_generic_path(["INTEGER a = 7", "INTEGER z = 0", "OUTPUT(a % z ISEQUALTO 0)"], \
+        FUSED_MODULO_COMPARISON)
+
+def test_fused_compare_and_branch_matches_generic_path():
+    check_fused_operation_matches_generic_path(["INTEGER i = 1", "INTEGER n = 4", "WHILE i ISLESSTHANOREQUALTO n DO", \
+        "IF i % 2 ISEQUALTO 0 DO", "OUTPUT(i)", "ELSE", "OUTPUT(\"odd\")", "ENDIF", "IF i ISEQUALTO n DO", \
+        "OUTPUT(\"last\")", "ENDIF", "i = i + 1", "ENDWHILE"], FUSED_COMPARE_AND_BRANCH)
+    check_fused_operation_matches_generic_path(["IF FALSE DO", "INTEGER m = 1", "ENDIF", "WHILE m ISLESSTHAN 3 DO", \
+        "ENDWHILE"], FUSED_COMPARE_AND_BRANCH)
+
+# the right operand of AND and OR is only worked out when the left one doesn't decide the result, 
+#   so errors it would raise are skipped, by the general and the typed operations in every engine
+def test_logical_statements_short_circuit_in_every_execution_engine():
+    code_lines = ["DICTIONARY d = {'a':TRUE}", "BOOLEAN f = FALSE", "BOOLEAN t = TRUE", "INTEGER z = 0", \
+        "OUTPUT(f AND (d.LOOKUPVALUE('m')))", "OUTPUT(t OR (d.LOOKUPVALUE('m')))", "OUTPUT(f AND 1 // z ISEQUALTO 0)", \
+        "OUTPUT(t OR undeclared)", "OUTPUT(FALSE AND 5)", "OUTPUT(t AND (d.LOOKUPVALUE('a')))", "OUTPUT(f OR f)"]
+    ast_lines = optimise_program(process_code([code_line + "\n" for code_line in code_lines]))
+    assert type(ast_lines[6].child_nodes[0]) == Typed_operator_node
+    original_engine = mainScript.EXECUTION_ENGINE
+    try:
+        for execution_engine in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM]:
+            mainScript.EXECUTION_ENGINE = execution_engine
+            assert run_program(code_lines) == ["> FALSE", "> TRUE", "> FALSE", "> TRUE", "> FALSE", "> TRUE", "> FALSE"], \
+                f"{execution_engine} doesn't short circuit"
+            # the right operand is still worked out when it is needed, and a left operand which 
+            #   isn't a boolean still raises an error
+            assert "m is not available as a key" in run_program(["DICTIONARY d = {'a':TRUE}", \
+                "OUTPUT(TRUE AND (d.LOOKUPVALUE('m')))"], catch_errors=True)[1]
+            assert "division or modulo by zero" in run_program(["INTEGER z = 0", "BOOLEAN f = FALSE", \
+                "OUTPUT(f OR 1 // z ISEQUALTO 0)"], catch_errors=True)[1]
+            assert "must be boolean" in run_program(["OUTPUT(5 AND FALSE)"], catch_errors=True)[1]
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+
+# variables are given the frame and slot they are held in before the program runs, which must 
+#   give the same outputs and errors as finding them by name, however the blocks are nested
+def test_resolved_variables_match_finding_them_by_name():
+    code_lines = ["INTEGER x = 1", "IF TRUE DO", "IF x ISEQUALTO 1 DO", "INTEGER d = 1", "ENDIF", "WHILE x ISLESSTHAN 4 DO", \
+        "x = x + d", "ENDWHILE", "ENDIF", "OUTPUT(d)", "OUTPUT(x)"]
+    base_layout, line_scopes = resolve_variables(process_code([code_line + "\n" for code_line in code_lines]))
+    # d is moved into the base frame when the blocks around its declaration close
+    assert line_scopes[6].addresses["x"] == (0, base_layout.slot_indices["x"], base_layout)
+    assert line_scopes[6].addresses["d"][0] == 1
+    assert line_scopes[9].addresses["d"] == (0, base_layout.slot_indices["d"], base_layout)
+    programs = [code_lines, ["IF FALSE DO", "INTEGER q = 1", "ENDIF", "OUTPUT(q)"], \
+        ["IF TRUE DO", "INTEGER a = 1", "ELSE", "INTEGER a = 2", "ENDIF", "OUTPUT(a)"], \
+        ["INTEGER x = 1", "IF TRUE DO", "INTEGER x = 2", "OUTPUT(x)", "ENDIF"], \
+        ["INTEGER t = 0", "FOR i IN [1, 2] DO", "FOR j IN [10, 20] DO", "t = t + i * j", "ENDFOR", "ENDFOR", "OUTPUT(t)"], \
+        ["FOR k IN [1, 2] DO", "ENDFOR", "OUTPUT(k)"], ["OUTPUT(y)", "INTEGER y = 1"]]
+    original_engine = mainScript.EXECUTION_ENGINE
+    original_setting = mainScript.RESOLVE_VARIABLES
+    try:
+        for execution_engine in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, BYTECODE_VM]:
+            mainScript.EXECUTION_ENGINE = execution_engine
+            for program in programs:
+                mainScript.RESOLVE_VARIABLES = False
+                named_outputs = run_program(program, catch_errors=True)
+                mainScript.RESOLVE_VARIABLES = True
+                assert run_program(program, catch_errors=True) == named_outputs, f"{execution_engine} disagrees on {program}"
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+        mainScript.RESOLVE_VARIABLES = original_setting
+
+# --- Compiled AST Cache --- #
+
+CACHED_PROGRAM_LINES = ["INTEGER total = 0\n", "FOR item IN [1, 2, 3] DO\n", "total = total + item\n", "ENDFOR\n", \
+    "OUTPUT(total)\n"]
+
+# runs process_code_with_cache, giving the ASTs and how many times the program was parsed
+def process_code_counting_parses(file_name, code_lines):
+    original_process_code = mainScript.process_code
+    parse_counts = []
+    def counting_process_code(code_lines):
+        parse_counts.append(1)
+        return original_process_code(code_lines)
+    mainScript.process_code = counting_process_code
+    try:
+        processed_lines = process_code_with_cache(file_name, code_lines)
+    finally:
+        mainScript.process_code = original_process_code
+    return [str(my_AST) for my_AST in processed_lines], len(parse_counts)
+
+def test_compiled_file_is_used_until_the_source_or_interpreter_changes(tmp_path):
+    file_name = str(tmp_path / "program.bl")
+    expected_ASTs = [str(my_AST) for my_AST in process_code(CACHED_PROGRAM_LINES)]
+    assert process_code_counting_parses(file_name, CACHED_PROGRAM_LINES) == (expected_ASTs, 1)
+    assert os.path.exists(str(tmp_path / "program.blc"))
+    assert process_code_counting_parses(file_name, CACHED_PROGRAM_LINES) == (expected_ASTs, 0)
+    # a changed program is parsed again and replaces the compiled file
+    changed_lines = CACHED_PROGRAM_LINES[:-1] + ["OUTPUT(total * 2)\n"]
+    changed_ASTs = [str(my_AST) for my_AST in process_code(changed_lines)]
+    assert process_code_counting_parses(file_name, changed_lines) == (changed_ASTs, 1)
+    assert process_code_counting_parses(file_name, changed_lines) == (changed_ASTs, 0)
+    # as is a compiled file made by a different version of the interpreter
+    try:
+        mainScript.interpreter_version_stamp = "a different version"
+        assert process_code_counting_parses(file_name, changed_lines) == (changed_ASTs, 1)
+    finally:
+        mainScript.interpreter_version_stamp = None
+    assert process_code_counting_parses(file_name, changed_lines) == (changed_ASTs, 1)
+    assert process_code_counting_parses(file_name, changed_lines) == (changed_ASTs, 0)
+
+# compiled files which can't be read are ignored and replaced, rather than stopping the program
+def test_damaged_compiled_files_are_parsed_again(tmp_path):
+    import marshal
+    file_name = str(tmp_path / "program.bl")
+    compiled_file_name = str(tmp_path / "program.blc")
+    expected_ASTs = [str(my_AST) for my_AST in process_code(CACHED_PROGRAM_LINES)]
+    process_code_with_cache(file_name, CACHED_PROGRAM_LINES)
+    with open(compiled_file_name, "rb") as file:
+        valid_contents = file.read()
+    damaged_contents = [b"", valid_contents[:len(valid_contents)//2], b"not a compiled file", \
+        marshal.dumps(12), marshal.dumps(("too", "short"))]
+    for contents in damaged_contents:
+        with open(compiled_file_name, "wb") as file:
+            file.write(contents)
+        assert process_code_counting_parses(file_name, CACHED_PROGRAM_LINES) == (expected_ASTs, 1), contents
+        assert process_code_counting_parses(file_name, CACHED_PROGRAM_LINES) == (expected_ASTs, 0), contents
+
+# AST_CACHE_DIRECTORY keeps the compiled files together, apart from the programs
+def test_compiled_files_can_be_kept_in_another_directory(tmp_path):
+    original_directory = mainScript.AST_CACHE_DIRECTORY
+    mainScript.AST_CACHE_DIRECTORY = str(tmp_path / "cache")
+    try:
+        file_names = []
+        for folder_name in ["first", "second"]:
+            os.mkdir(str(tmp_path / folder_name))
+            file_names.append(str(tmp_path / folder_name / "program.bl"))
+        process_code_with_cache(file_names[0], CACHED_PROGRAM_LINES)
+        process_code_with_cache(file_names[1], CACHED_PROGRAM_LINES[:-1])
+        # programs with the same name in different folders are given different compiled files
+        compiled_file_names = sorted(os.listdir(str(tmp_path / "cache")))
+        assert len(compiled_file_names) == 2
+        assert all(compiled_file_name.startswith("program-") and compiled_file_name.endswith(".blc") \
+            for compiled_file_name in compiled_file_names)
+        assert os.listdir(str(tmp_path / "first")) == [] and os.listdir(str(tmp_path / "second")) == []
+        assert process_code_counting_parses(file_names[0], CACHED_PROGRAM_LINES)[1] == 0
+        assert process_code_counting_parses(file_names[1], CACHED_PROGRAM_LINES[:-1])[1] == 0
+    finally:
+        mainScript.AST_CACHE_DIRECTORY = original_directory
+
+# programs whose subtrees of literals can be folded, including ones that raise errors, which
+#   must still be raised when the line is run and not before
+FOLDING_TEST_PROGRAMS = [
+    ["OUTPUT(1 + 2 * 3 - 4 // 3)", "OUTPUT((7 % 4) * 2.5)", "OUTPUT(10 / 4)", "OUTPUT(\"a\" + \"b\")"],
+    ["OUTPUT(1 ISLESSTHAN 2 AND NOT (3 ISEQUALTO 4))", "OUTPUT(\"a\" ISNOTEQUALTO \"b\" OR FALSE)"],
+    ["ARRAY a = [1 + 1, 2 * 3]", "TUPLE t = <\"x\", 1 - 5>", "OUTPUT(a)", "OUTPUT(t)", "OUTPUT(1.5 + 2)"],
+    ["OUTPUT(\"before\")", "OUTPUT(1 // 0)"],
+    ["OUTPUT(\"before\")", "OUTPUT(5 % (2 - 2))"],
+    ["OUTPUT(\"before\")", "OUTPUT(1 + TRUE)"],
+    ["OUTPUT(\"before\")", "OUTPUT(\"a\" + 1)"],
+    ["OUTPUT(\"before\")", "OUTPUT(NOT 5)"],
+    ["OUTPUT(\"before\")", "OUTPUT(3 ISEQUALTO 3.0)"],
+    ["IF FALSE DO", "OUTPUT(1 // 0)", "ENDIF", "OUTPUT(\"never raised\")"]]
+
+# runs each program with the optimisation flag on and off, in each execution engine, checking
+#   they give the same outputs and errors
+def check_optimisation_leaves_programs_unchanged(flag_name, programs, execution_engines):
+    original_engine = mainScript.EXECUTION_ENGINE
+    original_setting = getattr(mainScript, flag_name)
+    try:
+        for execution_engine in execution_engines:
+            mainScript.EXECUTION_ENGINE = execution_engine
+            for program in programs:
+                setattr(mainScript, flag_name, False)
+                unoptimised_result = run_program(program, catch_errors=True)
+                setattr(mainScript, flag_name, True)
+                assert run_program(program, catch_errors=True) == unoptimised_result, \
+                    f"{flag_name} changes {program} in the {execution_engine}"
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+        setattr(mainScript, flag_name, original_setting)
+
+def test_constant_folding_matches_unfolded_runs():
+    ast_lines = fold_program_constants(process_code(["OUTPUT(1 + 2 * 3)\n", "OUTPUT(1 // 0)\n", "OUTPUT(x + 1 * 2)\n"]))
+    assert type(ast_lines[0].child_nodes[0]) == Leaf_node
+    # subtrees that raise an error are left to raise it when they are run
+    assert type(ast_lines[1].child_nodes[0]) != Leaf_node
+    assert type(ast_lines[2].child_nodes[0]) != Leaf_node and type(ast_lines[2].child_nodes[0].child_nodes[1]) == Leaf_node
+    check_optimisation_leaves_programs_unchanged("FOLD_CONSTANTS", FOLDING_TEST_PROGRAMS, \
+        [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM])
+    assert run_program(FOLDING_TEST_PROGRAMS[3], catch_errors=True) == (["> before"], "integer division or modulo by zero")
+
+# programs whose operand types can be known before they run, including mixed types and 
+#   operations that raise errors
+TYPE_INFERENCE_TEST_PROGRAMS = [
+    ["INTEGER a = 7", "INTEGER b = 2", "OUTPUT(a + b, a - b, a * b, a // b, a % b, a / b)", \
+        "OUTPUT(a ISGREATERTHAN b, a ISEQUALTO b OR a ISLESSTHAN b)"],
+    ["FLOAT f = 1.5", "INTEGER i = 2", "OUTPUT(f + i, i * f, f / i, f - 0.5)", "f = f + i", "OUTPUT(f)"],
+    ["STRING s = \"a\"", "CHARACTER c = 'b'", "s = s + \"b\"", "OUTPUT(s, s ISEQUALTO \"ab\", c ISEQUALTO 'b')"],
+    ["BOOLEAN t = TRUE", "BOOLEAN f = FALSE", "OUTPUT(t AND f, t OR f, NOT f)"],
+    ["INTEGER z = 0", "OUTPUT(\"before\")", "OUTPUT(5 // z)"],
+    ["INTEGER z = 0", "OUTPUT(\"before\")", "OUTPUT(5 % z)"],
+    ["FLOAT z = 0.0", "OUTPUT(\"before\")", "OUTPUT(1.0 / z)"],
+    ["STRING s = \"a\"", "INTEGER i = 1", "OUTPUT(\"before\")", "OUTPUT(s + i)"],
+    ["BOOLEAN b = TRUE", "INTEGER i = 1", "OUTPUT(\"before\")", "OUTPUT(b + i)"],
+    ["STRING s = \"a\"", "INTEGER i = 1", "OUTPUT(\"before\")", "OUTPUT(s ISLESSTHAN i)"],
+    ["INTEGER i = 1", "OUTPUT(\"before\")", "i = i + \"a\""],
+    # a name declared with two types has no known type
+    ["IF TRUE DO", "INTEGER n = 1", "ELSE", "STRING n = \"a\"", "ENDIF", "OUTPUT(n + n)"]]
+
+def test_type_inference_matches_untyped_runs():
+    code_lines = ["INTEGER a = 1", "STRING s = \"a\"", "OUTPUT(a + 2)", "OUTPUT(a + s)", "OUTPUT(a + b)"]
+    ast_lines = infer_program_types(process_code([code_line + "\n" for code_line in code_lines]))
+    assert type(ast_lines[2].child_nodes[0]) == Typed_operator_node
+    assert ast_lines[2].child_nodes[0].operand_types == (Integer_virtual, Integer_virtual)
+    # operands whose types have no specialised implementation, or aren't known, are left to 
+    #   the generic operations
+    assert type(ast_lines[3].child_nodes[0]) == Operator_node
+    assert type(ast_lines[4].child_nodes[0]) == Operator_node
+    for fold_constants in [False, True]:
+        original_setting = mainScript.FOLD_CONSTANTS
+        mainScript.FOLD_CONSTANTS = fold_constants
+        try:
+            check_optimisation_leaves_programs_unchanged("INFER_TYPES", TYPE_INFERENCE_TEST_PROGRAMS, \
+                [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM])
+        finally:
+            mainScript.FOLD_CONSTANTS = original_setting
+    assert run_program(TYPE_INFERENCE_TEST_PROGRAMS[4], catch_errors=True) == (["> before"], "integer division or modulo by zero")
+
+# blocks at the edges of a program must be run the same way by every execution engine
+def test_every_execution_engine_runs_blocks_the_same():
+    programs = [["WHILE TRUE DO", "OUTPUT(1)", "INTEGER c = 1", "ENDWHILE"], \
+        ["INTEGER x = 1", "IF TRUE DO", "OUTPUT(2)", "INTEGER x = 2", "OUTPUT(x)", "ENDIF"], \
+        ["INTEGER x = 1", "IF TRUE DO", "IF TRUE DO", "INTEGER x = 2", "ENDIF", "OUTPUT(x)", "ENDIF"], \
+        ["IF TRUE DO", "INTEGER x = 1", "INTEGER x = 2", "ENDIF"], \
+        ["IF TRUE DO", "INTEGER x = 1", "ELSE", "INTEGER x = 2", "ENDIF", "IF TRUE DO", "INTEGER x = 3", "ENDIF"], \
+        ["FOR x IN [1, 2] DO", "IF TRUE DO", "INTEGER x = 5", "OUTPUT(x)", "ENDIF", "ENDFOR"], \
+        ["FOR x IN [1, 2] DO", "INTEGER x = 5", "ENDFOR"], \
+        ["INTEGER x = 0", "IF TRUE DO", "FOR x IN [1, 2] DO", "OUTPUT(x)", "ENDFOR", "ENDIF", "OUTPUT(x)"], \
+        ["FOR x IN [1, 2] DO", "IF TRUE DO", "FOR x IN [3] DO", "ENDFOR", "ENDIF", "FOR x IN [4] DO", "ENDFOR", "ENDFOR"]]
+    # the line each error is raised at by the execution engines which give it
+    error_lines = [4, 6, 7, 3, 8, 5, 2, None, 7]
+    original_engine = mainScript.EXECUTION_ENGINE
+    try:
+        for program, error_line in zip(programs, error_lines):
+            mainScript.EXECUTION_ENGINE = TREE_WALKING_INTERPRETER
+            expected_result = run_program(program, catch_errors=True)
+            for execution_engine in [CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM]:
+                mainScript.EXECUTION_ENGINE = execution_engine
+                outputs, error_message = run_program(program, catch_errors=True)
+                # the transpiler and bytecode virtual machine put the line number before the error
+                if execution_engine in [PYTHON_TRANSPILER, BYTECODE_VM] and error_line != None:
+                    line_prefix = f"Error on line {error_line}: "
+                    assert error_message != None and error_message.startswith(line_prefix), \
+                        f"{execution_engine} gave {error_message} on {program}"
+                    error_message = error_message[len(line_prefix):]
+                assert (outputs, error_message) == expected_result, f"{execution_engine} disagrees on {program}"
+        # a while statement on the first line is returned to like any other
+        mainScript.EXECUTION_ENGINE = TREE_WALKING_INTERPRETER
+        assert run_program(programs[0], catch_errors=True) == (["> 1", "> 1"], "Variable c already exists")
+        # a variable declared over one in an outer frame hides it until their frames are moved together
+        assert run_program(programs[1], catch_errors=True) == (["> 2", "> 2"], "Variable x already exists")
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+
+# gives the block jumps of a program, or the error finding them raises
+def find_block_jumps_or_error(code_lines):
+    try:
+        return find_block_jumps(process_code([code_line + "\n" for code_line in code_lines]))
+    except Exception as error:
+        return str(error)
+
+def test_block_jumps_skip_to_the_end_of_each_block():
+    code_lines = ["IF TRUE DO", "IF FALSE DO", "OUTPUT(1)", "ELSE", "OUTPUT(2)", "ENDIF", "ELSE", \
+        "WHILE FALSE DO", "ENDWHILE", "ENDIF", "FOR i IN [1] DO", "ENDFOR"]
+    # an if statement skips to its ELSE, an ELSE to the ENDIF and loops to their end
+    assert find_block_jumps_or_error(code_lines) == {0: 6, 1: 3, 3: 5, 6: 9, 7: 8, 10: 11}
+
+# blocks which don't match are found before the program is run, so nothing is output
+def test_mismatched_blocks_are_reported_before_the_program_runs():
+    mismatched_programs = [
+        (["OUTPUT(1)", "ELSE", "ENDIF"], "ELSE on line 2 is not inside an if statement"),
+        (["WHILE TRUE DO", "ELSE", "ENDWHILE"], "ELSE on line 2 is not inside an if statement"),
+        (["OUTPUT(1)", "IF TRUE DO", "ENDWHILE"], "ENDWHILE on line 3 does not close the statement it is in"),
+        (["IF TRUE DO", "FOR i IN [1] DO", "ENDIF", "ENDFOR"], "ENDIF on line 3 does not close the statement it is in"),
+        (["ENDFOR"], "ENDFOR on line 1 does not close the statement it is in"),
+        (["OUTPUT(1)", "WHILE TRUE DO", "IF TRUE DO", "ENDIF"], "The statement on line 2 is never closed"),
+        (["IF TRUE DO", "ELSE"], "The statement on line 1 is never closed")]
+    original_engine = mainScript.EXECUTION_ENGINE
+    try:
+        for code_lines, expected_message in mismatched_programs:
+            assert find_block_jumps_or_error(code_lines) == expected_message
+            for execution_engine in [TREE_WALKING_INTERPRETER, CLOSURE_COMPILER, PYTHON_TRANSPILER, BYTECODE_VM]:
+                mainScript.EXECUTION_ENGINE = execution_engine
+                assert run_program(code_lines, catch_errors=True) == ([], expected_message), \
+                    f"{execution_engine} ran {code_lines}"
+    finally:
+        mainScript.EXECUTION_ENGINE = original_engine
+
+if __name__ == "__main__":
+    test_precedence_climbing_parser_matches_graph_parser()
+    test_lexers_match_trial_match_lexer()
+    test_line_AST_cache_is_kept_apart_for_each_engine()
+    test_incremental_parser_only_reparses_changed_lines()
+    test_watch_mode_waits_for_a_missing_file(pathlib.Path(tempfile.mkdtemp()))
+    test_changing_a_shared_data_structure_leaves_the_others_unchanged()
+    test_arithmetic_leaves_shared_values_unchanged()
+    test_interned_leaf_nodes_are_forgotten_once_unused()
+    test_execution_engines_match_tree_walking_interpreter()
+    test_python_transpiler_gives_the_line_of_errors()
+    test_deeply_nested_programs_run_when_transpiling()
+    test_bytecode_survives_being_saved_and_loaded()
+    test_bytecode_files_are_checked_before_they_are_loaded()
+    test_virtual_variables_survive_being_saved_as_plain_values()
+    test_fused_increment_matches_generic_path()
+    test_fused_append_concatenation_matches_generic_path()
+    test_fused_modulo_comparison_matches_generic_path()
+    test_fused_compare_and_branch_matches_generic_path()
+    test_logical_statements_short_circuit_in_every_execution_engine()
+    test_resolved_variables_match_finding_them_by_name()
+    test_compiled_file_is_used_until_the_source_or_interpreter_changes(pathlib.Path(tempfile.mkdtemp()))
+    test_damaged_compiled_files_are_parsed_again(pathlib.Path(tempfile.mkdtemp()))
+    test_compiled_files_can_be_kept_in_another_directory(pathlib.Path(tempfile.mkdtemp()))
+    test_every_execution_engine_runs_blocks_the_same()
+    test_block_jumps_skip_to_the_end_of_each_block()
+    test_mismatched_blocks_are_reported_before_the_program_runs()
+    test_constant_folding_matches_unfolded_runs()
+    test_type_inference_matches_untyped_runs()
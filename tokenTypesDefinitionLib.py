@@ -6,7 +6,11 @@ import copy
 
 # The token class has two variables. The type, which signals what to be done with it and a value, 
 # which is called if it is a type that can have a value (like an integer)
+# __slots__ stops every token carrying its own attribute dictionary, which matters as 
+# there is a token for every word and symbol in a program
 class Token:
+    __slots__ = ("type", "value")
+
     def __init__(self, type, value):
         # Token types are constants defined in the tokenTypesDefinitionLib.py library
         self.type = type
@@ -22,8 +26,9 @@ class Token:
         id_self = id(self)
         _copy = memo.get(id_self)
         if _copy is None:
+            # token types are immutable and shared, so they don't need copying
             _copy = type(self)(
-                copy.deepcopy(self.type, memo),
+                self.type,
                 copy.deepcopy(self.value, memo))
             memo[id_self] = _copy 
         return _copy
@@ -35,192 +40,240 @@ class Token:
         return self.__str__()
 
 
+# ------------------------------ TOKEN TYPE CODES ------------------------------ #
+
+# token types are small integers so that the many comparisons made between them are cheap
+# each one still prints as its readable name, which is kept in token_type_names, so error 
+# messages and debugging output read exactly as they would if the types were strings
+# Token_type subclasses int, so it cannot have __slots__ of its own to store the name in
+class Token_type(int):
+    def __str__(self):
+        return token_type_names[self]
+    def __repr__(self):
+        return self.__str__()
+
+    # token types are immutable, so copies can just be the same object
+    def __copy__(self):
+        return self
+    def __deepcopy__(self, memo):
+        return self
+    # token types are also unpickled as the same object, rather than a new one with the same code
+    def __reduce__(self):
+        return (get_token_type, (int(self),))
+
+# reverse table, from each token type code to its readable name
+token_type_names = []
+# every token type, indexed by its code
+token_types = []
+# codes are interned by name, so two token types given the same name are the same type, 
+#   just as two equal strings would be
+token_type_codes = {}
+
+# gives the token type with the inputted code
+def get_token_type(code):
+    return token_types[code]
+
+# gives the token type with the inputted readable name, creating it if it doesn't exist yet
+def new_token_type(name):
+    token_type = token_type_codes.get(name)
+    if token_type == None:
+        token_type = Token_type(len(token_type_names))
+        token_type_names.append(name)
+        token_types.append(token_type)
+        token_type_codes[name] = token_type
+    return token_type
+
+
 # ------------------------------ TOKEN TYPES ------------------------------ #
 
 # defining token types so they can be written as 'INTEGER' instead of '"integer"'
-# the values of these are only used in error messages
+# the names of these are only used in error messages
 # token types are used for comparison e.g. token.type == INTEGER
 # also defining useful groups of token types for easy checking
 
+# EMPTY LINE
+# the only token in a line with no code on it
+EMPTY_LINE = new_token_type("empty line")
+
 # END
 # end of a token list
-END = "end of list"
+END = new_token_type("end of list")
 
 # ANY
 # represents any token, used in parser
-ANY = "any token"
+ANY = new_token_type("any token")
 
 # NUMBERS
-INTEGER = "integer value"
+INTEGER = new_token_type("integer value")
 # float has a decmial type which will then be converted into a float, 
 # in the virtual environment
-DECIMAL_NUMBER = "decimal number value"
-FLOAT = "float value"
+DECIMAL_NUMBER = new_token_type("decimal number value")
+FLOAT = new_token_type("float value")
 
 # CHARACTER-BASED
-CHARACTER = "character value"
+CHARACTER = new_token_type("character value")
 # string exists as its value until the virtual environment, where it is turned 
 # into an array of characters
-STRING = "string value"
+STRING = new_token_type("string value")
 
 # BOOLEAN VALUES
-BOOLEAN = "boolean value"
+BOOLEAN = new_token_type("boolean value")
 
 # DECLARATIVE KEYWORDS
-DECLARE_INTEGER = "integer declarator"
-DECLARE_FLOAT = "floating point declarator"
-DECLARE_CHARACTER = "character declarator"
-DECLARE_STRING = "string declarator"
-DECLARE_BOOLEAN = "boolean declarator"
-DECLARE_ARRAY = "array declarator"
-DECLARE_TUPLE = "tuple declarator"
-DECLARE_DICT = "dictionary declarator"
-DECLARE_STACK = "stack declarator"
-DECLARE_QUEUE = "queue declarator"
-DECLARE_PRIORITY_QUEUE = "priority queue declarator"
+DECLARE_INTEGER = new_token_type("integer declarator")
+DECLARE_FLOAT = new_token_type("floating point declarator")
+DECLARE_CHARACTER = new_token_type("character declarator")
+DECLARE_STRING = new_token_type("string declarator")
+DECLARE_BOOLEAN = new_token_type("boolean declarator")
+DECLARE_ARRAY = new_token_type("array declarator")
+DECLARE_TUPLE = new_token_type("tuple declarator")
+DECLARE_DICT = new_token_type("dictionary declarator")
+DECLARE_STACK = new_token_type("stack declarator")
+DECLARE_QUEUE = new_token_type("queue declarator")
+DECLARE_PRIORITY_QUEUE = new_token_type("priority queue declarator")
 
 # just includes all of these
 # STATEMENT KEYWORDS
-DO = "do keyword"
-IF = "if keyword"
-ELSE = "else keyword/root node opening the else part of an if statement"
-END_IF = "end if keyword/root node ending an if statement"
-WHILE = "while keyword"
-END_WHILE = "end while keyword/root node ending a while statement"
-FOR = "for keyword"
-IN = "in keyword"
-END_FOR = "end for keyword/root node ending a for statement"
+DO = new_token_type("do keyword")
+IF = new_token_type("if keyword")
+ELSE = new_token_type("else keyword/root node opening the else part of an if statement")
+END_IF = new_token_type("end if keyword/root node ending an if statement")
+WHILE = new_token_type("while keyword")
+END_WHILE = new_token_type("end while keyword/root node ending a while statement")
+FOR = new_token_type("for keyword")
+IN = new_token_type("in keyword")
+END_FOR = new_token_type("end for keyword/root node ending a for statement")
 # for methods
-DEFINE = "define keyword"
-END_DEFINE = "end define keyword/root node ending a subroutine definition/call"
+DEFINE = new_token_type("define keyword")
+END_DEFINE = new_token_type("end define keyword/root node ending a subroutine definition/call")
 
-OUTPUT = "data output keyword"
+OUTPUT = new_token_type("data output keyword")
 
 # BOOLEAN LOGIC KEYWORDS
-AND = "and keyword"
-OR = "or keyword"
-NOT = "not keyword"
+AND = new_token_type("and keyword")
+OR = new_token_type("or keyword")
+NOT = new_token_type("not keyword")
 
 # RESERVED KEYWORDS
-APPEND = "array append"
-LENGTH = "length"
-ADD_ITEM = "stack/queue add item"
-READ_ITEM = "stack/queue/PRIORITY_QUEUE read item"
-POP_ITEM = "stack/queue/PRIORITY_QUEUE pop item"
-INSERT_PAIR = "dictionary insert pair"
-LOOKUP_VALUE = "dictionary lookup value"
-REMOVE_PAIR = "dictionary remove pair"
-LIST_KEYS = "dictionary list keys"
+APPEND = new_token_type("array append")
+LENGTH = new_token_type("length")
+ADD_ITEM = new_token_type("stack/queue add item")
+READ_ITEM = new_token_type("stack/queue/PRIORITY_QUEUE read item")
+POP_ITEM = new_token_type("stack/queue/PRIORITY_QUEUE pop item")
+INSERT_PAIR = new_token_type("dictionary insert pair")
+LOOKUP_VALUE = new_token_type("dictionary lookup value")
+REMOVE_PAIR = new_token_type("dictionary remove pair")
+LIST_KEYS = new_token_type("dictionary list keys")
 
 # NAME KEYWORDS
-NAME_KEYWORD = "name keyword (variable or method name)"
+NAME_KEYWORD = new_token_type("name keyword (variable or method name)")
 
 # SYNTAX SYMBOLS
-COMMA = "comma"
-COLON = "colon"
-DOT = "dot/full stop"
-OPENING_CURVED_BRACKET = "opening curved bracket"
-CLOSING_CURVED_BRACKET = "closing curved bracket"
-OPENING_SQUARE_BRACKET = "opening square bracket"
-CLOSING_SQUARE_BRACKET = "closing square bracket"
-OPENING_CURLED_BRACKET = "opening curled bracket"
-CLOSING_CURLED_BRACKET = "closing curled bracket"
-OPENING_TRIANGLE_BRACKET = "opening triangle bracket"
-CLOSING_TRIANGLE_BRACKET = "closing triangle bracket"
+COMMA = new_token_type("comma")
+COLON = new_token_type("colon")
+DOT = new_token_type("dot/full stop")
+OPENING_CURVED_BRACKET = new_token_type("opening curved bracket")
+CLOSING_CURVED_BRACKET = new_token_type("closing curved bracket")
+OPENING_SQUARE_BRACKET = new_token_type("opening square bracket")
+CLOSING_SQUARE_BRACKET = new_token_type("closing square bracket")
+OPENING_CURLED_BRACKET = new_token_type("opening curled bracket")
+CLOSING_CURLED_BRACKET = new_token_type("closing curled bracket")
+OPENING_TRIANGLE_BRACKET = new_token_type("opening triangle bracket")
+CLOSING_TRIANGLE_BRACKET = new_token_type("closing triangle bracket")
 
 # RESERVED OPERATORS
-EQUALS = "equals"
-PLUS = "plus"
-MINUS = "minus"
-MULTIPLY = "multiply"
-DIVIDE = "divide"
-MODULO = "modulo"
-INTEGER_DIVIDE = "integer divide"
-IS_LESS_THAN = "less than"
-IS_GREATER_THAN = "greater than"
-IS_LESS_THAN_OR_EQUAL_TO = "less than or equal to"
-IS_GREATER_THAN_OR_EQUAL_TO = "greater than or equal to"
-IS_EQUAL_TO = "is equal to"
-IS_NOT_EQUAL_TO = "is not equal to"
+EQUALS = new_token_type("equals")
+PLUS = new_token_type("plus")
+MINUS = new_token_type("minus")
+MULTIPLY = new_token_type("multiply")
+DIVIDE = new_token_type("divide")
+MODULO = new_token_type("modulo")
+INTEGER_DIVIDE = new_token_type("integer divide")
+IS_LESS_THAN = new_token_type("less than")
+IS_GREATER_THAN = new_token_type("greater than")
+IS_LESS_THAN_OR_EQUAL_TO = new_token_type("less than or equal to")
+IS_GREATER_THAN_OR_EQUAL_TO = new_token_type("greater than or equal to")
+IS_EQUAL_TO = new_token_type("is equal to")
+IS_NOT_EQUAL_TO = new_token_type("is not equal to")
 
 # ANYTHING BELOW THIS POINT IS USED IN THE AST BUT NOT IN THE LEXER
 
 # COMPLEX DATA STRUCTURES
-ARRAY = "Array value"
-TUPLE = "Tuple value"
-STACK = "Stack value"
-QUEUE = "Queue value"
-PRIORITY_QUEUE = "Priority queue value"
-DICTIONARY = "Dictionary value"
+ARRAY = new_token_type("Array value")
+TUPLE = new_token_type("Tuple value")
+STACK = new_token_type("Stack value")
+QUEUE = new_token_type("Queue value")
+PRIORITY_QUEUE = new_token_type("Priority queue value")
+DICTIONARY = new_token_type("Dictionary value")
 
 # ROOT NODE TOKEN TYPES
-OPEN_IF = "root node opening an if statement"
-SKIP_IF = "root node skipping the contents of an if statement"
-OPEN_WHILE = "root node opening a while statement"
-SKIP_WHILE = "root node skipping the contents of a while statement"
-OPEN_FOR = "root node opening a for statement"
-SKIP_FOR = "root node skipping the contents of a while statement"
-OPEN_DEFINE = "root node opening a subroutine definition"
-RETURN = "root node closing a subroutine call"
-OUTPUT_REQUEST = "root node requesting the output of a value"
-
-INVALID = "token used to indicate if a root node output is invalid but that there is a root node there"
+OPEN_IF = new_token_type("root node opening an if statement")
+SKIP_IF = new_token_type("root node skipping the contents of an if statement")
+OPEN_WHILE = new_token_type("root node opening a while statement")
+SKIP_WHILE = new_token_type("root node skipping the contents of a while statement")
+OPEN_FOR = new_token_type("root node opening a for statement")
+SKIP_FOR = new_token_type("root node skipping the contents of a while statement")
+OPEN_DEFINE = new_token_type("root node opening a subroutine definition")
+RETURN = new_token_type("root node closing a subroutine call")
+OUTPUT_REQUEST = new_token_type("root node requesting the output of a value")
+
+INVALID = new_token_type("token used to indicate if a root node output is invalid but that there is a root node there")
 
 # VIRTUAL VARIABLES
 # tokens which contain virtual variables as values
-VIRTUAL_INTEGER = "integer virtual variable"
-VIRTUAL_FLOAT = "float virtual variable"
-VIRTUAL_STRING = "string virtual variable"
-VIRTUAL_CHARACTER = "character virtual variable"
-VIRTUAL_BOOLEAN = "boolean virtual variable"
-VIRTUAL_TUPLE = "tuple virtual variable"
-VIRTUAL_ARRAY = "array virtual variable"
-VIRTUAL_STACK = "stack virtual variable"
-VIRTUAL_QUEUE = "queue virtual variable"
-VIRTUAL_PRIORITY_QUEUE = "priority queue virtual variable"
-VIRTUAL_DICTIONARY = "dictionary virtual variable"
-VIRTUAL_DICTIONARY_PAIR = "dictionary pair virtual variable"
-
-BRACKETS = "Surrounding brackets"
-ASSIGNMENT = "Assignment"
-DECLARATION_NORMAL_WITH_VALUE = "Normal declaration with a value"
-DECLARATION_NORMAL_WITHOUT_VALUE = "Normal declaration without a value"
-
-IF_STATEMENT = "If statement"
-WHILE_STATEMENT = "While statment"
-FOR_STATEMENT = "For statement"
-DEFINE_STATEMENT = "method definition"
-RETURN_STATEMENT = "return statement"
-
-METHOD_CALL = "Method call"
-
-OUTPUT_CALL = "Output call"
+VIRTUAL_INTEGER = new_token_type("integer virtual variable")
+VIRTUAL_FLOAT = new_token_type("float virtual variable")
+VIRTUAL_STRING = new_token_type("string virtual variable")
+VIRTUAL_CHARACTER = new_token_type("character virtual variable")
+VIRTUAL_BOOLEAN = new_token_type("boolean virtual variable")
+VIRTUAL_TUPLE = new_token_type("tuple virtual variable")
+VIRTUAL_ARRAY = new_token_type("array virtual variable")
+VIRTUAL_STACK = new_token_type("stack virtual variable")
+VIRTUAL_QUEUE = new_token_type("queue virtual variable")
+VIRTUAL_PRIORITY_QUEUE = new_token_type("priority queue virtual variable")
+VIRTUAL_DICTIONARY = new_token_type("dictionary virtual variable")
+VIRTUAL_DICTIONARY_PAIR = new_token_type("dictionary pair virtual variable")
+
+BRACKETS = new_token_type("Surrounding brackets")
+ASSIGNMENT = new_token_type("Assignment")
+DECLARATION_NORMAL_WITH_VALUE = new_token_type("Normal declaration with a value")
+DECLARATION_NORMAL_WITHOUT_VALUE = new_token_type("Normal declaration without a value")
+
+IF_STATEMENT = new_token_type("If statement")
+WHILE_STATEMENT = new_token_type("While statment")
+FOR_STATEMENT = new_token_type("For statement")
+DEFINE_STATEMENT = new_token_type("method definition")
+RETURN_STATEMENT = new_token_type("return statement")
+
+METHOD_CALL = new_token_type("Method call")
+
+OUTPUT_CALL = new_token_type("Output call")
 
 # uses isequalto, isleassthan, etc
-BOOLEAN_COMPARISON = "Boolean comparison"
+BOOLEAN_COMPARISON = new_token_type("Boolean comparison")
 # uses and, or, not
-BINARY_BOOLEAN_LOGICAL_STATEMENT = "Binary boolean logical statement"
-SINGLE_BOOLEAN_LOGICAL_STATEMENT = "Single boolean logical statement"
-
-MULTIPLICATION = "Multiplication, supports integers and floats"
-SUBTRACTION = "Subtraction, supports integers and floats"
-MODULO_DIVIDE = "Integer-only division-related operation, %"
-INTEGER_DIVISION = "Integer-only division operation, //"
-DIVISION = "standard division operation, /"
-CONCATENATION_OR_ADDITION = "Concatentation or addition"
-
-STRING_LIST_READ_BY_INDEX = "String or list, read by index"
-ARRAY_APPEND = "Array append"
-DICTIONARY_PAIR = "Dictionary pair"
-DICTIONARY_INSERT = "Dictionary insert"
-DICTIONARY_LOOKUP = "Dictionary lookup"
-DICTIONARY_REMOVE = "Dictionary remove"
-DICTIONARY_KEY_LIST = "Dictionary keylist"
-STACK_QUEUE_ADD_ITEM = "Stack or queue item add"
-PRIORITY_QUEUE_ADD_ITEM = "Priority queue item add"
-STACK_QUEUE_ITEM_READ = "Stack, queue or priority queue item read"
-STACK_QUEUE_ITEM_POP = "Stack, queue or priority queue item pop"
-LENGTH_CHECK = "Length check"
+BINARY_BOOLEAN_LOGICAL_STATEMENT = new_token_type("Binary boolean logical statement")
+SINGLE_BOOLEAN_LOGICAL_STATEMENT = new_token_type("Single boolean logical statement")
+
+MULTIPLICATION = new_token_type("Multiplication, supports integers and floats")
+SUBTRACTION = new_token_type("Subtraction, supports integers and floats")
+MODULO_DIVIDE = new_token_type("Integer-only division-related operation, %")
+INTEGER_DIVISION = new_token_type("Integer-only division operation, //")
+DIVISION = new_token_type("standard division operation, /")
+CONCATENATION_OR_ADDITION = new_token_type("Concatentation or addition")
+
+STRING_LIST_READ_BY_INDEX = new_token_type("String or list, read by index")
+ARRAY_APPEND = new_token_type("Array append")
+DICTIONARY_PAIR = new_token_type("Dictionary pair")
+DICTIONARY_INSERT = new_token_type("Dictionary insert")
+DICTIONARY_LOOKUP = new_token_type("Dictionary lookup")
+DICTIONARY_REMOVE = new_token_type("Dictionary remove")
+DICTIONARY_KEY_LIST = new_token_type("Dictionary keylist")
+STACK_QUEUE_ADD_ITEM = new_token_type("Stack or queue item add")
+PRIORITY_QUEUE_ADD_ITEM = new_token_type("Priority queue item add")
+STACK_QUEUE_ITEM_READ = new_token_type("Stack, queue or priority queue item read")
+STACK_QUEUE_ITEM_POP = new_token_type("Stack, queue or priority queue item pop")
+LENGTH_CHECK = new_token_type("Length check")
 
 # SUMMARY LISTS
 NUMBERS = [INTEGER, DECIMAL_NUMBER, FLOAT]
@@ -228,7 +281,7 @@ NUMBERS = [INTEGER, DECIMAL_NUMBER, FLOAT]
 CHARACTER_BASED_VALUE = [CHARACTER, STRING]
 
 ACTIONABLE_ROOT_NODE_TYPES = [OPEN_IF, SKIP_IF, ELSE, END_IF, OPEN_WHILE, SKIP_WHILE, END_WHILE, OPEN_FOR, SKIP_FOR, END_FOR, METHOD_CALL, OPEN_DEFINE, END, OUTPUT_REQUEST]
-NON_ACTIONABLE_ROOT_NODE = "Root node which doesn't state an instruction for the main controller"
+NON_ACTIONABLE_ROOT_NODE = new_token_type("Root node which doesn't state an instruction for the main controller")
 ROOT_NODE_TYPES = ACTIONABLE_ROOT_NODE_TYPES + [NON_ACTIONABLE_ROOT_NODE]
 
 OPERATION_TYPE_TO_ROOT_NODE = {
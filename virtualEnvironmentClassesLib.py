@@ -45,6 +45,17 @@ import copy
 # __deepcopy__ adapted from StackOverflow answer: https://stackoverflow.com/a/46939443 
 # by: https://stackoverflow.com/users/541136/russia-must-remove-putin
 
+# Value ownership:
+#   a virtual variable is never changed once it has been converted to a token, so the same
+#   virtual variable can be held by several variables, tokens and AST leaves at once without
+#   being copied.
+#   - integers, floats, strings, characters and booleans are immutable, their arithmetic and 
+#     concatenation methods return a new virtual variable
+#   - data structures are only changed through a copy made by copy_for_change, which is then
+#     reassigned to the variable that was changed. Their methods that change them replace 
+#     the python lists they hold rather than changing those lists, so a copy only has to 
+#     copy the outermost virtual variable and never the items within it
+
 class Virtual_variable:
     # every virtual variable that is created will immediately run the set value procedure, which is specific to the class used
     def __init__(self, value):
@@ -64,6 +75,11 @@ class Virtual_variable:
     def get_length(self):
         return len(self.value)
 
+    # gives a copy of this variable that can be changed without changing this one, as data
+    #   structure methods replace their lists rather than changing them a shallow copy is enough
+    def copy_for_change(self):
+        return copy.copy(self)
+
     # convert to token is used when a variable is taken out of the virtual environment by the interpreter
     # it provides a token that can be placed into an AST as a leaf node, these will take the for of
     # the relevant token type and the Virtual variable.
@@ -105,26 +121,26 @@ class Integer_virtual(Virtual_variable):
         if self.check_valid(value):
             self.value = int(value)
 
-    # arithmetic operations which only take intergers and output integers
+    # arithmetic operations which only take intergers and output new integers
     def integer_add(self, other_virt_integer):
         total = self.get_value() + other_virt_integer.get_value()
-        self.set_value(total)
+        return Integer_virtual(total)
     
     def integer_subtract(self, other_virt_integer):
         total = self.get_value() - other_virt_integer.get_value()
-        self.set_value(total)
+        return Integer_virtual(total)
     
     def integer_multiply(self, other_virt_integer):
         total = self.get_value() * other_virt_integer.get_value()
-        self.set_value(total)
+        return Integer_virtual(total)
     
     def integer_division(self, other_virt_integer):
         total = self.get_value() // other_virt_integer.get_value()
-        self.set_value(total)
+        return Integer_virtual(total)
     
     def integer_modulo_division(self, other_virt_integer):
         total = self.get_value() % other_virt_integer.get_value()
-        self.set_value(total)
+        return Integer_virtual(total)
 
     def convert_to_virtual_float(self):
         value = self.get_value()
@@ -134,7 +150,7 @@ class Integer_virtual(Virtual_variable):
         raise Exception("This is an integer virtual variable class and its length cannot be requested")
 
     def convert_to_token(self):
-        return Token(VIRTUAL_INTEGER, copy.deepcopy(self))
+        return Token(VIRTUAL_INTEGER, self)
 
     def __str__(self):
         return f"Integer_virtual({self.value})"
@@ -154,28 +170,28 @@ class Float_virtual(Virtual_variable):
         if self.check_valid(value):
             self.value = float(value)
 
-    # various arithmetic operations
+    # various arithmetic operations, each outputting a new float
     def add(self, other_virt_number):
         total = self.value + other_virt_number.value
-        self.set_value(total)
+        return Float_virtual(total)
     
     def subtract(self, other_virt_number):
         total = self.value - other_virt_number.value
-        self.set_value(total)
+        return Float_virtual(total)
 
     def multiply(self, other_virt_number):
         total = self.value * other_virt_number.value
-        self.set_value(total)
+        return Float_virtual(total)
     
     def divide(self, other_virt_number):
         total = self.value / other_virt_number.value
-        self.set_value(total)
+        return Float_virtual(total)
     
     def get_length(self):
         raise Exception("This is a float virtual variable class and its length cannot be requested")
 
     def convert_to_token(self):
-        return Token(VIRTUAL_FLOAT, copy.deepcopy(self))
+        return Token(VIRTUAL_FLOAT, self)
     
     def __str__(self):
         return f"Float_virtual({self.value})"
@@ -187,10 +203,10 @@ class String_virtual(Virtual_variable):
         else:
             return True
     
-    # sets the value of this variable to itself followed by the value of another virtual string
+    # outputs a new virtual string of this string followed by the value of another virtual string
     def concatenate(self, other_virt_string):
         new_value = self.get_value() + other_virt_string.get_value()
-        self.set_value(new_value)
+        return String_virtual(new_value)
 
     # Allows reading of an individual letter or a series of letters within the string virtual
     def read_item(self, index):
@@ -205,7 +221,7 @@ class String_virtual(Virtual_variable):
         return output
 
     def convert_to_token(self):
-        return Token(VIRTUAL_STRING, copy.deepcopy(self))
+        return Token(VIRTUAL_STRING, self)
 
     def __str__(self):
         return f"String_virtual({self.value})"
@@ -219,7 +235,7 @@ class Character_virtual(Virtual_variable):
             return True
 
     def convert_to_token(self):
-        return Token(VIRTUAL_CHARACTER, copy.deepcopy(self))
+        return Token(VIRTUAL_CHARACTER, self)
 
     def __str__(self):
         return f"Character_virtual({self.value})"
@@ -254,7 +270,7 @@ class Boolean_virtual(Virtual_variable):
         raise Exception("This is a boolean virtual variable class and its length cannot be requested")
 
     def convert_to_token(self):
-        return Token(VIRTUAL_BOOLEAN, copy.deepcopy(self))
+        return Token(VIRTUAL_BOOLEAN, self)
 
     def __str__(self):
         return f"Boolean_virtual({self.value})"
@@ -316,7 +332,7 @@ class List_based_virtual(Virtual_variable):
 # Virtual Tuple, mostly uses the base functionality of the list-based virtual abstract class
 class Tuple_virtual(List_based_virtual):
     def convert_to_token(self):
-        return Token(VIRTUAL_TUPLE, copy.deepcopy(self))
+        return Token(VIRTUAL_TUPLE, self)
 
     def __str__(self):
         return f"Tuple_virtual({self.value})"
@@ -338,13 +354,13 @@ class Array_virtual(List_based_virtual):
             end_list = self.value[0:index] + self.value[(index+1):len(self.value)]
             self.value = end_list
     
-    # appends another array's values to the end of this one's
+    # outputs a new array of this array's values followed by another array's values
     def join(self, other_virt_array):
         new_value = self.get_value() + other_virt_array.get_value()
-        self.set_value(new_value)
+        return Array_virtual(new_value)
             
     def convert_to_token(self):
-        return Token(VIRTUAL_ARRAY, copy.deepcopy(self))
+        return Token(VIRTUAL_ARRAY, self)
     
     def __str__(self):
         return f"Array_virtual({self.value})"
@@ -393,10 +409,10 @@ class Stack_virtual(Stack_queue_based_virtual):
     # Places the item at the end of the list (The position that is removed first)
     def add_item(self, item):
         to_add = convert_to_virtual_variable(item)
-        self.value += [to_add]
+        self.value = self.value + [to_add]
     
     def convert_to_token(self):
-        return Token(VIRTUAL_STACK, copy.deepcopy(self))
+        return Token(VIRTUAL_STACK, self)
     
     def __str__(self):
         return f"Stack_virtual({self.value})"
@@ -408,7 +424,7 @@ class Queue_virtual(Stack_queue_based_virtual):
         self.value = [to_add] + self.value
     
     def convert_to_token(self):
-        return Token(VIRTUAL_QUEUE, copy.deepcopy(self))
+        return Token(VIRTUAL_QUEUE, self)
     
     def __str__(self):
         return f"Queue_virtual({self.value})"
@@ -445,7 +461,7 @@ class Priority_queue_virtual(Stack_queue_based_virtual):
         self.value = new_value
         
     def convert_to_token(self):
-        return Token(VIRTUAL_PRIORITY_QUEUE, copy.deepcopy(self))
+        return Token(VIRTUAL_PRIORITY_QUEUE, self)
 
     def __str__(self):
         return f"Priority_queue_virtual({self.value})"
@@ -469,7 +485,7 @@ class Dictionary_pair(Virtual_variable):
         raise Exception("This is a dictionary pair virtual variable class and cannot be outputted")
     
     def convert_to_token(self):
-        return Token(VIRTUAL_DICTIONARY_PAIR, copy.deepcopy(self))
+        return Token(VIRTUAL_DICTIONARY_PAIR, self)
 
     # __deepcopy__ adapted from StackOverflow answer: https://stackoverflow.com/a/46939443 
     # by: https://stackoverflow.com/users/541136/russia-must-remove-putin
@@ -673,13 +689,20 @@ class Dictionary_virtual(Virtual_variable):
     
     def get_length(self):
         return self.dictionary_length
+
+    # pair insertion and removal change the dictionary list's positions, so unlike other data 
+    #   structures the list itself is copied, the pairs within it are replaced rather than changed
+    def copy_for_change(self):
+        dictionary = copy.copy(self)
+        dictionary.dictionary_list = list(self.dictionary_list)
+        return dictionary
     
     def output_representation(self):
         raise Exception("This is a dictionary virtual variable class \
             and cannot be outputted")
     
     def convert_to_token(self):
-        return Token(VIRTUAL_DICTIONARY, copy.deepcopy(self))
+        return Token(VIRTUAL_DICTIONARY, self)
     
     # __deepcopy__ adapted from StackOverflow answer: 
     #   https://stackoverflow.com/a/46939443 